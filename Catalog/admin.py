@@ -1,10 +1,11 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from .models import *
 
 
 @admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
-    list_display = ('full_name', 'date_of_birth', 'date_of_death', )
+    list_display = ('full_name', 'date_of_birth', 'date_of_death', 'books_count', )
     ordering = ('last_name', 'first_name', )
     search_fields = ('last_name', 'first_name', )
 
@@ -15,14 +16,32 @@ class AuthorAdmin(admin.ModelAdmin):
 
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
+    list_display = ('genre', 'books_count', )
     search_fields = ('genre', )
 
 
+class BookChangeList(ChangeList):
+    def get_queryset(self, request):
+        # Жанры и автор загружаются для всей страницы сразу, а не отдельным запросом на каждую строку.
+        # Только для списка: форма изменения книги загружает книгу целиком
+        return super().get_queryset(request).for_admin()
+
+
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'display_genre', )
+    list_display = ('title', 'author', 'display_genre', 'rating', 'rating_count', 'bookshelves_count', )
     search_fields = ('title', 'author__last_name', )
 
+    def get_changelist(self, request, **kwargs):
+        return BookChangeList
+
+
+@admin.register(Rating)
+class RatingAdmin(admin.ModelAdmin):
+    list_display = ('user', 'book', 'score', )
+    list_select_related = ('user', 'book', )
+    raw_id_fields = ('user', 'book', )
+
 
 @admin.register(Bookshelf)
 class GenreAdmin(admin.ModelAdmin):
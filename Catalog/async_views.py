@@ -0,0 +1,120 @@
+"""
+Асинхронные версии представлений каталога, которые только читают данные.
+Подключаются вместо синхронных (Catalog.urls), если settings.ASYNC_VIEWS включен,
+то есть при запуске через ASGI (ReadMe/asgi.py).
+
+Данные загружаются асинхронным ORM, а шаблон отрисовывается обработчиком Django
+после выхода из представления (TemplateResponse)
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max
+from django.http import Http404
+
+from . import views
+from .conditional import AsyncConditionalGetMixin
+from .models import *
+
+
+class AsyncPaginationMixin:
+    """
+    Страница загружается асинхронно заранее (aload_page), а синхронный get_page_obj,
+    который вызывается из get_context_data, только возвращает ее
+    """
+
+    async def aload_page(self, queryset, per_page):
+        self.page = await self.aget_page_obj(queryset, per_page)
+
+    def get_page_obj(self, queryset, per_page):
+        return self.page
+
+
+class AsyncListMixin(AsyncPaginationMixin):
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        await self.aload_page(self.object_list, self.get_paginate_by(self.object_list))
+        return self.render_to_response(self.get_context_data())
+
+
+class AsyncDetailMixin:
+
+    async def aget_object(self):
+        queryset = self.get_queryset()
+        try:
+            return await queryset.aget(**{self.slug_field: self.kwargs[self.slug_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404(f'{queryset.model._meta.verbose_name} не найден')
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        await self.aload_related()
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+    async def aload_related(self):
+        pass
+
+
+class BookListView(AsyncListMixin, views.BookListView):
+
+    async def get(self, request, *args, **kwargs):
+        await sync_to_async(self.load_facets)()
+        return await super().get(request, *args, **kwargs)
+
+
+class BookDetailView(AsyncConditionalGetMixin, AsyncDetailMixin, views.BookDetailView):
+
+    async def aget_validators(self):
+        book = await Book.objects.filter(slug=self.kwargs['slug']).values_list('pk', 'updated_at').afirst()
+        if book is None:
+            return None
+        return f'book:{book[0]}', book[1]
+
+    async def aload_related(self):
+        self.also_shelved = [book async for book in super().get_also_shelved()]
+
+    def get_also_shelved(self):
+        return self.also_shelved
+
+    async def post(self, request, *args, **kwargs):
+        return await sync_to_async(super().post)(request, *args, **kwargs)
+
+
+class AuthorListView(AsyncListMixin, views.AuthorListView):
+    pass
+
+
+class AuthorDetailView(AsyncConditionalGetMixin, AsyncDetailMixin, AsyncPaginationMixin, views.AuthorDetailView):
+
+    async def aget_validators(self):
+        author = await (
+            Author.objects.filter(slug=self.kwargs['slug'])
+            .annotate(books_updated_at=Max('book__updated_at'))
+            .order_by()
+            .values_list('pk', 'updated_at', 'books_updated_at')
+            .afirst()
+        )
+        if author is None:
+            return None
+        pk, updated_at, books_updated_at = author
+        return f'author:{pk}', max(updated_at, books_updated_at or updated_at)
+
+    async def aload_related(self):
+        await self.aload_page(self.object.book_set.for_list(), self.paginate_by)
+
+
+class BookshelfDetailView(AsyncPaginationMixin, views.BookshelfDetailView):
+
+    async def dispatch(self, request, *args, **kwargs):
+        # LoginRequiredMixin проверяет request.user синхронно: пользователь загружается заранее
+        await sync_to_async(lambda: request.user.is_authenticated)()
+        response = super().dispatch(request, *args, **kwargs)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        self.object = (await Bookshelf.objects.aget_or_create(user=request.user))[0]
+        await self.aload_page(self.object.book.for_list(), self.paginate_by)
+        return self.render_to_response(self.get_context_data(object=self.object))
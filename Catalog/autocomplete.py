@@ -0,0 +1,193 @@
+"""
+Автодополнение названий книг, имен авторов и жанров по началу строки.
+
+Для каждого вида объектов процесс держит в памяти PrefixIndex - отсортированный массив пар
+(нормализованный ключ, pk), в котором все ключи с данным префиксом идут подряд и находятся
+двоичным поиском (bisect), без запросов к базе. Индекс строится из базы при первом обращении,
+а дальше сохранение и удаление объектов обновляют его после фиксации транзакции (Catalog.signals).
+
+Другие процессы узнают об изменениях по номеру поколения индекса в кеше и перестраивают свой
+индекс при следующем обращении. Для этого кеш должен быть общим для процессов (Redis, Memcached):
+с LocMemCache каждый процесс видит только свои изменения
+"""
+import threading
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Author, Book, Genre
+
+# Число подсказок по умолчанию и максимальное, которое можно запросить
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+def normalize(text):
+    """
+    Ключ поиска: без учета регистра, ё = е, пробелы схлопнуты
+    """
+    return ' '.join(text.casefold().replace('ё', 'е').split())
+
+
+def _book_entry(title):
+    return title, [title]
+
+
+def _author_entry(first_name, last_name):
+    # Автор находится и по имени, и по фамилии
+    return f'{last_name} {first_name}', [f'{first_name} {last_name}', f'{last_name} {first_name}']
+
+
+def _genre_entry(genre):
+    return genre, [genre]
+
+
+# Вид подсказок -> (модель, поля для подписи и ключей, функция (подпись, ключи) по значениям полей)
+SOURCES = {
+    'book': (Book, ('title',), _book_entry),
+    'author': (Author, ('first_name', 'last_name'), _author_entry),
+    'genre': (Genre, ('genre',), _genre_entry),
+}
+
+
+class PrefixIndex:
+    """
+    Отсортированный массив пар (ключ, pk) и подписи объектов по pk
+    """
+
+    def __init__(self, rows=()):
+        self.labels = {}
+        self.keys = {}
+        entries = []
+        for pk, label, keys in rows:
+            keys = self._normalize_keys(keys)
+            self.labels[pk] = label
+            self.keys[pk] = keys
+            entries.extend((key, pk) for key in keys)
+        entries.sort()
+        self.entries = entries
+
+    @staticmethod
+    def _normalize_keys(keys):
+        return sorted({normalize(key) for key in keys} - {''})
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, pk, label, keys):
+        self.remove(pk)
+        keys = self._normalize_keys(keys)
+        for key in keys:
+            insort(self.entries, (key, pk))
+        self.labels[pk] = label
+        self.keys[pk] = keys
+
+    def remove(self, pk):
+        for key in self.keys.pop(pk, ()):
+            del self.entries[bisect_left(self.entries, (key, pk))]
+        self.labels.pop(pk, None)
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Список (pk, подпись) объектов, у которых есть ключ, начинающийся с prefix
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        found = {}
+        position = bisect_left(self.entries, (prefix,))
+        while position < len(self.entries) and len(found) < limit:
+            key, pk = self.entries[position]
+            if not key.startswith(prefix):
+                break
+            found.setdefault(pk, self.labels[pk])
+            position += 1
+        return list(found.items())
+
+
+# Индексы процесса: вид подсказок -> (поколение, PrefixIndex)
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _generation_key(kind):
+    return f'catalog:autocomplete-generation:{kind}'
+
+
+def _current_generation(kind):
+    return cache.get_or_set(_generation_key(kind), 0, None)
+
+
+def build_index(kind):
+    """
+    Строит индекс вида kind по всем объектам из базы. Индекс живет до следующей смены поколения,
+    поэтому читается с основной базы: реплика могла еще не получить изменение, сменившее поколение
+    """
+    model, fields, entry = SOURCES[kind]
+    rows = model.objects.using(DEFAULT_DB_ALIAS).order_by().values_list('pk', *fields).iterator(chunk_size=10000)
+    return PrefixIndex((pk, *entry(*values)) for pk, *values in rows)
+
+
+def get_index(kind):
+    generation = _current_generation(kind)
+    with _lock:
+        loaded = _indexes.get(kind)
+        if loaded is None or loaded[0] != generation:
+            loaded = _indexes[kind] = (generation, build_index(kind))
+        return loaded[1]
+
+
+def autocomplete(kind, prefix, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Подсказки вида kind ('book', 'author', 'genre') по началу строки prefix: список (pk, подпись)
+    """
+    index = get_index(kind)
+    with _lock:
+        return index.search(prefix, limit)
+
+
+def _next_generation(kind):
+    cache.add(_generation_key(kind), 0, None)
+    return cache.incr(_generation_key(kind))
+
+
+def _apply(kind, change):
+    generation = _next_generation(kind)
+    with _lock:
+        loaded = _indexes.get(kind)
+        # Индекс процесса обновляется на месте, только если он не пропустил изменений
+        # других процессов, иначе он будет перестроен при следующем обращении
+        if loaded is not None and loaded[0] == generation - 1:
+            change(loaded[1])
+            _indexes[kind] = (generation, loaded[1])
+
+
+def object_saved(instance, update_fields=None):
+    """
+    Обновляет подсказки для сохраненного объекта после фиксации транзакции
+    """
+    kind = next(kind for kind, (model, _, _) in SOURCES.items() if isinstance(instance, model))
+    _, fields, entry = SOURCES[kind]
+    if update_fields is not None and not set(fields) & set(update_fields):
+        return
+    pk, (label, keys) = instance.pk, entry(*(getattr(instance, field) for field in fields))
+    transaction.on_commit(lambda: _apply(kind, lambda index: index.add(pk, label, keys)))
+
+
+def object_deleted(instance):
+    """
+    Убирает подсказку для удаленного объекта после фиксации транзакции
+    """
+    kind = next(kind for kind, (model, _, _) in SOURCES.items() if isinstance(instance, model))
+    pk = instance.pk
+    transaction.on_commit(lambda: _apply(kind, lambda index: index.remove(pk)))
+
+
+def invalidate_autocomplete(*kinds):
+    """
+    Сбрасывает индексы подсказок во всех процессах после массовых изменений в обход сигналов
+    """
+    for kind in kinds or SOURCES:
+        _next_generation(kind)
@@ -0,0 +1,173 @@
+"""
+Массовое создание, изменение и удаление книг (api.views.BookApiList).
+
+Каждая операция - одна транзакция с фиксированным числом запросов на пачку: bulk_create
+или Catalog.bulk.bulk_update книг, одна вставка связей с жанрами, а то, что при сохранении одной книги делают
+сигналы (Catalog.signals) - счетчики, поисковый вектор, фасеты, фрагменты, подсказки, -
+выполняется здесь сразу для всей пачки. Данные должны быть уже проверены
+(api.serializer.BookBulkListSerializer)
+"""
+from collections import Counter
+
+from django.db import connections, models, router, transaction
+from slugify import slugify
+
+from .autocomplete import invalidate_autocomplete
+from .bulk import bulk_update
+from .counters import change_counters
+from .facets import refresh_facets
+from .fragments import invalidate_fragments
+from .models import Author, Book, Bookshelf, Genre
+from .recommendations import mark_stale
+from .search import update_search_vector
+from .signals import books_changed, touch_authors
+
+BookGenre = Book.genre.through
+Shelved = Bookshelf.book.through
+
+
+def _invalidate_book_autocomplete():
+    transaction.on_commit(lambda: invalidate_autocomplete('book'))
+
+
+def create_books(items):
+    """
+    Создает книги по словарям items (title, about, author - pk или None, genre - список pk)
+    и возвращает их в том же порядке
+    """
+    books = [
+        Book(title=item['title'], slug=slugify(item['title']), author_id=item.get('author'), about=item['about'])
+        for item in items
+    ]
+    with transaction.atomic(using=router.db_for_write(Book)):
+        Book.objects.bulk_create(books)
+        links = [
+            BookGenre(book_id=book.pk, genre_id=genre_id)
+            for book, item in zip(books, items)
+            for genre_id in dict.fromkeys(item.get('genre', ()))
+        ]
+        BookGenre.objects.bulk_create(links)
+
+        change_counters(Author, 'books_count', Counter(book.author_id for book in books))
+        change_counters(Genre, 'books_count', Counter(link.genre_id for link in links))
+        book_ids = [book.pk for book in books]
+        update_search_vector(Book.objects.filter(pk__in=book_ids))
+        refresh_facets(book_ids)
+        _invalidate_book_autocomplete()
+    return books
+
+
+def update_books(changes):
+    """
+    Частично изменяет книги: changes - словари с pk книги (id) и новыми значениями
+    title, about, author и genre (полный список жанров). Возвращает pk измененных книг
+    """
+    changes = {item['id']: item for item in changes}
+    fields = {field for item in changes.values() for field in ('title', 'author', 'about') if field in item}
+    columns = ['id', 'author_id', *(['title', 'slug'] if 'title' in fields else []),
+               *(['about'] if 'about' in fields else [])]
+
+    with transaction.atomic(using=router.db_for_write(Book)):
+        books = Book.objects.select_for_update().only(*columns).in_bulk(list(changes))
+        author_deltas = Counter()
+        for pk, item in changes.items():
+            book = books[pk]
+            if 'title' in item:
+                book.title, book.slug = item['title'], slugify(item['title'])
+            if 'about' in item:
+                book.about = item['about']
+            if 'author' in item and item['author'] != book.author_id:
+                author_deltas.update({book.author_id: -1, item['author']: 1})
+                book.author_id = item['author']
+        if fields:
+            update_fields = sorted(fields | ({'slug'} if 'title' in fields else set()))
+            bulk_update(Book, update_fields, [
+                (book.pk, *(getattr(book, Book._meta.get_field(field).attname) for field in update_fields))
+                for book in books.values()
+            ])
+
+        genre_book_ids = [pk for pk, item in changes.items() if 'genre' in item]
+        if genre_book_ids:
+            old_links = BookGenre.objects.filter(book_id__in=genre_book_ids)
+            genre_deltas = Counter()
+            genre_deltas.subtract(old_links.values_list('genre_id', flat=True))
+            old_links.delete()
+            links = [
+                BookGenre(book_id=pk, genre_id=genre_id)
+                for pk in genre_book_ids
+                for genre_id in dict.fromkeys(changes[pk]['genre'])
+            ]
+            BookGenre.objects.bulk_create(links)
+            genre_deltas.update(link.genre_id for link in links)
+            change_counters(Genre, 'books_count', genre_deltas)
+
+        change_counters(Author, 'books_count', author_deltas)
+        # Страницы прежних и новых авторов тоже изменились
+        touch_authors([author_id for author_id, delta in author_deltas.items() if delta])
+        books_changed(list(books))
+        if 'title' in fields:
+            _invalidate_book_autocomplete()
+    return list(books)
+
+
+def _book_references():
+    """
+    Таблицы, строки которых удаляются вместе с книгой: связи многие-ко-многим и модели
+    с внешним ключом on_delete=CASCADE - пары (модель, столбец со ссылкой на книгу).
+    None, если на книгу ссылается модель с другим on_delete (PROTECT, SET_NULL, ...):
+    такие ссылки обрабатывает только QuerySet.delete()
+    """
+    references = [(field.remote_field.through, field.m2m_column_name()) for field in Book._meta.many_to_many]
+    for relation in Book._meta.related_objects:
+        if relation.many_to_many:
+            references.append((relation.through, relation.field.m2m_reverse_name()))
+        elif relation.on_delete is models.CASCADE:
+            references.append((relation.related_model, relation.field.column))
+        elif relation.on_delete is not models.DO_NOTHING:
+            return None
+    return references
+
+
+def delete_books(book_ids):
+    """
+    Удаляет книги book_ids вместе со связанными строками и возвращает pk удаленных книг.
+    Удаление идет запросами DELETE ... WHERE ... = ANY(...) по каждой таблице, без загрузки
+    объектов и сигналов на каждую книгу (в отличие от QuerySet.delete()). Если на книги ссылаются
+    не только каскадно (_book_references), удаляет через QuerySet.delete(): при on_delete=PROTECT
+    будет ProtectedError
+    """
+    references = _book_references()
+    connection = connections[router.db_for_write(Book)]
+    quote_name = connection.ops.quote_name
+    with transaction.atomic(using=connection.alias):
+        books = dict(Book.objects.select_for_update().filter(pk__in=book_ids).order_by('pk').values_list('pk', 'author_id'))
+        book_ids = sorted(books)
+        if not book_ids:
+            return []
+        if references is None:
+            # Связанные строки обрабатывает Collector, счетчики и кеши - сигналы (Catalog.signals)
+            Book.objects.filter(pk__in=book_ids).delete()
+            return book_ids
+
+        genre_ids = list(BookGenre.objects.filter(book_id__in=book_ids).values_list('genre_id', flat=True))
+        # У книг с тех же полок меняется число общих полок (Catalog.recommendations)
+        mark_stale(bookshelf_ids=Shelved.objects.filter(book_id__in=book_ids).values_list('bookshelf_id', flat=True))
+
+        with connection.cursor() as cursor:
+            for model, column in references:
+                cursor.execute(
+                    f'DELETE FROM {quote_name(model._meta.db_table)} WHERE {quote_name(column)} = ANY(%s)',
+                    [book_ids],
+                )
+            cursor.execute(
+                f'DELETE FROM {quote_name(Book._meta.db_table)} WHERE {quote_name(Book._meta.pk.column)} = ANY(%s)',
+                [book_ids],
+            )
+
+        change_counters(Author, 'books_count', {pk: -count for pk, count in Counter(books.values()).items()})
+        change_counters(Genre, 'books_count', {pk: -count for pk, count in Counter(genre_ids).items()})
+        touch_authors(set(books.values()))
+        refresh_facets(book_ids)
+        invalidate_fragments(Book, book_ids)
+        _invalidate_book_autocomplete()
+    return book_ids
@@ -0,0 +1,91 @@
+from django.db import connections, router
+
+from .models import Book, Bookshelf, StaleRecommendations
+
+Shelved = Bookshelf.book.through
+
+
+def _table_names(connection):
+    quote_name = connection.ops.quote_name
+    return {
+        'bookshelf': quote_name(Bookshelf._meta.db_table),
+        'bookshelf_pk': quote_name(Bookshelf._meta.pk.column),
+        'user': quote_name(Bookshelf._meta.get_field('user').column),
+        'shelved': quote_name(Shelved._meta.db_table),
+        'shelved_bookshelf': quote_name(Shelved._meta.get_field('bookshelf').column),
+        'shelved_book': quote_name(Shelved._meta.get_field('book').column),
+        'book': quote_name(Book._meta.db_table),
+        'book_pk': quote_name(Book._meta.pk.column),
+        'counter': quote_name(Book._meta.get_field('bookshelves_count').column),
+        'stale': quote_name(StaleRecommendations._meta.db_table),
+        'stale_book': quote_name(StaleRecommendations._meta.get_field('book').column),
+    }
+
+
+def add_books(user, books):
+    """
+    Добавляет книги из queryset books на полку пользователя одним запросом и возвращает
+    первичные ключи добавленных книг (без тех, что уже были на полке).
+    Полка создается тем же запросом (INSERT ... ON CONFLICT), а повторное добавление книги
+    игнорируется, поэтому одновременные запросы одного пользователя безопасны.
+    Тем же запросом увеличивается Book.bookshelves_count добавленных книг, а книги полки
+    ставятся в очередь на пересчет рекомендаций (Catalog.recommendations)
+    """
+    connection = connections[router.db_for_write(Shelved)]
+    books_sql, books_params = books.order_by().values('pk').query.get_compiler(connection=connection).as_sql()
+
+    sql = (
+        'WITH shelf AS ('
+        '  INSERT INTO {bookshelf} ({user}) VALUES (%s)'
+        '  ON CONFLICT ({user}) DO UPDATE SET {user} = EXCLUDED.{user}'
+        '  RETURNING {bookshelf_pk}'
+        '), added AS ('
+        '  INSERT INTO {shelved} ({shelved_bookshelf}, {shelved_book})'
+        '  SELECT shelf.{bookshelf_pk}, books.{book_pk} FROM shelf, ({books}) AS books'
+        '  ON CONFLICT ({shelved_bookshelf}, {shelved_book}) DO NOTHING'
+        '  RETURNING {shelved_book}'
+        '), counted AS ('
+        '  UPDATE {book} SET {counter} = {counter} + 1'
+        '  WHERE {book_pk} IN (SELECT {shelved_book} FROM added)'
+        '), stale AS ('
+        '  INSERT INTO {stale} ({stale_book})'
+        '  SELECT {shelved_book} FROM added'
+        '  UNION SELECT {shelved}.{shelved_book} FROM {shelved}, shelf'
+        '  WHERE {shelved}.{shelved_bookshelf} = shelf.{bookshelf_pk} AND EXISTS (SELECT 1 FROM added)'
+        '  ON CONFLICT DO NOTHING'
+        ') '
+        'SELECT {shelved_book} FROM added'
+    ).format(books=books_sql, **_table_names(connection))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.pk, *books_params])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def remove_books(user, book_ids):
+    """
+    Убирает книги book_ids с полки пользователя одним запросом и возвращает
+    первичные ключи убранных книг. Тем же запросом уменьшается Book.bookshelves_count,
+    а книги полки ставятся в очередь на пересчет рекомендаций
+    """
+    connection = connections[router.db_for_write(Shelved)]
+    sql = (
+        'WITH removed AS ('
+        '  DELETE FROM {shelved} USING {bookshelf}'
+        '  WHERE {shelved}.{shelved_bookshelf} = {bookshelf}.{bookshelf_pk}'
+        '  AND {bookshelf}.{user} = %s AND {shelved}.{shelved_book} = ANY(%s)'
+        '  RETURNING {shelved}.{shelved_book}'
+        '), counted AS ('
+        '  UPDATE {book} SET {counter} = GREATEST({counter} - 1, 0)'
+        '  WHERE {book_pk} IN (SELECT {shelved_book} FROM removed)'
+        '), stale AS ('
+        '  INSERT INTO {stale} ({stale_book})'
+        '  SELECT {shelved}.{shelved_book} FROM {shelved} JOIN {bookshelf}'
+        '  ON {shelved}.{shelved_bookshelf} = {bookshelf}.{bookshelf_pk}'
+        '  WHERE {bookshelf}.{user} = %s AND EXISTS (SELECT 1 FROM removed)'
+        '  ON CONFLICT DO NOTHING'
+        ') '
+        'SELECT {shelved_book} FROM removed'
+    ).format(**_table_names(connection))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.pk, list(book_ids), user.pk])
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,86 @@
+from django.db import connections, router
+
+
+def bulk_insert(model, fields, rows, inputs=(), computed=None):
+    """
+    Вставляет строки в таблицу модели одним запросом
+    INSERT ... SELECT ... FROM unnest(%s::тип[], ...) RETURNING pk
+    и возвращает первичные ключи в порядке строк.
+
+    fields   - имена полей модели, значения которых идут первыми в каждой строке rows;
+    inputs   - пары (имя, SQL-тип) для дополнительных значений строки, которые не вставляются
+               сами, а используются только в computed;
+    computed - {поле: SQL-выражение} для полей, вычисляемых в СУБД при вставке. В выражении
+               доступны столбцы полей (по имени столбца) и inputs (по имени).
+
+    В отличие от bulk_create в запрос передается по одному массиву на столбец, поэтому
+    число параметров не зависит от размера пачки. Значения передаются как есть (без
+    get_db_prep_save), сигналы и save() моделей не вызываются
+    """
+    if not rows:
+        return []
+
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    opts = model._meta
+    fields = [opts.get_field(name) for name in fields]
+    computed = {opts.get_field(name): sql for name, sql in (computed or {}).items()}
+
+    params = [list(column) for column in zip(*rows)]
+
+    names = [field.column for field in fields] + [name for name, _ in inputs]
+    types = [field.db_type(connection) for field in fields] + [sql_type for _, sql_type in inputs]
+    sql = (
+        'INSERT INTO {table} ({columns}) '
+        'SELECT {values} FROM unnest({arrays}) AS rows ({names}) '
+        'RETURNING {pk}'
+    ).format(
+        table=quote_name(opts.db_table),
+        columns=', '.join(quote_name(field.column) for field in [*fields, *computed]),
+        values=', '.join([*map(quote_name, names[:len(fields)]), *computed.values()]),
+        arrays=', '.join(f'%s::{sql_type}[]' for sql_type in types),
+        names=', '.join(map(quote_name, names)),
+        pk=quote_name(opts.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def bulk_update(model, fields, rows):
+    """
+    Обновляет строки таблицы модели одним запросом
+    UPDATE ... SET поле = rows.поле FROM unnest(%s::тип[], ...) AS rows WHERE pk = rows.pk.
+
+    rows - кортежи (pk, значения полей fields). В отличие от QuerySet.bulk_update, который
+    строит для каждого поля выражение CASE WHEN pk = ... с ветвью на каждый объект, запрос
+    и число параметров не зависят от размера пачки. Значения передаются как есть,
+    auto_now, сигналы и save() моделей не применяются
+    """
+    if not rows:
+        return 0
+
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    opts = model._meta
+    fields = [opts.pk, *(opts.get_field(name) for name in fields)]
+
+    params = [list(column) for column in zip(*rows)]
+    names = [f'value_{index}' for index in range(len(fields))]
+    sql = (
+        'UPDATE {table} SET {assignments} '
+        'FROM unnest({arrays}) AS rows ({names}) '
+        'WHERE {table}.{pk} = rows.{key}'
+    ).format(
+        table=quote_name(opts.db_table),
+        assignments=', '.join(
+            f'{quote_name(field.column)} = rows.{name}' for field, name in zip(fields[1:], names[1:])
+        ),
+        arrays=', '.join(f'%s::{field.db_type(connection)}[]' for field in fields),
+        names=', '.join(names),
+        pk=quote_name(opts.pk.column),
+        key=names[0],
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
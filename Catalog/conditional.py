@@ -0,0 +1,81 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from django.views.decorators.http import condition
+
+from users.roles import get_group_names
+
+
+class ConditionalGetMixin:
+    """
+    Ответ 304 Not Modified на условные GET-запросы (If-None-Match / If-Modified-Since).
+    Валидаторы (ETag и Last-Modified) вычисляются методом get_validators() одним легким
+    запросом до загрузки объекта, поэтому при совпадении страница не формируется.
+
+    etag_per_user = True - содержимое зависит от пользователя (HTML-страницы со ссылками
+    для персонала): пользователь и его группы входят в ETag, а Last-Modified отдается
+    только анонимным пользователям. Страницы пользователей содержат формы с токеном CSRF,
+    который меняется при входе, поэтому в ETag входит и секрет CSRF: иначе после повторного
+    входа браузер получил бы 304 и отправлял бы формы со старым токеном
+    """
+    etag_per_user = True
+
+    def get_validators(self):
+        """
+        Возвращает пару (ключ объекта, дата изменения) или None, если объект не найден
+        """
+        raise NotImplementedError
+
+    def get_etag_and_last_modified(self, request, validators):
+        key, last_modified = validators
+        parts = [key, last_modified.isoformat()]
+        if self.etag_per_user:
+            user = request.user
+            parts += [user.pk, *sorted(get_group_names(user))]
+            if user.is_authenticated:
+                parts.append(request.META.get('CSRF_COOKIE', ''))
+                last_modified = None
+        etag = hashlib.md5('|'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+        return etag, last_modified
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = self.get_etag_and_last_modified(request, validators)
+        view = condition(
+            etag_func=lambda *args, **kwargs: etag,
+            last_modified_func=lambda *args, **kwargs: last_modified,
+        )(super().get)
+        return view(request, *args, **kwargs)
+
+
+class AsyncConditionalGetMixin(ConditionalGetMixin):
+    """
+    ConditionalGetMixin для асинхронных представлений: валидаторы загружаются
+    асинхронным методом aget_validators()
+    """
+
+    async def aget_validators(self):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        validators = await self.aget_validators()
+        if validators is None:
+            return await super().get(request, *args, **kwargs)
+
+        # Пользователь и его группы загружаются синхронно (сессия, users.roles)
+        etag, last_modified = await sync_to_async(self.get_etag_and_last_modified)(request, validators)
+        etag = quote_etag(etag)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await super().get(request, *args, **kwargs)
+            if last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(last_modified)
+            response.headers.setdefault('ETag', etag)
+        return response
@@ -0,0 +1,92 @@
+from collections import Counter
+
+from django.db import connections, router
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Author, Book, Bookshelf, Genre
+
+# Денормализованные счетчики: (модель, поле счетчика) -> (модель связей, поле связи с моделью счетчика).
+# Счетчик равен числу строк модели связей, ссылающихся на объект
+COUNTERS = {
+    (Author, 'books_count'): (Book, 'author'),
+    (Genre, 'books_count'): (Book.genre.through, 'genre'),
+    (Book, 'bookshelves_count'): (Bookshelf.book.through, 'book'),
+}
+
+
+def change_counters(model, field, deltas):
+    """
+    Атомарно прибавляет к счетчику field объектов model значения deltas ({pk: приращение})
+    одним запросом UPDATE ... SET счетчик = счетчик + приращение FROM unnest(...).
+    Значение вычисляется в СУБД, поэтому одновременные изменения не теряются.
+    Счетчик не опускается ниже нуля: расхождения исправляет manage.py recount
+    """
+    deltas = Counter({pk: delta for pk, delta in Counter(deltas).items() if pk is not None and delta})
+    if not deltas:
+        return 0
+
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    opts = model._meta
+    pks = sorted(deltas)
+    sql = (
+        'UPDATE {table} SET {column} = GREATEST({column} + changes.delta, 0) '
+        'FROM unnest(%s::{pk_type}[], %s::integer[]) AS changes (pk, delta) '
+        'WHERE {table}.{pk} = changes.pk'
+    ).format(
+        table=quote_name(opts.db_table),
+        column=quote_name(opts.get_field(field).column),
+        pk_type=opts.pk.rel_db_type(connection),
+        pk=quote_name(opts.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [pks, [deltas[pk] for pk in pks]])
+        return cursor.rowcount
+
+
+def actual_count(model, field):
+    """
+    Выражение фактического значения счетчика: COUNT(*) по модели связей
+    """
+    related_model, lookup = COUNTERS[(model, field)]
+    count = (
+        related_model.objects.filter(**{lookup: OuterRef('pk')})
+        .order_by()
+        .values(lookup)
+        .annotate(count=Count('*'))
+        .values('count')
+    )
+    return Coalesce(Subquery(count, output_field=IntegerField()), Value(0))
+
+
+def pk_ranges(model, batch_size):
+    """
+    Делит таблицу модели на последовательные диапазоны первичных ключей (первый, последний)
+    по batch_size объектов для пакетных UPDATE
+    """
+    last_pk = None
+    queryset = model.objects.order_by('pk')
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        last_pk = pks[-1]
+        yield pks[0], last_pk
+
+
+def recount(model, field, batch_size=1000):
+    """
+    Пересчитывает счетчик field для всех объектов model пачками по batch_size первичных ключей
+    (каждая пачка - отдельный UPDATE, таблица не блокируется целиком).
+    Возвращает число исправленных объектов
+    """
+    fixed = 0
+    for first_pk, last_pk in pk_ranges(model, batch_size):
+        fixed += (
+            model.objects.filter(pk__gte=first_pk, pk__lte=last_pk)
+            .exclude(**{field: actual_count(model, field)})
+            .update(**{field: actual_count(model, field)})
+        )
+    return fixed
@@ -0,0 +1,125 @@
+import mimetypes
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+# Сколько секунд клиенты и прокси могут хранить файл книги без перепроверки
+BOOK_FILE_MAX_AGE = 60 * 60
+# Размер блока при отдаче части файла (Range) через Django
+RANGE_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range вида bytes=first-last, bytes=first- или bytes=-suffix.
+    Возвращает (начало, конец) включительно или None, если отдавать нужно весь файл:
+    заголовка нет, он некорректен или запрашивает несколько диапазонов.
+    Если диапазон начинается за концом файла, вызывает RangeNotSatisfiable
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(end, size - 1)
+
+
+def _read_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _sendfile_response(field_file):
+    """
+    Передает отправку файла фронтенд-серверу (settings.SENDFILE_BACKEND):
+    nginx сам отвечает на Range и условные запросы, Django не читает файл
+    """
+    if settings.SENDFILE_BACKEND == 'x-accel-redirect':
+        header, value = 'X-Accel-Redirect', settings.SENDFILE_ACCEL_PREFIX + quote(field_file.name)
+    else:
+        header, value = 'X-Sendfile', field_file.path
+
+    response = HttpResponse()
+    response[header] = value
+    return response
+
+
+def file_response(request, field_file, as_attachment=False, filename=None):
+    """
+    Ответ с файлом field_file (FieldFile) с поддержкой Range, ETag / Last-Modified и кеширования.
+    filename - имя файла для браузера (по умолчанию имя файла в хранилище).
+    Если настроен SENDFILE_BACKEND, содержимое отдает фронтенд-сервер
+    """
+    filename = filename or posixpath.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if settings.SENDFILE_BACKEND:
+        response = _sendfile_response(field_file)
+    else:
+        storage = field_file.storage
+        size = storage.size(field_file.name)
+        last_modified = storage.get_modified_time(field_file.name).timestamp()
+        etag = f'"{size:x}-{int(last_modified):x}"'
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        # If-Range: часть файла отдается, только если файл не изменился с прошлой загрузки
+        if_range = request.headers.get('If-Range')
+        if if_range and if_range != etag and parse_http_date_safe(if_range) != int(last_modified):
+            byte_range = None
+
+        if byte_range is None:
+            response = FileResponse(storage.open(field_file.name, 'rb'))
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(storage.open(field_file.name, 'rb'), start, end - start + 1), status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+
+    response['Content-Type'] = content_type
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    patch_cache_control(response, public=True, max_age=BOOK_FILE_MAX_AGE)
+    return response
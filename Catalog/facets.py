@@ -0,0 +1,187 @@
+"""
+Фасетный просмотр каталога: фильтры по жанру, автору и минимальному рейтингу
+с числом книг у каждого значения фильтра.
+
+Числа книг не считаются GROUP BY по книгам и их жанрам на каждый запрос, а хранятся в BookFacet:
+книга с автором a, жанрами g1..gn и целой частью рейтинга r дает по единице в строки
+(g, a, r) и (g, 0, r) для каждого жанра g из g1..gn и 0, где 0 означает "любой".
+Тогда, например, число книг жанра g у автора a с рейтингом от 4 - сумма двух строк
+(g, a, 4) и (g, a, 5), а список жанров с числами книг для текущих фильтров - группировка
+нескольких строк BookFacet, а не всей таблицы книг.
+
+Счетчики обновляются инкрементально (refresh_facets) по разнице между текущим состоянием
+книги и ее вкладом, сохраненным в BookFacetState, поэтому пересчет идемпотентен.
+Полный пересчет - manage.py rebuild_facets
+"""
+from collections import Counter
+
+from django.db import connections, router, transaction
+from django.db.models import Sum
+
+from .models import Author, Book, BookFacet, BookFacetState, Genre
+
+# Сколько авторов с наибольшим числом книг показывается в фасете авторов
+AUTHOR_FACET_LIMIT = 20
+# Значения фильтра минимального рейтинга
+RATING_FACET_VALUES = (5, 4, 3, 2, 1)
+
+
+def _table_names(connection):
+    quote_name = connection.ops.quote_name
+    return {
+        'book': quote_name(Book._meta.db_table),
+        'book_pk': quote_name(Book._meta.pk.column),
+        'book_author': quote_name(Book._meta.get_field('author').column),
+        'book_rating': quote_name(Book._meta.get_field('rating').column),
+        'book_genre': quote_name(Book.genre.through._meta.db_table),
+        'book_genre_book': quote_name(Book.genre.through._meta.get_field('book').column),
+        'book_genre_genre': quote_name(Book.genre.through._meta.get_field('genre').column),
+        'facet': quote_name(BookFacet._meta.db_table),
+        'state': quote_name(BookFacetState._meta.db_table),
+    }
+
+
+def facet_cells(author_id, genre_ids, rating):
+    """
+    Строки BookFacet (жанр, автор, рейтинг), в которые книга добавляет единицу
+    """
+    authors = [author_id, 0] if author_id else [0]
+    return [(genre_id, author, rating) for genre_id in [*genre_ids, 0] for author in authors]
+
+
+def refresh_facets(book_ids):
+    """
+    Приводит вклад книг book_ids (в том числе удаленных) в BookFacet к их текущему состоянию.
+    Вклад книг блокируется (SELECT ... FOR UPDATE) до конца транзакции, поэтому одновременные
+    пересчеты одной книги выполняются по очереди и не считают ее дважды
+    """
+    book_ids = sorted({book_id for book_id in book_ids if book_id is not None})
+    if not book_ids:
+        return
+
+    connection = connections[router.db_for_write(BookFacet)]
+    tables = _table_names(connection)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Пустая строка вклада для новых книг, чтобы ее можно было заблокировать
+        cursor.execute(
+            'INSERT INTO {state} (book_id) SELECT unnest(%s::bigint[]) ON CONFLICT DO NOTHING'.format(**tables),
+            [book_ids],
+        )
+        cursor.execute(
+            'SELECT book_id, author_id, genre_ids, rating FROM {state} '
+            'WHERE book_id = ANY(%s) ORDER BY book_id FOR UPDATE'.format(**tables),
+            [book_ids],
+        )
+        old = {book_id: (author_id, genre_ids, rating) for book_id, author_id, genre_ids, rating in cursor.fetchall()}
+        cursor.execute(
+            'SELECT b.{book_pk}, b.{book_author}, '
+            'COALESCE(array_agg(g.{book_genre_genre}) FILTER (WHERE g.{book_genre_genre} IS NOT NULL), %s), '
+            'floor(b.{book_rating})::integer '
+            'FROM {book} b LEFT JOIN {book_genre} g ON g.{book_genre_book} = b.{book_pk} '
+            'WHERE b.{book_pk} = ANY(%s) GROUP BY b.{book_pk}'.format(**tables),
+            [[], book_ids],
+        )
+        new = {book_id: (author_id, sorted(genre_ids), rating) for book_id, author_id, genre_ids, rating in cursor.fetchall()}
+
+        deltas = Counter()
+        for book_id in book_ids:
+            author_id, genre_ids, rating = old.get(book_id, (None, None, None))
+            if genre_ids is not None:
+                deltas.subtract(facet_cells(author_id, genre_ids, rating))
+            if book_id in new:
+                deltas.update(facet_cells(*new[book_id]))
+
+        cells = sorted(cell for cell, delta in deltas.items() if delta)
+        if cells:
+            cursor.execute(
+                'INSERT INTO {facet} (genre_id, author_id, rating, books_count) '
+                'SELECT * FROM unnest(%s::bigint[], %s::bigint[], %s::smallint[], %s::integer[]) '
+                'ON CONFLICT (genre_id, author_id, rating) '
+                'DO UPDATE SET books_count = {facet}.books_count + EXCLUDED.books_count'.format(**tables),
+                [[cell[0] for cell in cells], [cell[1] for cell in cells], [cell[2] for cell in cells],
+                 [deltas[cell] for cell in cells]],
+            )
+
+        changed = [book_id for book_id in new if old.get(book_id) != new[book_id]]
+        if changed:
+            cursor.execute(
+                'UPDATE {state} SET author_id = changes.author_id, rating = changes.rating, '
+                'genre_ids = string_to_array(changes.genre_ids, \',\')::bigint[] '
+                'FROM unnest(%s::bigint[], %s::bigint[], %s::text[], %s::smallint[]) '
+                'AS changes (book_id, author_id, genre_ids, rating) '
+                'WHERE {state}.book_id = changes.book_id'.format(**tables),
+                [changed, [new[book_id][0] for book_id in changed],
+                 [','.join(map(str, new[book_id][1])) for book_id in changed],
+                 [new[book_id][2] for book_id in changed]],
+            )
+        deleted = [book_id for book_id in book_ids if book_id not in new]
+        if deleted:
+            cursor.execute('DELETE FROM {state} WHERE book_id = ANY(%s)'.format(**tables), [deleted])
+
+
+def rebuild_facets():
+    """
+    Пересчитывает BookFacet и BookFacetState заново по всем книгам.
+    На время пересчета инкрементальные изменения счетчиков ждут его завершения
+    """
+    connection = connections[router.db_for_write(BookFacet)]
+    tables = _table_names(connection)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute('LOCK TABLE {state}, {facet} IN SHARE ROW EXCLUSIVE MODE'.format(**tables))
+        cursor.execute('DELETE FROM {state}'.format(**tables))
+        cursor.execute('DELETE FROM {facet}'.format(**tables))
+        cursor.execute(
+            'INSERT INTO {state} (book_id, author_id, genre_ids, rating) '
+            'SELECT b.{book_pk}, b.{book_author}, '
+            'COALESCE(array_agg(g.{book_genre_genre} ORDER BY g.{book_genre_genre}) '
+            'FILTER (WHERE g.{book_genre_genre} IS NOT NULL), %s), '
+            'floor(b.{book_rating})::integer '
+            'FROM {book} b LEFT JOIN {book_genre} g ON g.{book_genre_book} = b.{book_pk} '
+            'GROUP BY b.{book_pk}'.format(**tables),
+            [[]],
+        )
+        # То же разложение на строки, что и facet_cells()
+        cursor.execute(
+            'INSERT INTO {facet} (genre_id, author_id, rating, books_count) '
+            'SELECT genres.genre_id, authors.author_id, s.rating, count(*) FROM {state} s, '
+            'unnest(s.genre_ids || 0::bigint) AS genres (genre_id), '
+            'unnest(CASE WHEN s.author_id IS NULL THEN ARRAY[0::bigint] ELSE ARRAY[s.author_id, 0] END) '
+            'AS authors (author_id) '
+            'GROUP BY genres.genre_id, authors.author_id, s.rating'.format(**tables)
+        )
+        return cursor.rowcount
+
+
+def facet_counts(genre=None, author=None, min_rating=None):
+    """
+    Числа книг для каждого значения фасетов при текущих фильтрах (genre, author - объекты или None):
+    {'genres': [(жанр, число)], 'authors': [(автор, число)], 'ratings': [(минимальный рейтинг, число)]}.
+    Число у значения фасета - сколько книг останется, если выбрать это значение вместо текущего
+    """
+    genre_id = genre.pk if genre else 0
+    author_id = author.pk if author else 0
+    min_rating = min_rating or 0
+    facets = BookFacet.objects.filter(books_count__gt=0)
+
+    genre_counts = dict(
+        facets.filter(author_id=author_id, rating__gte=min_rating).exclude(genre_id=0)
+        .values('genre_id').annotate(count=Sum('books_count')).values_list('genre_id', 'count')
+    )
+    author_counts = dict(
+        facets.filter(genre_id=genre_id, rating__gte=min_rating).exclude(author_id=0)
+        .values('author_id').annotate(count=Sum('books_count'))
+        .order_by('-count', 'author_id').values_list('author_id', 'count')[:AUTHOR_FACET_LIMIT]
+    )
+    by_rating = dict(facets.filter(genre_id=genre_id, author_id=author_id).values_list('rating', 'books_count'))
+
+    genres = Genre.objects.in_bulk(genre_counts)
+    authors = Author.objects.only('id', 'slug', 'first_name', 'last_name').in_bulk(author_counts)
+    return {
+        'genres': sorted(((genres[pk], count) for pk, count in genre_counts.items() if pk in genres),
+                         key=lambda item: item[0].genre),
+        'authors': [(authors[pk], count) for pk, count in author_counts.items() if pk in authors],
+        'ratings': [
+            (value, sum(count for rating, count in by_rating.items() if rating >= value))
+            for value in RATING_FACET_VALUES
+        ],
+    }
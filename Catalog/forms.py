@@ -2,15 +2,21 @@ from django import forms
 from django.core.exceptions import ValidationError
 
 from .models import Book, Author, Genre
+from .widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 
-# Форма для добавления новой книги (модель Book)
+# Форма для добавления и изменения книги (модель Book).
+# Автор и жанры выбираются с подсказками, а не из полного списка
 class AddBookForm(forms.ModelForm):
-    author = forms.ModelChoiceField(queryset=Author.objects.all(), empty_label='Автор не выбран')
+    author = forms.ModelChoiceField(queryset=Author.objects.all(), empty_label='Автор не выбран',
+                                    widget=AutocompleteSelect('author'))
 
     class Meta:
         model = Book
         fields = ['title', 'author', 'genre', 'about', 'link_to_file', 'image']
+        widgets = {
+            'genre': AutocompleteSelectMultiple('genre'),
+        }
         error_messages = {
             'title': {
                 'unique': 'Такая книга уже существует'
@@ -0,0 +1,48 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ReadMe.db_router import reads_from_replica
+
+# Время жизни закешированного HTML элемента списка (секунды)
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(model, pk):
+    return f'catalog:fragment-version:{model._meta.label_lower}:{pk}'
+
+
+def _changed_key(model, pk):
+    return f'catalog:fragment-changed:{model._meta.label_lower}:{pk}'
+
+
+def fragment_key(name, obj):
+    """
+    Ключ кеша фрагмента name (например, 'book_list_item') для объекта obj.
+    В ключ входит версия содержимого объекта, которая меняется при его изменении
+    (invalidate_fragments), поэтому устаревшие фрагменты просто перестают читаться
+    """
+    version_key = _version_key(type(obj), obj.pk)
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid4().hex
+        cache.set(version_key, version, None)
+    return f'catalog:fragment:{name}:{obj._meta.label_lower}:{obj.pk}:{version}'
+
+
+def invalidate_fragments(model, pks):
+    """
+    Сбрасывает закешированные фрагменты объектов модели model сменой версии их содержимого
+    """
+    cache.set_many({_version_key(model, pk): uuid4().hex for pk in pks}, None)
+    cache.set_many({_changed_key(model, pk): True for pk in pks}, settings.DATABASE_REPLICA_LAG)
+
+
+def can_cache_fragment(obj):
+    """
+    Можно ли сохранить в кеш фрагмент объекта obj, построенный в текущем запросе.
+    Нельзя, если данные читались с реплики, а объект изменился меньше DATABASE_REPLICA_LAG секунд
+    назад: реплика могла еще не получить изменение, и прежний HTML попал бы в кеш под новой версией
+    """
+    return not reads_from_replica() or cache.get(_changed_key(type(obj), obj.pk)) is None
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Catalog.recommendations import RECOMMENDATIONS_TOP_K, build_recommendations, rebuild_stale
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит рекомендации "Читатели также добавляли" по совместной встречаемости книг на книжных полках. '
+        'С --stale пересчитывает только книги, у которых изменились полки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', action='store_true',
+                            help='пересчитать только книги из очереди изменений (для запуска по расписанию)')
+        parser.add_argument('--top-k', type=int, default=RECOMMENDATIONS_TOP_K,
+                            help=f'сколько рекомендаций хранить для книги (по умолчанию {RECOMMENDATIONS_TOP_K})')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='сколько книг пересчитывается одним запросом (по умолчанию 1000)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['stale']:
+            count = rebuild_stale(options['top_k'], options['batch_size'])
+            message = f'Пересчитаны рекомендации книг: {count}'
+        else:
+            count = build_recommendations(options['top_k'], options['batch_size'])
+            message = f'Рекомендации построены, изменились у книг: {count}'
+        self.stdout.write(f'{message} ({time.perf_counter() - started:.1f} с)')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from Catalog.renditions import generate_renditions
+from Catalog.signals import IMAGE_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии для уже загруженных изображений книг, авторов и пользователей'
+
+    def handle(self, *args, **options):
+        for model in IMAGE_MODELS:
+            images = 0
+            queryset = model.objects.exclude(image='').exclude(image__isnull=True).only('pk', 'image')
+            for instance in queryset.iterator():
+                if generate_renditions(instance.image):
+                    images += 1
+            self.stdout.write(f'{model._meta.verbose_name_plural}: обработано изображений {images}')
@@ -0,0 +1,250 @@
+import csv
+import json
+import time
+from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from slugify import slugify
+
+from Catalog.autocomplete import invalidate_autocomplete
+from Catalog.counters import change_counters
+from Catalog.facets import refresh_facets
+from Catalog.models import Author, Book, Genre
+from Catalog.search import search_vector_sql
+
+# Временная таблица, через которую пачки книг загружаются командой COPY
+STAGING_TABLE = 'import_catalog_books'
+
+
+def read_records(path):
+    """
+    Построчно читает записи из CSV (с заголовком) или JSONL файла
+    """
+    path = Path(path)
+    if not path.exists():
+        raise CommandError(f'Файл {path} не найден')
+
+    with path.open(encoding='utf-8', newline='') as file:
+        if path.suffix == '.csv':
+            yield from csv.DictReader(file)
+        elif path.suffix in ('.jsonl', '.ndjson'):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise CommandError(f'Неизвестный формат файла {path}: ожидается .csv или .jsonl')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def split_genres(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(';')
+    return [genre.strip() for genre in value if genre.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Импорт авторов, жанров и книг из CSV/JSONL файлов. '
+        'Авторы и жанры ищутся по словарям в памяти, запись идет пачками (bulk_create, книги - через COPY)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', help='файл авторов: first_name, last_name, date_of_birth, '
+                                              'date_of_death, about')
+        parser.add_argument('--genres', help='файл жанров: genre')
+        parser.add_argument('--books', help='файл книг: title, author ("Имя Фамилия"), '
+                                            'genres (через ";" в CSV или списком в JSONL), about')
+        parser.add_argument('--batch-size', type=int, default=5000, help='размер пачки (по умолчанию 5000)')
+        parser.add_argument('--offset', type=int, default=0,
+                            help='пропустить первые N записей книг (продолжение прерванного импорта)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='выполнить импорт и откатить транзакцию, ничего не сохраняя')
+
+    def handle(self, *args, **options):
+        if not any(options[name] for name in ('authors', 'genres', 'books')):
+            raise CommandError('Укажите хотя бы один файл: --authors, --genres или --books')
+
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+
+        # В режиме dry-run весь импорт идет в одной транзакции, которая откатывается в конце.
+        # Иначе каждая пачка фиксируется отдельно, и после сбоя импорт можно продолжить с --offset
+        with transaction.atomic() if self.dry_run else nullcontext():
+            self.authors = {}
+            self.author_names = {}
+            for pk, slug, first_name, last_name in Author.objects.values_list(
+                    'pk', 'slug', 'first_name', 'last_name'):
+                self.add_author(pk, slug, first_name, last_name)
+            self.genres = dict(Genre.objects.values_list('genre', 'pk'))
+
+            try:
+                if options['authors']:
+                    self.import_authors(read_records(options['authors']))
+                if options['genres']:
+                    self.import_genres(read_records(options['genres']))
+                if options['books']:
+                    self.import_books(read_records(options['books']), options['offset'])
+            finally:
+                # Объекты вставляются в обход сигналов, поэтому индексы автодополнения
+                # перестраиваются заново, в том числе после сбоя на середине импорта
+                if not self.dry_run:
+                    invalidate_autocomplete()
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+                self.stdout.write(self.style.WARNING('Dry run: изменения отменены'))
+
+    def add_author(self, pk, slug, first_name, last_name):
+        # Авторы ищутся по slug при импорте авторов и по полному имени при импорте книг
+        self.authors[slug] = pk
+        self.author_names[f'{first_name} {last_name}'] = pk
+
+    def batch_transaction(self):
+        return nullcontext() if self.dry_run else transaction.atomic()
+
+    def report(self, name, processed, created, skipped, started, offset=None):
+        elapsed = time.perf_counter() - started
+        message = (f'{name}: обработано {processed}, создано {created}, пропущено {skipped}, '
+                   f'{processed / elapsed if elapsed else 0:.0f} записей/с')
+        if offset is not None:
+            message += f' (для продолжения: --offset {offset})'
+        self.stdout.write(message)
+
+    def import_authors(self, records):
+        processed = created = skipped = 0
+        started = time.perf_counter()
+
+        for batch in batched(records, self.batch_size):
+            new_authors = []
+            for record in batch:
+                slug = slugify(f'{record["first_name"]} {record["last_name"]}')
+                if slug in self.authors:
+                    skipped += 1
+                    continue
+                self.authors[slug] = None
+                new_authors.append(Author(
+                    first_name=record['first_name'],
+                    last_name=record['last_name'],
+                    slug=slug,
+                    date_of_birth=record['date_of_birth'],
+                    date_of_death=record.get('date_of_death') or None,
+                    about=record.get('about') or None,
+                ))
+
+            with self.batch_transaction():
+                Author.objects.bulk_create(new_authors)
+            for author in new_authors:
+                self.add_author(author.pk, author.slug, author.first_name, author.last_name)
+
+            processed += len(batch)
+            created += len(new_authors)
+            self.report('Авторы', processed, created, skipped, started)
+
+    def import_genres(self, records):
+        processed = created = skipped = 0
+        started = time.perf_counter()
+
+        for batch in batched(records, self.batch_size):
+            new_genres = []
+            for record in batch:
+                name = record['genre'].strip()
+                if name in self.genres:
+                    skipped += 1
+                    continue
+                self.genres[name] = None
+                new_genres.append(Genre(genre=name, slug=slugify(name)))
+
+            with self.batch_transaction():
+                Genre.objects.bulk_create(new_genres)
+            self.genres.update((genre.genre, genre.pk) for genre in new_genres)
+
+            processed += len(batch)
+            created += len(new_genres)
+            self.report('Жанры', processed, created, skipped, started)
+
+    def import_books(self, records, offset):
+        processed = created = skipped = 0
+        started = time.perf_counter()
+        connection = connections[router.db_for_write(Book)]
+        quote_name = connection.ops.quote_name
+        BookGenre = Book.genre.through
+        tables = {
+            'book': quote_name(Book._meta.db_table),
+            'book_genre': quote_name(BookGenre._meta.db_table),
+            'book_genre_book': quote_name(BookGenre._meta.get_field('book').column),
+            'book_genre_genre': quote_name(BookGenre._meta.get_field('genre').column),
+            'staging': quote_name(STAGING_TABLE),
+            # Поисковый вектор вычисляется прямо при вставке: автор и жанры уже известны
+            'search_vector': search_vector_sql('s.title', 's.author_name', 's.genre_names', 's.about'),
+        }
+
+        with connection.cursor() as cursor:
+            # Пачка загружается в эту таблицу одним COPY, а в таблицы книг и жанров книг переносится
+            # одним INSERT ... SELECT. Временная таблица не пишется в WAL и видна только этому соединению
+            cursor.execute(
+                'CREATE TEMPORARY TABLE IF NOT EXISTS {staging} (title text, slug text, author_id bigint, '
+                'about text, author_name text, genre_names text, genre_ids bigint[])'.format(**tables)
+            )
+
+            for batch in batched(islice(records, offset, None), self.batch_size):
+                books = {}
+                for record in batch:
+                    title = record['title'].strip()
+                    slug = slugify(title)
+                    author_name = ' '.join((record.get('author') or '').split())
+                    author_id = self.author_names.get(author_name) if author_name else None
+                    genre_names = split_genres(record.get('genres'))
+                    genre_ids = {self.genres.get(name) for name in genre_names}
+
+                    if slug in books or (author_name and author_id is None) or None in genre_ids:
+                        skipped += 1
+                        continue
+                    books[slug] = (title, slug, author_id, record.get('about') or '', author_name,
+                                   ' '.join(genre_names), sorted(genre_ids))
+
+                with self.batch_transaction():
+                    cursor.execute('TRUNCATE {staging}'.format(**tables))
+                    with cursor.copy('COPY {staging} FROM STDIN'.format(**tables)) as copy:
+                        for row in books.values():
+                            copy.write_row(row)
+                    # Книги, название или slug которых уже заняты, пропускаются
+                    cursor.execute(
+                        'DELETE FROM {staging} s WHERE EXISTS (SELECT 1 FROM {book} b WHERE b.title = s.title) '
+                        'OR EXISTS (SELECT 1 FROM {book} b WHERE b.slug = s.slug)'.format(**tables)
+                    )
+                    skipped += cursor.rowcount
+                    cursor.execute(
+                        'WITH books AS ('
+                        'INSERT INTO {book} (title, slug, author_id, about, search_vector, bookshelves_count, '
+                        'rating, rating_sum, rating_count, updated_at) '
+                        'SELECT s.title, s.slug, s.author_id, s.about, {search_vector}, 0, 0, 0, 0, now() '
+                        'FROM {staging} s RETURNING id, slug, author_id'
+                        '), links AS ('
+                        'INSERT INTO {book_genre} ({book_genre_book}, {book_genre_genre}) '
+                        'SELECT books.id, unnest(s.genre_ids) FROM books JOIN {staging} s USING (slug)'
+                        ') '
+                        'SELECT books.id, books.author_id, s.genre_ids FROM books JOIN {staging} s USING (slug)'
+                        .format(**tables)
+                    )
+                    inserted = cursor.fetchall()
+                    book_ids = [book_id for book_id, _, _ in inserted]
+                    # Вставка идет в обход сигналов: счетчики книг авторов и жанров обновляются здесь
+                    change_counters(Author, 'books_count', Counter(author_id for _, author_id, _ in inserted))
+                    change_counters(Genre, 'books_count', Counter(
+                        genre_id for _, _, genre_ids in inserted for genre_id in genre_ids))
+                    refresh_facets(book_ids)
+
+                processed += len(batch)
+                created += len(book_ids)
+                self.report('Книги', processed, created, skipped, started, offset=offset + processed)
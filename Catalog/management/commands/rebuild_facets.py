@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from Catalog.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счетчики фасетного просмотра (жанр, автор, рейтинг) по всем книгам. '
+        'Нужен после изменений книг в обход сигналов: queryset.update(), прямые SQL-запросы, recompute_ratings'
+    )
+
+    def handle(self, *args, **options):
+        cells = rebuild_facets()
+        self.stdout.write(f'Счетчики фасетов пересчитаны, строк: {cells}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from Catalog.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сумму, число и среднюю оценку книг по оценкам пользователей. '
+        'Нужен после изменений оценок в обход сигналов: queryset.update(), прямые SQL-запросы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='сколько книг пересчитывается одним запросом (по умолчанию 1000)')
+
+    def handle(self, *args, **options):
+        fixed = recompute_ratings(options['batch_size'])
+        self.stdout.write(f'Книги: исправлено {fixed}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from Catalog.counters import COUNTERS, recount
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счетчики (книги авторов и жанров, книжные полки книг) '
+        'по фактическим связям. Нужен после изменений в обход сигналов: '
+        'queryset.update(), прямые SQL-запросы, восстановление из резервной копии'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='сколько объектов пересчитывается одним запросом (по умолчанию 1000)')
+
+    def handle(self, *args, **options):
+        for model, field in COUNTERS:
+            fixed = recount(model, field, options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}.{field}: исправлено {fixed}')
@@ -1,5 +1,8 @@
 from django.db import models
-from django.core.validators import MaxValueValidator
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
@@ -8,9 +11,28 @@ from ReadMe.settings import MEDIA_ROOT
 from slugify import slugify
 
 
+class CounterFieldsMixin:
+    """
+    Денормализованные счетчики (counter_fields) меняются только запросами
+    UPDATE ... SET счетчик = счетчик + n (Catalog.counters), поэтому save() существующего объекта
+    их не перезаписывает: иначе устаревшее значение из памяти затерло бы одновременные изменения
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        return super().save(*args, **kwargs)
+
+
 # Модель представления автора с основной информацией, которая включает имя, фамилию,
 # slug, дату рождения и смерти, описание автора
-class Author(models.Model):
+class Author(CounterFieldsMixin, models.Model):
     first_name = models.CharField(max_length=50, db_index=True, verbose_name='Имя')
     last_name = models.CharField(max_length=50, db_index=True, verbose_name='Фамилия')
     slug = models.SlugField(max_length=200, unique=True, db_index=True)
@@ -26,6 +48,11 @@ class Author(models.Model):
         return f'authors/{instance.slug}/{new_filename}'
 
     image = models.ImageField(upload_to=author_media_path, null=True, blank=True, verbose_name='Изображение')
+    # Число книг автора, поддерживается сигналами (Catalog.signals), пересчет - manage.py recount
+    books_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество книг')
+    counter_fields = ('books_count', )
+    # Время последнего изменения автора или списка его книг (Catalog.signals), нужно для условных GET-запросов
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
 
     def save(self, *args, **kwargs):
         # Создание slug на основе имени и фамилии автора
@@ -46,9 +73,12 @@ class Author(models.Model):
 
 
 # Модель представления жанра книги с информацией о названии жанра и его slug
-class Genre(models.Model):
+class Genre(CounterFieldsMixin, models.Model):
     genre = models.CharField(max_length=100, db_index=True, unique=True, verbose_name='Жанр')
     slug = models.SlugField(max_length=150, unique=True, db_index=True)
+    # Число книг жанра, поддерживается сигналами (Catalog.signals), пересчет - manage.py recount
+    books_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество книг')
+    counter_fields = ('books_count', )
 
     def save(self, *args, **kwargs):
         # Создание slug на основе названия жанра
@@ -64,15 +94,88 @@ class Genre(models.Model):
         return self.genre
 
 
+def title_author_search_vector():
+    """
+    Часть поискового вектора книги с весами A и B - название и имя автора (Catalog.search).
+    Для выражения есть GIN-индекс, поэтому совпадения по нему находятся без просмотра всех совпадений
+    """
+    return models.Func(
+        models.F('search_vector'), template="ts_filter(%(expressions)s, '{a,b}')", output_field=SearchVectorField())
+
+
+class BookQuerySet(models.QuerySet):
+    """
+    Набор запросов к книгам с выборками под конкретные страницы:
+    загружаются только нужные поля, а связанные объекты подтягиваются фиксированным числом запросов
+    """
+
+    def for_list(self):
+        """
+        Карточка книги в списках: обложка, название, ссылка, описание и рейтинг.
+        author_id нужен менеджерам author.book_set, которые проставляют автора в каждую книгу
+        """
+        return self.only('id', 'title', 'slug', 'author_id', 'about', 'image', 'rating', 'rating_count')
+
+    def for_detail(self):
+        """
+        Страница книги: автор через JOIN, жанры одним дополнительным запросом
+        """
+        return (
+            self.select_related('author')
+            .prefetch_related(models.Prefetch('genre', queryset=Genre.objects.only('id', 'genre')))
+            .defer('search_vector')
+        )
+
+    def for_admin(self):
+        """
+        Список книг в админке (BookAdmin.list_display): только столбцы списка, автор через JOIN,
+        жанры всей страницы одним дополнительным запросом
+        """
+        return (
+            self.select_related('author')
+            .prefetch_related(models.Prefetch('genre', queryset=Genre.objects.only('id', 'genre')))
+            .only('id', 'title', 'rating', 'rating_count', 'bookshelves_count',
+                  'author__id', 'author__first_name', 'author__last_name')
+        )
+
+    def for_api(self, fields=None, expand=()):
+        """
+        Поля BookSerializer: жанры отдаются списком первичных ключей.
+        fields - загружаемые поля книги (None - все поля сериализатора), expand - связи,
+        которые отдаются объектами: автор подтягивается через JOIN, жанры - одним запросом на страницу
+        """
+        if fields is None:
+            fields = ('title', 'slug', 'author', 'genre', 'about', 'rating', 'rating_count')
+        columns = ['id', *(field for field in fields if field not in ('author', 'genre'))]
+        queryset = self
+        if 'author' in fields:
+            if 'author' in expand:
+                columns += ['author__id', 'author__first_name', 'author__last_name', 'author__slug']
+                queryset = queryset.select_related('author')
+            else:
+                columns.append('author_id')
+        if 'genre' in fields:
+            genre_fields = ('id', 'genre', 'slug') if 'genre' in expand else ('id',)
+            queryset = queryset.prefetch_related(
+                models.Prefetch('genre', queryset=Genre.objects.only(*genre_fields))
+            )
+        return queryset.only(*columns)
+
+
 # Модель представления автора с основной информацией, которая включает название, slug, автора,
 # список жанров книги, описание книги и ее рейтинг
-class Book(models.Model):
+class Book(CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=150, unique=True, db_index=True, verbose_name='Название')
     slug = models.SlugField(max_length=200, unique=True, db_index=True, default=slugify(f'{title}'))
-    author = models.ForeignKey(Author, null=True, on_delete=models.SET_NULL, verbose_name='Автор')
+    # Отдельный индекс внешнего ключа не нужен: его заменяет book_author_title_idx (author, title, id)
+    author = models.ForeignKey(Author, null=True, on_delete=models.SET_NULL, verbose_name='Автор', db_index=False)
     genre = models. ManyToManyField(Genre, verbose_name='Жанр')
     about = models.TextField(verbose_name='Описание книги')
-    rating = models.PositiveSmallIntegerField(validators=[MaxValueValidator(5)], default=0, verbose_name='Рейтинг')
+    # Средняя оценка пользователей (Rating), сумма и число оценок поддерживаются сигналами (Catalog.signals),
+    # поэтому средняя читается без агрегации. Пересчет - manage.py recompute_ratings
+    rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False, verbose_name='Рейтинг')
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок')
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок')
 
     def book_directory_path(instance, filename):
         """
@@ -83,6 +186,16 @@ class Book(models.Model):
 
     link_to_file = models.FileField(upload_to=book_directory_path, null=True, blank=True, verbose_name='Путь до файла')
     image = models.ImageField(upload_to=book_directory_path, null=True, blank=True, verbose_name='Изображение')
+    # Взвешенный поисковый вектор (название, автор, жанры, описание), обновляется в Catalog.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Число книжных полок с этой книгой, поддерживается сигналами (Catalog.signals) и Catalog.bookshelf,
+    # пересчет - manage.py recount
+    bookshelves_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='На книжных полках')
+    counter_fields = ('bookshelves_count', 'rating', 'rating_sum', 'rating_count')
+    # Время последнего изменения книги, ее автора или жанров (Catalog.signals), нужно для условных GET-запросов
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+
+    objects = BookQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.title)
@@ -90,7 +203,8 @@ class Book(models.Model):
 
     def display_genre(self):
         """
-        Возвращает список из 3-х жанров книги
+        Возвращает список из 3-х жанров книги.
+        Если жанры загружены через prefetch_related (BookQuerySet.for_admin), запрос не выполняется
         """
         return ', '.join([genre.genre for genre in self.genre.all()[:3]])
     display_genre.short_description = 'Genre'
@@ -105,6 +219,30 @@ class Book(models.Model):
         ordering = ['title', 'author']
         verbose_name = 'Книга'
         verbose_name_plural = 'Книги'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='book_search_vector_gin'),
+            GinIndex(title_author_search_vector(), name='book_search_title_author_gin'),
+            # Сортировка по рейтингу (?ordering=rating) с пагинацией по курсору
+            models.Index(fields=['-rating', 'title'], name='book_rating_title_idx'),
+            # Фильтр по автору (?author=) с сортировкой по названию
+            models.Index(fields=['author', 'title', 'id'], name='book_author_title_idx'),
+        ]
+
+
+# Модель оценки книги пользователем (от 1 до 5), одна оценка пользователя на книгу
+class Rating(models.Model):
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, verbose_name='Пользователь')
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='ratings', verbose_name='Книга')
+    score = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)],
+                                             verbose_name='Оценка')
+
+    class Meta:
+        verbose_name = 'Оценка'
+        verbose_name_plural = 'Оценки'
+        unique_together = ('user', 'book')
+
+    def __str__(self):
+        return f'{self.user}: {self.book} - {self.score}'
 
 
 # Модель представления книжной полки с основной информацией, которая включает пользователя и список книг
@@ -119,3 +257,62 @@ class Bookshelf(models.Model):
 
     def __str__(self):
         return f'Книжная полка пользователя {self.user}'
+
+
+# Модель рекомендации "Читатели также добавляли": книга neighbour, которая чаще других стоит на одних
+# книжных полках с книгой book. Для каждой книги хранится не больше RECOMMENDATIONS_TOP_K соседей,
+# таблица строится командой manage.py build_recommendations (Catalog.recommendations)
+class BookNeighbour(models.Model):
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='neighbours', verbose_name='Книга')
+    neighbour = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='neighbour_of',
+                                  verbose_name='Рекомендуемая книга')
+    score = models.PositiveIntegerField(verbose_name='Общих книжных полок')
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        indexes = [
+            models.Index(fields=['book', '-score'], name='book_neighbour_score_idx'),
+        ]
+
+
+# Книги, у которых изменились книжные полки: их рекомендации пересчитываются
+# командой manage.py build_recommendations --stale
+class StaleRecommendations(models.Model):
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, verbose_name='Книга')
+
+    class Meta:
+        verbose_name = 'Устаревшие рекомендации'
+        verbose_name_plural = 'Устаревшие рекомендации'
+
+
+# Модель счетчика фасетного поиска (Catalog.facets): число книг жанра genre_id, автора author_id
+# с целой частью рейтинга rating. 0 в genre_id / author_id означает "любой" (итог по измерению),
+# поэтому число книг для любой комбинации фильтров читается из одной строки или небольшой группы строк
+class BookFacet(models.Model):
+    genre_id = models.BigIntegerField(default=0, verbose_name='Жанр')
+    author_id = models.BigIntegerField(default=0, verbose_name='Автор')
+    rating = models.PositiveSmallIntegerField(default=0, verbose_name='Рейтинг')
+    books_count = models.IntegerField(default=0, verbose_name='Количество книг')
+
+    class Meta:
+        verbose_name = 'Счетчик фасета'
+        verbose_name_plural = 'Счетчики фасетов'
+        unique_together = ('genre_id', 'author_id', 'rating')
+        indexes = [
+            models.Index(fields=['author_id', 'genre_id', 'rating'], name='book_facet_author_idx'),
+        ]
+
+
+# Вклад книги в BookFacet на момент последнего пересчета: по разнице с текущими автором,
+# жанрами и рейтингом книги счетчики меняются инкрементально (Catalog.facets.refresh_facets).
+# book_id не внешний ключ: вклад удаленной книги тоже нужно вычесть
+class BookFacetState(models.Model):
+    book_id = models.BigIntegerField(primary_key=True, verbose_name='Книга')
+    author_id = models.BigIntegerField(null=True, verbose_name='Автор')
+    genre_ids = ArrayField(models.BigIntegerField(), null=True, verbose_name='Жанры')
+    rating = models.PositiveSmallIntegerField(null=True, verbose_name='Рейтинг')
+
+    class Meta:
+        verbose_name = 'Вклад книги в фасеты'
+        verbose_name_plural = 'Вклад книг в фасеты'
@@ -0,0 +1,225 @@
+import json
+from collections.abc import Sequence
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+
+
+class CursorSerializer:
+    """
+    Сериализатор значений курсора для django.core.signing (поддерживает даты)
+    """
+    def dumps(self, obj):
+        return json.dumps(obj, cls=DjangoJSONEncoder, separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def ordering_key(queryset):
+    """
+    Возвращает поля сортировки queryset (по умолчанию Meta.ordering модели) в виде списка пар
+    (lookup, по убыванию). ForeignKey раскрывается в Meta.ordering связанной модели.
+    Список обрывается на первом уникальном поле или наборе из unique_together,
+    иначе дополняется первичным ключом, чтобы порядок был строгим
+    """
+    opts = queryset.model._meta
+    ordering = queryset.query.order_by or opts.ordering
+    key = []
+
+    def add(prefix, model_opts, names):
+        for name in names:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            field = model_opts.pk if name == 'pk' else model_opts.get_field(name)
+
+            if field.is_relation:
+                add(f'{prefix}{name}{LOOKUP_SEP}', field.related_model._meta,
+                    field.related_model._meta.ordering or ['pk'])
+                continue
+            if field.null:
+                raise ImproperlyConfigured(
+                    f'Поле {prefix}{name} может быть NULL и не подходит для пагинации по курсору')
+
+            key.append((f'{prefix}{name}', descending))
+            if not prefix and (field.unique or field.primary_key):
+                return True
+            if not prefix and any(set(fields) <= {lookup for lookup, _ in key}
+                                  for fields in opts.unique_together):
+                return True
+        return False
+
+    if not add('', opts, ordering):
+        key.append(('pk', False))
+    return key
+
+
+class CursorPage(Sequence):
+    """
+    Страница пагинации по курсору. Вместо номеров страниц содержит непрозрачные
+    токены next_cursor / previous_cursor
+    """
+    is_cursor_page = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Пагинация по ключу сортировки (keyset pagination).
+    В отличие от django.core.paginator.Paginator не выполняет COUNT(*) и OFFSET:
+    каждая страница - это выборка per_page записей после (или до) ключа из курсора,
+    которую обслуживает индекс по полям сортировки
+    """
+    salt = 'Catalog.pagination.cursor'
+
+    def __init__(self, queryset, per_page):
+        self.per_page = int(per_page)
+        self.key = ordering_key(queryset)
+        self.queryset = queryset.annotate(**{
+            self._alias(i): F(lookup) for i, (lookup, _) in enumerate(self.key)
+        }).order_by(*(f'-{lookup}' if descending else lookup for lookup, descending in self.key))
+
+    @staticmethod
+    def _alias(index):
+        return f'cursor_key_{index}'
+
+    def encode_cursor(self, obj, backwards):
+        values = [getattr(obj, self._alias(i)) for i in range(len(self.key))]
+        return signing.dumps({'v': values, 'b': backwards}, salt=self.salt,
+                             serializer=CursorSerializer, compress=True)
+
+    def decode_cursor(self, cursor):
+        data = signing.loads(cursor, salt=self.salt, serializer=CursorSerializer)
+        if not isinstance(data, dict) or len(data.get('v', ())) != len(self.key):
+            raise signing.BadSignature('Некорректный курсор')
+        return data['v'], bool(data.get('b'))
+
+    def _seek(self, values, backwards):
+        """
+        Условие "строго после ключа values" в направлении обхода:
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q()
+        equal = Q()
+        for (lookup, descending), value in zip(self.key, values):
+            operator = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{lookup}__{operator}': value})
+            equal &= Q(**{lookup: value})
+
+        first_lookup, first_descending = self.key[0]
+        prefix_operator = 'lte' if first_descending != backwards else 'gte'
+        return Q(**{f'{first_lookup}__{prefix_operator}': values[0]}) & condition
+
+    def _page_queryset(self, cursor):
+        """
+        Выборка страницы (на одну запись больше per_page, чтобы узнать о следующей странице)
+        и направление обхода
+        """
+        if not cursor:
+            return self.queryset[:self.per_page + 1], False
+
+        values, backwards = self.decode_cursor(cursor)
+        queryset = self.queryset.filter(self._seek(values, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+        return queryset[:self.per_page + 1], backwards
+
+    def page(self, cursor=None):
+        queryset, backwards = self._page_queryset(cursor)
+        return self._make_page(list(queryset), cursor, backwards)
+
+    async def apage(self, cursor=None):
+        """
+        Асинхронная версия page() для асинхронных представлений
+        """
+        queryset, backwards = self._page_queryset(cursor)
+        return self._make_page([obj async for obj in queryset], cursor, backwards)
+
+    def _make_page(self, object_list, cursor, backwards):
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if backwards:
+            object_list.reverse()
+
+        if not object_list:
+            return CursorPage(object_list, self)
+
+        if backwards:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        return CursorPage(
+            object_list,
+            self,
+            next_cursor=self.encode_cursor(object_list[-1], False) if has_next else None,
+            previous_cursor=self.encode_cursor(object_list[0], True) if has_previous else None,
+        )
+
+    def get_page(self, cursor=None):
+        """
+        Как page(), но при поврежденном курсоре возвращает первую страницу
+        """
+        try:
+            return self.page(cursor)
+        except signing.BadSignature:
+            return self.page()
+
+    async def aget_page(self, cursor=None):
+        try:
+            return await self.apage(cursor)
+        except signing.BadSignature:
+            return await self.apage()
+
+
+class PaginationMixin:
+    """
+    Пагинация для представлений каталога.
+    pagination_mode = 'cursor' - пагинация по курсору (для больших списков),
+    pagination_mode = 'offset' - обычная постраничная пагинация с номерами страниц
+    """
+    pagination_mode = 'cursor'
+    cursor_kwarg = 'cursor'
+    page_kwarg = 'page'
+
+    def get_page_obj(self, queryset, per_page):
+        if self.pagination_mode == 'cursor':
+            return CursorPaginator(queryset, per_page).get_page(self.request.GET.get(self.cursor_kwarg))
+        return Paginator(queryset, per_page).get_page(self.request.GET.get(self.page_kwarg))
+
+    async def aget_page_obj(self, queryset, per_page):
+        if self.pagination_mode == 'cursor':
+            return await CursorPaginator(queryset, per_page).aget_page(self.request.GET.get(self.cursor_kwarg))
+        return await sync_to_async(self.get_page_obj)(queryset, per_page)
+
+    def paginate_queryset(self, queryset, page_size):
+        page = self.get_page_obj(queryset, page_size)
+        return page.paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,98 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf
+from django.utils import timezone
+
+from .counters import pk_ranges
+from .facets import refresh_facets
+from .fragments import invalidate_fragments
+from .models import Book, Rating
+
+
+def average_rating(rating_sum, rating_count):
+    """
+    Выражение средней оценки по сумме и числу оценок (0, если оценок нет)
+    """
+    return Coalesce(
+        Cast(rating_sum, DecimalField(max_digits=12, decimal_places=4)) / NullIf(rating_count, Value(0)),
+        Value(0),
+        output_field=Book._meta.get_field('rating'),
+    )
+
+
+def change_book_rating(book_id, score_delta, count_delta):
+    """
+    Атомарно прибавляет score_delta к сумме и count_delta к числу оценок книги и пересчитывает
+    среднюю оценку одним UPDATE. Все выражения в SET вычисляются по значениям строки до
+    обновления, поэтому одновременные изменения оценок не теряются.
+    Обновляется и Book.updated_at: рейтинг показывается на странице книги и в списках,
+    а также счетчики фасетов (фильтр по минимальному рейтингу)
+    """
+    rating_sum = Greatest(F('rating_sum') + score_delta, 0)
+    rating_count = Greatest(F('rating_count') + count_delta, 0)
+    Book.objects.filter(pk=book_id).update(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        rating=average_rating(rating_sum, rating_count),
+        updated_at=timezone.now(),
+    )
+    invalidate_fragments(Book, [book_id])
+    refresh_facets([book_id])
+
+
+def rate_book(user, book, score):
+    """
+    Ставит или меняет оценку книги пользователем и возвращает объект Rating.
+    user - модель пользователя или пользователь JWT (users.jwt.JWTUser): используется только pk.
+    Оценка блокируется (SELECT ... FOR UPDATE) до конца транзакции, поэтому сигнал
+    видит ее актуальное прежнее значение даже при одновременных запросах пользователя
+    """
+    with transaction.atomic():
+        rating = Rating.objects.select_for_update().filter(user_id=user.pk, book=book).first()
+        if rating is None:
+            try:
+                with transaction.atomic():
+                    return Rating.objects.create(user_id=user.pk, book=book, score=score)
+            except IntegrityError:
+                # Оценку успел создать одновременный запрос того же пользователя
+                rating = Rating.objects.select_for_update().get(user_id=user.pk, book=book)
+
+        if rating.score != score:
+            rating.score = score
+            rating.save(update_fields=['score'])
+        return rating
+
+
+def unrate_book(user, book):
+    """
+    Удаляет оценку книги пользователем. Возвращает False, если оценки не было
+    """
+    with transaction.atomic():
+        rating = Rating.objects.select_for_update().filter(user_id=user.pk, book=book).first()
+        if rating is None:
+            return False
+        rating.delete()
+        return True
+
+
+def recompute_ratings(batch_size=1000):
+    """
+    Пересчитывает сумму, число и среднюю оценку книг по таблице Rating пачками
+    по batch_size книг. Возвращает число исправленных книг.
+    Счетчики фасетов после этого пересчитывает manage.py rebuild_facets
+    """
+    ratings = Rating.objects.filter(book=OuterRef('pk')).order_by().values('book')
+    rating_sum = Coalesce(Subquery(ratings.annotate(total=Sum('score')).values('total'),
+                                   output_field=IntegerField()), Value(0))
+    rating_count = Coalesce(Subquery(ratings.annotate(total=Count('*')).values('total'),
+                                     output_field=IntegerField()), Value(0))
+    actual = {
+        'rating_sum': rating_sum,
+        'rating_count': rating_count,
+        'rating': average_rating(rating_sum, rating_count),
+    }
+
+    fixed = 0
+    for first_pk, last_pk in pk_ranges(Book, batch_size):
+        fixed += Book.objects.filter(pk__gte=first_pk, pk__lte=last_pk).exclude(**actual).update(**actual)
+    return fixed
@@ -0,0 +1,149 @@
+"""
+Рекомендации "Читатели также добавляли" по совместной встречаемости книг на книжных полках.
+
+Матрица совместной встречаемости "книга x книга" разреженная: ненулевые только пары книг,
+которые хотя бы раз стояли на одной полке. Она вычисляется в PostgreSQL одним запросом на пачку
+книг (соединение таблицы связей Bookshelf.book с самой собой, GROUP BY по паре книг), а
+row_number() оставляет для каждой книги RECOMMENDATIONS_TOP_K соседей с наибольшим числом общих полок.
+Результат хранится в BookNeighbour, поэтому страница книги читает готовый список по индексу.
+
+При изменении полок (Catalog.signals, Catalog.bookshelf) затронутые книги попадают в
+StaleRecommendations, и manage.py build_recommendations --stale пересчитывает только их
+"""
+from django.db import connections, router, transaction
+
+from .counters import pk_ranges
+from .models import Book, BookNeighbour, Bookshelf, StaleRecommendations
+
+# Сколько рекомендаций хранится и показывается для каждой книги
+RECOMMENDATIONS_TOP_K = 10
+
+Shelved = Bookshelf.book.through
+
+
+def _table_names(connection):
+    quote_name = connection.ops.quote_name
+    return {
+        'book': quote_name(Book._meta.db_table),
+        'book_pk': quote_name(Book._meta.pk.column),
+        'updated_at': quote_name(Book._meta.get_field('updated_at').column),
+        'shelved': quote_name(Shelved._meta.db_table),
+        'shelved_bookshelf': quote_name(Shelved._meta.get_field('bookshelf').column),
+        'shelved_book': quote_name(Shelved._meta.get_field('book').column),
+        'neighbours': quote_name(BookNeighbour._meta.db_table),
+        'neighbour_book': quote_name(BookNeighbour._meta.get_field('book').column),
+        'neighbour': quote_name(BookNeighbour._meta.get_field('neighbour').column),
+        'score': quote_name(BookNeighbour._meta.get_field('score').column),
+        'stale': quote_name(StaleRecommendations._meta.db_table),
+        'stale_book': quote_name(StaleRecommendations._meta.get_field('book').column),
+    }
+
+
+def _rebuild(cursor, connection, book_filter, params, top_k):
+    """
+    Пересчитывает соседей книг, выбранных условием book_filter (в нем {column} - столбец книги),
+    одним запросом. Book.updated_at обновляется только у книг, чей список соседей изменился
+    """
+    tables = _table_names(connection)
+    sql = (
+        'WITH pairs AS ('
+        '  SELECT a.{shelved_book} AS book_id, b.{shelved_book} AS neighbour_id, count(*) AS score'
+        '  FROM {shelved} a JOIN {shelved} b'
+        '  ON b.{shelved_bookshelf} = a.{shelved_bookshelf} AND b.{shelved_book} <> a.{shelved_book}'
+        '  WHERE {pairs_filter}'
+        '  GROUP BY a.{shelved_book}, b.{shelved_book}'
+        '), ranked AS ('
+        '  SELECT book_id, neighbour_id, score,'
+        '  row_number() OVER (PARTITION BY book_id ORDER BY score DESC, neighbour_id) AS position'
+        '  FROM pairs'
+        '), old AS ('
+        '  DELETE FROM {neighbours} WHERE {neighbours_filter}'
+        '  RETURNING {neighbour_book} AS book_id, {neighbour} AS neighbour_id, {score} AS score'
+        '), new AS ('
+        '  INSERT INTO {neighbours} ({neighbour_book}, {neighbour}, {score})'
+        '  SELECT book_id, neighbour_id, score FROM ranked WHERE position <= %(top_k)s'
+        '  RETURNING {neighbour_book} AS book_id, {neighbour} AS neighbour_id, {score} AS score'
+        '), changed AS ('
+        '  (SELECT * FROM old EXCEPT SELECT * FROM new) UNION (SELECT * FROM new EXCEPT SELECT * FROM old)'
+        ') '
+        'UPDATE {book} SET {updated_at} = now() WHERE {book_pk} IN (SELECT book_id FROM changed)'
+    ).format(
+        pairs_filter=book_filter.format(column=f'a.{tables["shelved_book"]}'),
+        neighbours_filter=book_filter.format(column=tables['neighbour_book']),
+        **tables,
+    )
+    cursor.execute(sql, {**params, 'top_k': top_k})
+    return cursor.rowcount
+
+
+def build_recommendations(top_k=RECOMMENDATIONS_TOP_K, batch_size=1000):
+    """
+    Пересчитывает рекомендации всех книг пачками по batch_size книг (каждая пачка - отдельная
+    транзакция). Возвращает число книг, у которых изменился список рекомендаций
+    """
+    connection = connections[router.db_for_write(BookNeighbour)]
+    changed = 0
+    with connection.cursor() as cursor:
+        # Все книги пересчитываются заново, а изменения полок во время построения снова попадут в очередь
+        StaleRecommendations.objects.all().delete()
+        for first_pk, last_pk in pk_ranges(Book, batch_size):
+            with transaction.atomic(using=connection.alias):
+                changed += _rebuild(cursor, connection, '{column} BETWEEN %(first)s AND %(last)s',
+                                    {'first': first_pk, 'last': last_pk}, top_k)
+    return changed
+
+
+def rebuild_stale(top_k=RECOMMENDATIONS_TOP_K, batch_size=1000):
+    """
+    Пересчитывает рекомендации книг из очереди StaleRecommendations пачками по batch_size.
+    Пачка забирается из очереди с SKIP LOCKED, поэтому команду можно запускать параллельно.
+    Возвращает число пересчитанных книг
+    """
+    connection = connections[router.db_for_write(BookNeighbour)]
+    tables = _table_names(connection)
+    rebuilt = 0
+    with connection.cursor() as cursor:
+        while True:
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(
+                    'DELETE FROM {stale} WHERE {stale_book} IN ('
+                    '  SELECT {stale_book} FROM {stale} ORDER BY {stale_book} LIMIT %s FOR UPDATE SKIP LOCKED'
+                    ') RETURNING {stale_book}'.format(**tables),
+                    [batch_size],
+                )
+                book_ids = [row[0] for row in cursor.fetchall()]
+                if not book_ids:
+                    return rebuilt
+                _rebuild(cursor, connection, '{column} = ANY(%(books)s)', {'books': book_ids}, top_k)
+            rebuilt += len(book_ids)
+
+
+def mark_stale(bookshelf_ids=(), book_ids=()):
+    """
+    Ставит в очередь на пересчет рекомендаций книги book_ids и все книги с полок bookshelf_ids:
+    у них изменилось число общих полок с добавленной или убранной книгой
+    """
+    bookshelf_ids, book_ids = list(bookshelf_ids), list(book_ids)
+    if not bookshelf_ids and not book_ids:
+        return
+
+    connection = connections[router.db_for_write(StaleRecommendations)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {stale} ({stale_book}) '
+            'SELECT {book_pk} FROM {book} WHERE {book_pk} = ANY(%s) '
+            'UNION SELECT {shelved_book} FROM {shelved} WHERE {shelved_bookshelf} = ANY(%s) '
+            'ON CONFLICT DO NOTHING'.format(**_table_names(connection)),
+            [book_ids, bookshelf_ids],
+        )
+
+
+def also_shelved(book, top_k=RECOMMENDATIONS_TOP_K):
+    """
+    Книги, которые читатели чаще всего добавляли на полку вместе с book (по индексу BookNeighbour)
+    """
+    return (
+        Book.objects.filter(neighbour_of__book=book)
+        .only('id', 'title', 'slug')
+        .order_by('-neighbour_of__score', 'title')[:top_k]
+    )
@@ -0,0 +1,106 @@
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Ширины уменьшенных копий изображений (px): размеры карточек на страницах и их версии для HiDPI
+RENDITION_WIDTHS = (120, 160, 200, 320, 400)
+# Форматы уменьшенных копий: WebP для современных браузеров и JPEG как запасной вариант
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Время жизни закешированного списка ширин, для которых у изображения есть копии (секунды)
+RENDITIONS_CACHE_TIMEOUT = 60 * 60
+
+
+def rendition_name(name, width, extension):
+    """
+    Имя файла уменьшенной копии рядом с оригиналом:
+    books/<slug>/<slug>.png -> books/<slug>/<slug>_160w.webp
+    """
+    root, _ = posixpath.splitext(name)
+    return f'{root}_{width}w.{extension}'
+
+
+def rendition_url(image, width, extension):
+    return image.storage.url(rendition_name(image.name, width, extension))
+
+
+def _widths_key(name):
+    return f'catalog:renditions:{hashlib.md5(name.encode(), usedforsecurity=False).hexdigest()}'
+
+
+def available_widths(image):
+    """
+    Ширины, для которых у изображения есть копии во всех форматах RENDITION_FORMATS.
+    Список записывается в кеш при создании копий, а для изображений, загруженных до их появления
+    (или с неудачной генерацией), наличие файлов проверяется один раз и тоже кешируется
+    """
+    key = _widths_key(image.name)
+    widths = cache.get(key)
+    if widths is None:
+        widths = [
+            width for width in RENDITION_WIDTHS
+            if all(image.storage.exists(rendition_name(image.name, width, extension))
+                   for extension in RENDITION_FORMATS)
+        ]
+        cache.set(key, widths, RENDITIONS_CACHE_TIMEOUT)
+    return widths
+
+
+def _encode(image, image_format, options):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG не поддерживает прозрачность: подкладываем белый фон
+        background = Image.new('RGB', image.size, 'white')
+        converted = image.convert('RGBA')
+        background.paste(converted, mask=converted.getchannel('A'))
+        image = background
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def generate_renditions(image):
+    """
+    Создает уменьшенные копии изображения (image - FieldFile) всех ширин RENDITION_WIDTHS
+    во всех форматах RENDITION_FORMATS. Изображение не увеличивается: если оригинал уже,
+    чем нужная ширина, копия сохраняется в размере оригинала.
+    Возвращает список имен созданных файлов
+    """
+    if not image:
+        return []
+
+    try:
+        with image.storage.open(image.name) as file:
+            original = Image.open(file)
+            original = ImageOps.exif_transpose(original)
+            original.load()
+    except (OSError, UnidentifiedImageError):
+        logger.warning('Не удалось прочитать изображение %s, копии не созданы', image.name)
+        cache.set(_widths_key(image.name), [], RENDITIONS_CACHE_TIMEOUT)
+        return []
+
+    created = []
+    for width in RENDITION_WIDTHS:
+        resized = original
+        if original.width > width:
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), Image.LANCZOS)
+
+        for extension, (image_format, options) in RENDITION_FORMATS.items():
+            name = rendition_name(image.name, width, extension)
+            if image.storage.exists(name):
+                image.storage.delete(name)
+            created.append(image.storage.save(name, ContentFile(_encode(resized, image_format, options))))
+    cache.set(_widths_key(image.name), list(RENDITION_WIDTHS), RENDITIONS_CACHE_TIMEOUT)
+    return created
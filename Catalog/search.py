@@ -0,0 +1,82 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Concat
+
+from .models import Author, Book, title_author_search_vector
+
+# Конфигурация полнотекстового поиска PostgreSQL (стемминг для русского языка)
+SEARCH_CONFIG = 'russian'
+# Сколько книг каждой группы совпадений (все и по названию или автору) ранжируется.
+# Ограничение держит первую страницу общих запросов (сотни тысяч совпадений) в пределах десятков миллисекунд
+SEARCH_CANDIDATES_LIMIT = 1000
+
+
+def book_search_vector():
+    """
+    Возвращает выражение взвешенного поискового вектора книги:
+    название (A), имя автора (B), жанры (C), описание (D)
+    """
+    author_name = Subquery(
+        Author.objects.filter(pk=OuterRef('author_id'))
+        .annotate(full_name=Concat('first_name', Value(' '), 'last_name'))
+        .values('full_name')[:1]
+    )
+    genres = Subquery(
+        Book.genre.through.objects.filter(book_id=OuterRef('pk'))
+        .values('book_id')
+        .annotate(names=StringAgg('genre__genre', delimiter=' '))
+        .values('names')
+    )
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(author_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector(genres, weight='C', config=SEARCH_CONFIG)
+        + SearchVector('about', weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def search_vector_sql(title, author_name, genres, about):
+    """
+    SQL-выражение того же вектора, что и book_search_vector(), из уже известных значений
+    (аргументы - SQL-выражения текста). Используется при массовой вставке книг,
+    чтобы вектор вычислялся в том же INSERT, а не отдельным UPDATE
+    """
+    parts = ((title, 'A'), (author_name, 'B'), (genres, 'C'), (about, 'D'))
+    return ' || '.join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, COALESCE({text}, '')), '{weight}')"
+        for text, weight in parts
+    )
+
+
+def update_search_vector(queryset, **fields):
+    """
+    Пересчитывает поисковый вектор для всех книг из queryset одним UPDATE-запросом.
+    Поля fields (например, updated_at) обновляются тем же запросом
+    """
+    return queryset.update(search_vector=book_search_vector(), **fields)
+
+
+def search_books(query, queryset=None):
+    """
+    Возвращает книги, подходящие под поисковый запрос, отсортированные по релевантности.
+    Ранжируются не все совпадения, а не больше SEARCH_CANDIDATES_LIMIT книг с совпадением
+    в названии или имени автора и столько же любых совпадений, обе группы - по GIN-индексам.
+    Совпадение слова в названии или имени автора (веса A, B) всегда ранжируется выше, чем только
+    в жанрах и описании (C, D), поэтому такие книги не теряются среди совпадений в описании
+    """
+    if queryset is None:
+        queryset = Book.objects.all()
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    candidates = queryset.order_by().values('pk')
+    title_author_matches = (
+        candidates.alias(title_author_vector=title_author_search_vector())
+        .filter(title_author_vector=search_query)
+    )
+    matches = candidates.filter(search_vector=search_query)
+    return (
+        queryset.filter(pk__in=title_author_matches[:SEARCH_CANDIDATES_LIMIT].union(matches[:SEARCH_CANDIDATES_LIMIT]))
+        .annotate(rank=SearchRank(F('search_vector'), search_query))
+        .order_by('-rank', 'title')
+    )
@@ -0,0 +1,262 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .autocomplete import object_deleted, object_saved
+from .counters import change_counters
+from .facets import refresh_facets
+from .fragments import invalidate_fragments
+from .models import Author, Book, Bookshelf, Genre, Rating
+from .ratings import change_book_rating
+from .recommendations import mark_stale
+from .renditions import generate_renditions
+from .search import update_search_vector
+
+
+def books_changed(book_ids, touch=True):
+    """
+    Обновляет поисковый вектор, счетчики фасетов и сбрасывает закешированные фрагменты книг book_ids.
+    При touch=True также обновляет Book.updated_at (книга изменилась не через save())
+    """
+    if book_ids:
+        fields = {'updated_at': timezone.now()} if touch else {}
+        update_search_vector(Book.objects.filter(pk__in=book_ids), **fields)
+        invalidate_fragments(Book, book_ids)
+        refresh_facets(book_ids)
+
+
+def touch_authors(author_ids):
+    """
+    Обновляет Author.updated_at авторов, у которых изменился список книг
+    """
+    author_ids = [author_id for author_id in author_ids if author_id is not None]
+    if author_ids:
+        Author.objects.filter(pk__in=author_ids).update(updated_at=timezone.now())
+
+
+# Поддержание актуальности Book.search_vector, Book.updated_at / Author.updated_at
+# и закешированных фрагментов списков (Catalog.fragments) при изменении книги, автора и жанров.
+# Фрагмент книги зависит от самой книги и ее жанров, фрагмент автора - только от автора
+@receiver(post_init, sender=Book)
+def remember_book_author(sender, instance, **kwargs):
+    # Если поле author не загружено (only/defer), смена автора не отслеживается
+    if 'author_id' in instance.__dict__:
+        instance._initial_author_id = instance.author_id
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    books_changed([instance.pk], touch=False)
+    if created:
+        change_counters(Author, 'books_count', {instance.author_id: 1})
+        instance._initial_author_id = instance.author_id
+    # Книга перешла к другому автору: страница прежнего автора тоже изменилась
+    elif hasattr(instance, '_initial_author_id') and instance._initial_author_id != instance.author_id:
+        touch_authors([instance._initial_author_id])
+        change_counters(Author, 'books_count', {instance._initial_author_id: -1, instance.author_id: 1})
+        instance._initial_author_id = instance.author_id
+
+
+@receiver(pre_delete, sender=Book)
+def remember_book_genres(sender, instance, **kwargs):
+    # Связи с жанрами удаляются каскадно без сигнала m2m_changed
+    instance._counter_genre_ids = list(instance.genre.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    invalidate_fragments(Book, [instance.pk])
+    refresh_facets([instance.pk])
+    touch_authors([instance.author_id])
+    change_counters(Author, 'books_count', {instance.author_id: -1})
+    change_counters(Genre, 'books_count', dict.fromkeys(getattr(instance, '_counter_genre_ids', ()), -1))
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    if not created:
+        update_search_vector(Book.objects.filter(author=instance), updated_at=timezone.now())
+        invalidate_fragments(Author, [instance.pk])
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, **kwargs):
+    if not created:
+        books_changed(list(instance.book_set.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Genre)
+def remember_related_books(sender, instance, **kwargs):
+    # После удаления связи с книгами уже не найти, поэтому запоминаем их заранее
+    instance._search_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    invalidate_fragments(Author, [instance.pk])
+    book_ids = getattr(instance, '_search_book_ids', None)
+    if book_ids:
+        update_search_vector(Book.objects.filter(pk__in=book_ids), updated_at=timezone.now())
+        # Книги остались без автора
+        refresh_facets(book_ids)
+
+
+@receiver(post_delete, sender=Genre)
+def genre_deleted(sender, instance, **kwargs):
+    books_changed(getattr(instance, '_search_book_ids', None))
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            books_changed([instance.pk])
+        return
+
+    # Изменение со стороны жанра: genre.book_set.add(...) / remove(...) / clear()
+    if action == 'pre_clear':
+        instance._search_book_ids = list(instance.book_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        books_changed(getattr(instance, '_search_book_ids', None))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        books_changed(list(pk_set))
+
+
+# Счетчики связей многие-ко-многим (Catalog.counters) хранятся в связанной модели:
+# Genre.books_count для Book.genre и Book.bookshelves_count для Bookshelf.book
+M2M_COUNTERS = {
+    Book.genre.through: (Book._meta.get_field('genre'), 'books_count'),
+    Bookshelf.book.through: (Bookshelf._meta.get_field('book'), 'bookshelves_count'),
+}
+
+
+def relation_counter_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    field, counter = M2M_COUNTERS[sender]
+    own, other = field.m2m_field_name(), field.m2m_reverse_field_name()
+    if reverse:
+        own, other = other, own
+
+    if action in ('pre_remove', 'pre_clear'):
+        # pk_set в remove содержит и отсутствующие связи: запоминаем только реально удаляемые
+        links = sender.objects.filter(**{own: instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{f'{other}__in': pk_set})
+        instance._counter_removed_pks = list(links.values_list(other, flat=True))
+        return
+
+    if action == 'post_add':
+        # В post_add pk_set содержит только новые связи
+        changed, delta = pk_set or (), 1
+    elif action in ('post_remove', 'post_clear'):
+        changed, delta = instance.__dict__.pop('_counter_removed_pks', ()), -1
+    else:
+        return
+
+    if reverse:
+        change_counters(field.related_model, counter, {instance.pk: delta * len(changed)})
+    else:
+        change_counters(field.related_model, counter, dict.fromkeys(changed, delta))
+
+
+@receiver(pre_delete, sender=Bookshelf)
+def remember_bookshelf_books(sender, instance, **kwargs):
+    # Связи полки с книгами удаляются каскадно (в том числе при удалении пользователя) без m2m_changed
+    instance._counter_book_ids = list(instance.book.values_list('pk', flat=True))
+    mark_stale(book_ids=instance._counter_book_ids)
+
+
+@receiver(post_delete, sender=Bookshelf)
+def bookshelf_deleted(sender, instance, **kwargs):
+    change_counters(Book, 'bookshelves_count', dict.fromkeys(getattr(instance, '_counter_book_ids', ()), -1))
+
+
+for through in M2M_COUNTERS:
+    m2m_changed.connect(relation_counter_changed, sender=through, dispatch_uid=f'counters_{through._meta.label}')
+
+
+# Рекомендации (Catalog.recommendations) книг, у которых изменились общие полки, ставятся в очередь
+# на пересчет. При удалении связей книги отмечаются заранее, пока убираемые книги еще на полке
+@receiver(m2m_changed, sender=Bookshelf.book.through)
+def bookshelf_books_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'pre_remove', 'pre_clear') or (action == 'post_add' and not pk_set):
+        return
+    if not reverse:
+        mark_stale(bookshelf_ids=[instance.pk], book_ids=pk_set or ())
+    elif pk_set is not None:
+        mark_stale(bookshelf_ids=pk_set, book_ids=[instance.pk])
+    else:
+        mark_stale(bookshelf_ids=sender.objects.filter(book=instance).values_list('bookshelf', flat=True),
+                   book_ids=[instance.pk])
+
+
+# Сумма и число оценок книги (Book.rating_sum / Book.rating_count) и средняя оценка Book.rating
+@receiver(post_init, sender=Rating)
+def remember_rating(sender, instance, **kwargs):
+    if 'score' in instance.__dict__ and 'book_id' in instance.__dict__:
+        instance._initial_rating = (instance.book_id, instance.score)
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, **kwargs):
+    initial = getattr(instance, '_initial_rating', None)
+    if created:
+        change_book_rating(instance.book_id, instance.score, 1)
+    elif initial is None:
+        # Оценка загружена без score или book (only/defer): изменение не отслеживается
+        return
+    elif initial[0] != instance.book_id:
+        change_book_rating(initial[0], -initial[1], -1)
+        change_book_rating(instance.book_id, instance.score, 1)
+    elif initial[1] != instance.score:
+        change_book_rating(instance.book_id, instance.score - initial[1], 0)
+    instance._initial_rating = (instance.book_id, instance.score)
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, **kwargs):
+    change_book_rating(instance.book_id, -instance.score, -1)
+
+
+# Индексы автодополнения (Catalog.autocomplete) обновляются после фиксации транзакции
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+def autocomplete_object_saved(sender, instance, update_fields, **kwargs):
+    object_saved(instance, update_fields)
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def autocomplete_object_deleted(sender, instance, **kwargs):
+    object_deleted(instance)
+
+
+# Уменьшенные копии изображений (Catalog.renditions) создаются один раз при загрузке
+# или замене изображения, а не при отрисовке страниц
+IMAGE_MODELS = (Book, Author, get_user_model())
+_UNKNOWN = object()
+
+
+def remember_image_name(sender, instance, **kwargs):
+    # Если поле image не загружено (only/defer), изменение изображения не отслеживается
+    image = instance.__dict__.get('image', _UNKNOWN)
+    instance._image_name = getattr(image, 'name', image)
+
+
+def image_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_image_name', _UNKNOWN)
+    if previous is _UNKNOWN:
+        return
+
+    image = instance.image
+    if image and image.name != previous:
+        generate_renditions(image)
+    instance._image_name = image.name
+
+
+for model in IMAGE_MODELS:
+    post_init.connect(remember_image_name, sender=model, dispatch_uid=f'renditions_init_{model._meta.label}')
+    post_save.connect(image_saved, sender=model, dispatch_uid=f'renditions_save_{model._meta.label}')
@@ -1,8 +1,86 @@
 from django import template
+from django.core.cache import cache
+
+from Catalog.fragments import FRAGMENT_CACHE_TIMEOUT, can_cache_fragment, fragment_key
+from Catalog.renditions import available_widths, rendition_url
+from users.roles import has_group as user_has_group
 
 register = template.Library()
 
 
 @register.filter(name='has_group')
 def has_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+    return user_has_group(user, group_name)
+
+
+@register.simple_tag(takes_context=True)
+def url_replace(context, **kwargs):
+    """
+    Возвращает GET-параметры текущего запроса, заменяя переданные значения
+    (пустое значение убирает параметр). Нужен, чтобы при переходе по страницам
+    не терялись остальные параметры (например, q)
+    """
+    query = context['request'].GET.copy()
+    for key, value in kwargs.items():
+        if value in (None, ''):
+            query.pop(key, None)
+        else:
+            query[key] = value
+    return query.urlencode()
+
+
+@register.inclusion_tag('catalog/common/picture.html')
+def picture(image, width, alt=''):
+    """
+    Выводит изображение через <picture> с уменьшенными копиями (WebP и JPEG) в srcset,
+    чтобы браузер загружал копию нужного размера, а не оригинал.
+    В srcset попадают только существующие копии, без копий выводится оригинал
+    """
+    width = int(width)
+    widths = available_widths(image)
+    context = {'sizes': f'{width}px', 'width': width, 'alt': alt}
+    if not widths:
+        return {**context, 'src': image.url}
+
+    fallback = next((w for w in widths if w >= width), widths[-1])
+    return {
+        **context,
+        'webp_srcset': ', '.join(f'{rendition_url(image, w, "webp")} {w}w' for w in widths),
+        'jpeg_srcset': ', '.join(f'{rendition_url(image, w, "jpg")} {w}w' for w in widths),
+        'src': rendition_url(image, fallback, 'jpg'),
+    }
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, obj):
+        self.nodelist = nodelist
+        self.name = name
+        self.obj = obj
+
+    def render(self, context):
+        obj = self.obj.resolve(context)
+        key = fragment_key(self.name.resolve(context), obj)
+        html = cache.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            if can_cache_fragment(obj):
+                cache.set(key, html, FRAGMENT_CACHE_TIMEOUT)
+        return html
+
+
+@register.tag
+def cached_fragment(parser, token):
+    """
+    Кеширует HTML элемента списка для объекта с учетом версии его содержимого:
+
+        {% cached_fragment 'book_list_item' book %} ... {% endcached_fragment %}
+
+    Фрагменты сбрасываются сигналами при изменении объекта (Catalog.signals),
+    поэтому содержимое блока должно зависеть только от самого объекта
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f'{bits[0]} принимает имя фрагмента и объект')
+    nodelist = parser.parse(('endcached_fragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
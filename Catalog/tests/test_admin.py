@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Catalog.admin import BookAdmin
+from Catalog.models import *
+
+
+class BookAdminChangelistTest(TestCase):
+    """
+    Число SQL-запросов на странице списка книг в админке не должно зависеть от числа строк
+    """
+
+    def setUp(self):
+        self.author = Author.objects.create(
+            first_name='Имя',
+            last_name='Фамилия',
+            date_of_birth='1900-01-01'
+        )
+        self.genres = [Genre.objects.create(genre=f'Жанр {i}') for i in range(5)]
+        self.client = Client()
+        self.client.force_login(get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'))
+        self.url = reverse('admin:Catalog_book_changelist')
+
+    def add_books(self, count):
+        # bulk_create: сотни книг через save() с сигналами создавались бы слишком долго
+        start = Book.objects.count()
+        books = Book.objects.bulk_create(
+            Book(title=f'Книга {i:04}', slug=f'kniga-{i:04}', author=self.author, about='')
+            for i in range(start, start + count)
+        )
+        Book.genre.through.objects.bulk_create(
+            Book.genre.through(book=book, genre=genre) for book in books for genre in self.genres
+        )
+
+    def get_changelist(self, per_page):
+        cache.clear()
+        with mock.patch.object(BookAdmin, 'list_per_page', per_page):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), per_page)
+        return response, len(context)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.add_books(500)
+        counts = {per_page: self.get_changelist(per_page)[1] for per_page in (20, 100, 500)}
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_first_three_genres_displayed(self):
+        self.add_books(20)
+        response, _ = self.get_changelist(20)
+        self.assertContains(response, 'Жанр 0, Жанр 1, Жанр 2', count=20)
+        self.assertNotContains(response, 'Жанр 3')
+        self.assertContains(response, str(self.author), count=20)
+
+    def test_changelist_loads_only_list_columns(self):
+        self.add_books(5)
+        with CaptureQueriesContext(connection) as context:
+            self.get_changelist(5)
+        book_queries = [query['sql'] for query in context if 'FROM "Catalog_book" ' in query['sql']
+                        and 'COUNT(' not in query['sql']]
+        self.assertEqual(len(book_queries), 1)
+        self.assertNotIn('"Catalog_book"."about"', book_queries[0])
+        self.assertNotIn('"search_vector"', book_queries[0])
+
+        # Форма изменения загружает книгу целиком
+        book = Book.objects.first()
+        book.about = 'Описание книги'
+        book.save()
+        response = self.client.get(reverse('admin:Catalog_book_change', args=[book.pk]))
+        self.assertContains(response, 'Описание книги')
@@ -0,0 +1,109 @@
+from importlib import reload
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import clear_url_caches, reverse
+
+import Catalog.urls
+import ReadMe.urls
+from Catalog import async_views
+from Catalog.models import *
+
+
+def reload_urls():
+    reload(Catalog.urls)
+    reload(ReadMe.urls)
+    clear_url_caches()
+
+
+@override_settings(ASYNC_VIEWS=True)
+class AsyncViewsTest(TestCase):
+    """
+    Асинхронные представления (Catalog.async_views), которые подключаются при запуске через ASGI
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        reload_urls()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        reload_urls()
+
+    def setUp(self):
+        self.author = Author.objects.create(
+            first_name='Лев',
+            last_name='Толстой',
+            date_of_birth='1828-09-09'
+        )
+        self.genre = Genre.objects.create(genre='Роман')
+        self.books = []
+        for i in range(7):
+            book = Book.objects.create(title=f'Книга {i}', author=self.author, about=f'Описание {i}')
+            book.genre.add(self.genre)
+            self.books.append(book)
+        self.user = get_user_model().objects.create(username='reader')
+
+    async def test_book_list(self):
+        response = await self.async_client.get(reverse('catalog:books'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(response.resolver_match.func.view_class, async_views.BookListView)
+        self.assertEqual([book.title for book in response.context['book_list']],
+                         [f'Книга {i}' for i in range(5)])
+
+        response = await self.async_client.get(
+            reverse('catalog:books'), {'cursor': response.context['page_obj'].next_cursor})
+        self.assertEqual([book.title for book in response.context['page_obj']], ['Книга 5', 'Книга 6'])
+
+    async def test_filtered_book_list(self):
+        other = await Book.objects.acreate(title='Без жанра', author=self.author, about='')
+        response = await self.async_client.get(reverse('catalog:books'), {'author': self.author.slug})
+        self.assertEqual(response.context['facets']['authors'], [(self.author, 8)])
+        self.assertIn(other, response.context['book_list'])
+
+        response = await self.async_client.get(reverse('catalog:books'), {'genre': self.genre.slug})
+        self.assertNotIn(other, response.context['page_obj'])
+        self.assertEqual(response.context['facets']['genres'], [(self.genre, 7)])
+
+    async def test_book_detail(self):
+        url = self.books[0].get_absolute_url()
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(response.resolver_match.func.view_class, async_views.BookDetailView)
+        self.assertContains(response, 'Роман')
+
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.async_client.get(reverse('catalog:book_detail', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_book_detail_recommendations(self):
+        await BookNeighbour.objects.acreate(book=self.books[0], neighbour=self.books[3], score=2)
+        response = await self.async_client.get(self.books[0].get_absolute_url())
+        self.assertEqual(response.context['also_shelved'], [self.books[3]])
+        self.assertContains(response, 'Читатели также добавляли')
+
+    async def test_author_detail(self):
+        response = await self.async_client.get(self.author.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    async def test_author_list(self):
+        response = await self.async_client.get(reverse('catalog:authors'))
+        self.assertEqual(list(response.context['author_list']), [self.author])
+
+    async def test_bookshelf_requires_login(self):
+        response = await self.async_client.get(reverse('catalog:bookshelf'))
+        self.assertEqual(response.status_code, 302)
+
+    async def test_bookshelf(self):
+        bookshelf = await Bookshelf.objects.acreate(user=self.user)
+        await sync_to_async(bookshelf.book.add)(self.books[0])
+        await sync_to_async(self.async_client.force_login)(self.user)
+
+        response = await self.async_client.get(reverse('catalog:bookshelf'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['page_obj']), [self.books[0]])
@@ -0,0 +1,145 @@
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Catalog import autocomplete
+from Catalog.autocomplete import PrefixIndex, invalidate_autocomplete
+from Catalog.forms import AddBookForm
+from Catalog.models import *
+
+
+class PrefixIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex([
+            (1, 'Война и мир', ['Война и мир']),
+            (2, 'Воскресение', ['Воскресение']),
+            (3, 'Толстой Лев', ['Лев Толстой', 'Толстой Лев']),
+            (4, 'Ёлка', ['Ёлка']),
+        ])
+
+    def test_search(self):
+        self.assertEqual(self.index.search('Во'), [(1, 'Война и мир'), (2, 'Воскресение')])
+        self.assertEqual(self.index.search('  война   И '), [(1, 'Война и мир')])
+        self.assertEqual(self.index.search('во', limit=1), [(1, 'Война и мир')])
+        self.assertEqual(self.index.search('елк'), [(4, 'Ёлка')])
+        self.assertEqual(self.index.search('мир'), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_object_found_by_each_key_once(self):
+        self.assertEqual(self.index.search('лев'), [(3, 'Толстой Лев')])
+        self.assertEqual(self.index.search('толстой'), [(3, 'Толстой Лев')])
+        self.index.add(5, 'Лесков Николай', ['Николай Лесков', 'Лесков Николай'])
+        self.assertEqual(self.index.search('ле'), [(3, 'Толстой Лев'), (5, 'Лесков Николай')])
+
+    def test_add_and_remove(self):
+        self.index.add(1, 'Мир', ['Мир'])
+        self.assertEqual(self.index.search('во'), [(2, 'Воскресение')])
+        self.assertEqual(self.index.search('мир'), [(1, 'Мир')])
+        self.index.remove(2)
+        self.index.remove(100)
+        self.assertEqual(self.index.search('во'), [])
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(len(self.index.entries), 4)
+
+
+class AutocompleteTest(TestCase):
+
+    def setUp(self):
+        autocomplete._indexes.clear()
+        cache.clear()
+        self.author = Author.objects.create(first_name='Лев', last_name='Толстой', date_of_birth='1828-09-09')
+        self.genre = Genre.objects.create(genre='Роман')
+        self.book = Book.objects.create(title='Война и мир', author=self.author, about='')
+
+    def test_built_from_database(self):
+        self.assertEqual(autocomplete.autocomplete('author', 'толс'), [(self.author.pk, 'Толстой Лев')])
+        self.assertEqual(autocomplete.autocomplete('genre', 'ро'), [(self.genre.pk, 'Роман')])
+
+        # Индекс строится одним запросом, дальше подсказки ищутся без обращений к БД
+        with self.assertNumQueries(1):
+            autocomplete.autocomplete('book', 'а')
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete.autocomplete('book', 'вой'), [(self.book.pk, 'Война и мир')])
+
+    def test_updated_on_commit(self):
+        autocomplete.autocomplete('book', 'в')
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Book.objects.create(title='Воскресение', author=self.author, about='')
+            self.book.title = 'Анна Каренина'
+            self.book.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete.autocomplete('book', 'в'), [(other.pk, 'Воскресение')])
+            self.assertEqual(autocomplete.autocomplete('book', 'анна'), [(self.book.pk, 'Анна Каренина')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(autocomplete.autocomplete('book', 'в'), [])
+
+    def test_save_without_indexed_fields_keeps_index(self):
+        autocomplete.autocomplete('book', 'в')
+        generation = cache.get('catalog:autocomplete-generation:book')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.save(update_fields=['about'])
+        self.assertEqual(cache.get('catalog:autocomplete-generation:book'), generation)
+
+    def test_rebuilt_after_changes_in_other_process(self):
+        autocomplete.autocomplete('genre', 'р')
+        # Жанр добавлен в обход сигналов, а поколение индекса сменил другой процесс
+        Genre.objects.bulk_create([Genre(genre='Рассказ', slug='rasskaz')])
+        self.assertEqual(len(autocomplete.autocomplete('genre', 'р')), 1)
+        invalidate_autocomplete('genre')
+        self.assertEqual([text for _, text in autocomplete.autocomplete('genre', 'р')], ['Рассказ', 'Роман'])
+
+
+class AutocompleteWidgetTest(TestCase):
+
+    def setUp(self):
+        self.authors = [
+            Author.objects.create(first_name=f'Имя{i}', last_name=f'Фамилия{i}', date_of_birth='1900-01-01')
+            for i in range(50)
+        ]
+        self.genres = [Genre.objects.create(genre=f'Жанр {i}') for i in range(50)]
+        self.book = Book.objects.create(title='Книга', author=self.authors[0], about='Описание')
+        self.book.genre.set(self.genres[:2])
+
+        user = get_user_model().objects.create(username='editor')
+        user.user_permissions.add(Permission.objects.get(codename='change_book'),
+                                  Permission.objects.get(codename='add_book'))
+        self.client = Client()
+        self.client.force_login(user)
+
+    def test_renders_only_selected_options(self):
+        html = AddBookForm(instance=self.book).as_p()
+        self.assertEqual(html.count('<option'), 4)
+        self.assertIn('selected>Фамилия0 Имя0</option>', html)
+        self.assertIn('data-autocomplete-url="/api/v1/autocomplete/genre/"', html)
+        self.assertIn('Catalog/js/autocomplete.js', str(AddBookForm().media))
+
+    def test_form_queries_do_not_depend_on_catalog_size(self):
+        url = reverse('catalog:edit_book', kwargs={'slug': self.book.slug})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        for i in range(50, 250):
+            Author.objects.create(first_name=f'Имя{i}', last_name=f'Фамилия{i}', date_of_birth='1900-01-01')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(small), len(large))
+        self.assertNotContains(response, 'Фамилия1 Имя1')
+
+    def test_submit(self):
+        response = self.client.post(reverse('catalog:add_book'), {
+            'title': 'Новая книга',
+            'author': self.authors[10].pk,
+            'genre': [self.genres[20].pk, self.genres[30].pk],
+            'about': 'Описание',
+        })
+        self.assertEqual(response.status_code, 302)
+        book = Book.objects.get(title='Новая книга')
+        self.assertEqual(book.author, self.authors[10])
+        self.assertEqual(set(book.genre.all()), {self.genres[20], self.genres[30]})
@@ -0,0 +1,102 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from slugify import slugify
+
+from Catalog.models import *
+from Catalog.search import search_books
+
+
+class ImportCatalogCommandTest(TestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+        self.authors = self.write('authors.csv', (
+            'first_name,last_name,date_of_birth,date_of_death,about\n'
+            'Лев,Толстой,1828-09-09,1910-11-20,Писатель\n'
+            'Фёдор,Достоевский,1821-11-11,,\n'
+        ))
+        self.genres = self.write('genres.csv', 'genre\nРоман\nДрама\n')
+        self.books = self.write('books.jsonl', '\n'.join(json.dumps(book, ensure_ascii=False) for book in [
+            {'title': 'Война и мир', 'author': 'Лев Толстой', 'genres': ['Роман', 'Драма'], 'about': 'Эпопея'},
+            {'title': 'Идиот', 'author': 'Фёдор Достоевский', 'genres': ['Роман'], 'about': 'Роман', 'rating': 5},
+            {'title': 'Бесы', 'author': 'Фёдор Достоевский', 'genres': [], 'about': 'Роман'},
+            {'title': 'Неизвестная', 'author': 'Нет Такого', 'genres': [], 'about': ''},
+        ]))
+
+    def write(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command('import_catalog', *args, stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        self.run_import('--authors', self.authors, '--genres', self.genres, '--books', self.books,
+                        '--batch-size', '2')
+
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertCountEqual(Book.objects.values_list('title', flat=True), ['Война и мир', 'Идиот', 'Бесы'])
+
+        book = Book.objects.get(title='Война и мир')
+        self.assertEqual(book.slug, slugify('Война и мир'))
+        self.assertEqual(book.author.last_name, 'Толстой')
+        self.assertCountEqual(book.genre.values_list('genre', flat=True), ['Роман', 'Драма'])
+        # Рейтинг складывается из оценок пользователей и из файла не импортируется
+        self.assertEqual(Book.objects.get(title='Идиот').rating, 0)
+        self.assertIsNone(Author.objects.get(last_name='Достоевский').date_of_death)
+
+    def test_imported_books_are_searchable(self):
+        self.run_import('--authors', self.authors, '--genres', self.genres, '--books', self.books)
+        self.assertEqual([book.title for book in search_books('Толстой')], ['Война и мир'])
+        self.assertEqual([book.title for book in search_books('драма')], ['Война и мир'])
+        self.assertEqual([book.title for book in search_books('эпопея')], ['Война и мир'])
+
+    def test_imported_books_are_counted(self):
+        self.run_import('--authors', self.authors, '--genres', self.genres, '--books', self.books)
+        self.assertEqual(dict(Author.objects.values_list('last_name', 'books_count')),
+                         {'Толстой': 1, 'Достоевский': 2})
+        self.assertEqual(dict(Genre.objects.values_list('genre', 'books_count')), {'Роман': 2, 'Драма': 1})
+
+    def test_existing_objects_are_skipped(self):
+        self.run_import('--authors', self.authors, '--genres', self.genres, '--books', self.books)
+        output = self.run_import('--authors', self.authors, '--genres', self.genres, '--books', self.books)
+
+        self.assertIn('Книги: обработано 4, создано 0, пропущено 4', output)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_csv_books(self):
+        books = self.write('books.csv', 'title,author,genres,about\nВоскресение,Лев Толстой,Роман;Драма,Роман\n')
+        self.run_import('--authors', self.authors, '--genres', self.genres, '--books', books)
+        self.assertEqual(Book.objects.get().genre.count(), 2)
+
+    def test_offset(self):
+        output = self.run_import('--authors', self.authors, '--genres', self.genres, '--books', self.books,
+                                 '--offset', '2')
+        self.assertEqual(list(Book.objects.values_list('title', flat=True)), ['Бесы'])
+        self.assertIn('--offset 4', output)
+
+    def test_dry_run(self):
+        output = self.run_import('--authors', self.authors, '--genres', self.genres, '--books', self.books,
+                                 '--dry-run')
+        self.assertIn('Книги: обработано 4, создано 3, пропущено 1', output)
+        self.assertFalse(Author.objects.exists())
+        self.assertFalse(Genre.objects.exists())
+        self.assertFalse(Book.objects.exists())
+
+    def test_unknown_format(self):
+        with self.assertRaises(CommandError):
+            self.run_import('--books', self.write('books.xml', ''))
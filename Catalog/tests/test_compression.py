@@ -0,0 +1,212 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+import brotli
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from Catalog.models import *
+from ReadMe.compression import STREAM_FLUSH_SIZE, CompressionMiddleware, select_encoding
+
+DECOMPRESS = {'br': brotli.decompress, 'gzip': gzip.decompress}
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class SelectEncodingTest(SimpleTestCase):
+
+    def test_select_encoding(self):
+        self.assertEqual(select_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(select_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(select_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(select_encoding('br;q=0, gzip;q=0.1'), 'gzip')
+        self.assertEqual(select_encoding('*'), 'br')
+        self.assertEqual(select_encoding('*;q=0.5, br;q=0'), 'gzip')
+        self.assertIsNone(select_encoding(''))
+        self.assertIsNone(select_encoding('identity, deflate'))
+        self.assertIsNone(select_encoding('gzip;q=0'))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTest(SimpleTestCase):
+
+    def process(self, response, accept_encoding='gzip, br'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_compress(self):
+        content = 'Книга '.encode() * 100
+        for accept_encoding, encoding in [('gzip, br', 'br'), ('gzip', 'gzip')]:
+            response = self.process(HttpResponse(content), accept_encoding)
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertEqual(int(response['Content-Length']), len(response.content))
+            self.assertEqual(DECOMPRESS[encoding](response.content), content)
+
+    def test_not_accepted(self):
+        response = self.process(HttpResponse('Книга' * 100), 'gzip;q=0, br;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        # Ответ зависит от Accept-Encoding, даже если этот не сжат
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_threshold(self):
+        response = self.process(HttpResponse('a' * 99))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'a' * 99)
+        self.assertEqual(self.process(HttpResponse('a' * 100))['Content-Encoding'], 'br')
+
+    def test_not_compressible(self):
+        for response in [
+            HttpResponse(b'\x89PNG' * 100, content_type='image/png'),
+            HttpResponse(b'PK' * 100, content_type='application/zip'),
+            HttpResponse('a' * 1000, headers={'Content-Encoding': 'gzip'}),
+        ]:
+            content = response.content
+            response = self.process(response)
+            self.assertEqual(response.content, content)
+            self.assertFalse(response.has_header('Vary'))
+
+    def test_incompressible_content_kept(self):
+        content = os.urandom(512)
+        response = self.process(HttpResponse(content))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, content)
+
+    def test_weak_etag(self):
+        response = self.process(HttpResponse('a' * 1000, headers={'ETag': '"abc"'}))
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        response = self.process(HttpResponse('a' * 1000, headers={'ETag': 'W/"abc"'}))
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    def test_gzip_random_padding(self):
+        content = 'Книга '.encode() * 100
+        sizes = set()
+        for _ in range(20):
+            response = self.process(HttpResponse(content), 'gzip')
+            self.assertEqual(gzip.decompress(response.content), content)
+            sizes.add(len(response.content))
+        # Длина сжатого ответа не повторяется от запроса к запросу (защита от BREACH)
+        self.assertGreater(len(sizes), 1)
+
+    def test_csrf_response_is_not_brotli(self):
+        content = 'Книга '.encode() * 100
+
+        def csrf_response():
+            response = HttpResponse(content)
+            response.set_cookie(settings.CSRF_COOKIE_NAME, 'a' * 32)
+            return response
+
+        response = self.process(csrf_response(), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), content)
+        response = self.process(csrf_response(), 'br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, content)
+
+    def test_stream(self):
+        lines = [f'{{"title": "Книга {i}"}}\n'.encode() for i in range(10000)]
+        for encoding in DECOMPRESS:
+            response = self.process(StreamingHttpResponse(iter(lines), content_type='application/x-ndjson'), encoding)
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertFalse(response.has_header('Content-Length'))
+            chunks = list(response.streaming_content)
+            # Сжатые данные отдаются по ходу потока, а не одной частью в конце
+            self.assertGreaterEqual(len(chunks), len(b''.join(lines)) // STREAM_FLUSH_SIZE)
+            self.assertEqual(DECOMPRESS[encoding](b''.join(chunks)), b''.join(lines))
+
+    async def test_async_stream(self):
+        async def lines():
+            for i in range(100):
+                yield f'{{"title": "Книга {i}"}}\n'.encode()
+
+        response = self.process(StreamingHttpResponse(lines(), content_type='application/x-ndjson'))
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(brotli.decompress(content).decode().splitlines()[-1], '{"title": "Книга 99"}')
+
+
+class CompressionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(genre='Роман')
+        for i in range(30):
+            Book.objects.create(title=f'Книга {i:02}', about='Описание книги ' * 20).genre.add(genre)
+
+    def test_book_list_page(self):
+        plain = self.client.get(reverse('catalog:books'))
+        response = self.client.get(reverse('catalog:books'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 3)
+
+    @override_settings(COMPRESSION_MIN_SIZE=100)
+    def test_page_with_csrf_token_is_gzipped(self):
+        response = self.client.get(reverse('users:login'), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'csrfmiddlewaretoken', gzip.decompress(response.content))
+
+    def test_api(self):
+        plain = self.client.get('/api/v1/books/')
+        response = self.client.get('/api/v1/books/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+
+    def test_ndjson_stream(self):
+        response = self.client.get('/api/v1/books/', {'stream': 'ndjson'}, HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        lines = brotli.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], [f'Книга {i:02}' for i in range(30)])
+
+    async def test_ndjson_stream_asgi(self):
+        response = await self.async_client.get('/api/v1/books/', {'stream': 'ndjson'},
+                                               headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(gzip.decompress(content).splitlines()), 30)
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_conditional_get(self):
+        book = Book.objects.first()
+        response = self.client.get(f'/api/v1/book/{book.pk}', HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        response = self.client.get(f'/api/v1/book/{book.pk}', HTTP_ACCEPT_ENCODING='br',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, COMPRESSION_MIN_SIZE=0)
+class BookFileCompressionTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.content = 'Глава первая. '.encode() * 500
+        book = Book.objects.create(title='Война и мир', about='Эпопея',
+                                   link_to_file=SimpleUploadedFile('book.txt', self.content, content_type='text/plain'))
+        self.url = reverse('catalog:book_download', args=[book.slug])
+
+    def test_range_is_not_compressed(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-1099', HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(response.status_code, 206)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Content-Range'], f'bytes 100-1099/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:1100])
+
+    def test_file_is_not_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(int(response['Content-Length']), len(self.content))
+        self.assertEqual(b''.join(response.streaming_content), self.content)
@@ -0,0 +1,98 @@
+from django.contrib.auth.models import Group
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from Catalog.models import *
+
+
+class ConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.author = Author.objects.create(
+            first_name='Лев',
+            last_name='Толстой',
+            date_of_birth='1828-09-09'
+        )
+        self.genre = Genre.objects.create(genre='Роман')
+        self.book = Book.objects.create(title='Война и мир', author=self.author, about='Эпопея')
+        self.client = Client()
+
+    def revalidate(self, url, response, **headers):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+
+    def assertNotModified(self, url, change=None):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+
+        # Повторный запрос с тем же ETag: только запрос валидаторов, страница не формируется
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+        if change is not None:
+            change()
+            self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_book_detail(self):
+        def change():
+            self.book.about = 'Роман-эпопея'
+            self.book.save()
+
+        self.assertNotModified(self.book.get_absolute_url(), change)
+
+    def test_book_detail_follows_genres(self):
+        self.assertNotModified(self.book.get_absolute_url(), lambda: self.book.genre.add(self.genre))
+
+    def test_book_detail_follows_author(self):
+        def change():
+            self.author.last_name = 'Толстый'
+            self.author.save()
+
+        self.assertNotModified(self.book.get_absolute_url(), change)
+
+    def test_book_detail_if_modified_since(self):
+        url = self.book.get_absolute_url()
+        response = self.client.get(url)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_author_detail_follows_books(self):
+        url = self.author.get_absolute_url()
+        self.assertNotModified(url, lambda: Book.objects.create(title='Анна Каренина', author=self.author))
+        self.assertNotModified(url, lambda: Book.objects.get(title='Анна Каренина').delete())
+
+        other_author = Author.objects.create(first_name='Фёдор', last_name='Достоевский', date_of_birth='1821-11-11')
+
+        def move_book():
+            self.book.author = other_author
+            self.book.save()
+
+        self.assertNotModified(url, move_book)
+
+    def test_etag_depends_on_user_and_groups(self):
+        url = self.book.get_absolute_url()
+        user = get_user_model().objects.create(username='reader')
+        guest_response = self.client.get(url)
+
+        self.client.force_login(user)
+        user_response = self.client.get(url)
+        self.assertNotIn('Last-Modified', user_response)
+        self.assertEqual(self.revalidate(url, guest_response).status_code, 200)
+
+        user.groups.add(Group.objects.create(name='staff'))
+        self.assertEqual(self.revalidate(url, user_response).status_code, 200)
+
+    def test_etag_depends_on_csrf_token(self):
+        url = self.book.get_absolute_url()
+        self.client.force_login(get_user_model().objects.create(username='reader'))
+        self.client.cookies['csrftoken'] = 'a' * 32
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+        # Новый вход меняет токен CSRF: страницу с формами нужно отдать заново
+        self.client.cookies['csrftoken'] = 'b' * 32
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_missing_object(self):
+        response = self.client.get(reverse('catalog:book_detail', args=['missing']), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,115 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from Catalog.bookshelf import add_books, remove_books
+from Catalog.counters import change_counters, recount
+from Catalog.models import *
+
+
+class CountersTest(TestCase):
+
+    def setUp(self):
+        self.author = Author.objects.create(first_name='Лев', last_name='Толстой', date_of_birth='1828-09-09')
+        self.other_author = Author.objects.create(first_name='Фёдор', last_name='Достоевский',
+                                                  date_of_birth='1821-11-11')
+        self.novel = Genre.objects.create(genre='Роман')
+        self.drama = Genre.objects.create(genre='Драма')
+        self.book = Book.objects.create(title='Война и мир', author=self.author, about='Эпопея')
+        self.user = get_user_model().objects.create(username='reader')
+        self.other_user = get_user_model().objects.create(username='other')
+
+    def assertCounter(self, obj, field, expected):
+        obj.refresh_from_db(fields=[field])
+        self.assertEqual(getattr(obj, field), expected)
+
+    def test_author_books_count(self):
+        self.assertCounter(self.author, 'books_count', 1)
+        Book.objects.create(title='Анна Каренина', author=self.author, about='Роман')
+        self.assertCounter(self.author, 'books_count', 2)
+
+        self.book.author = self.other_author
+        self.book.save()
+        self.assertCounter(self.author, 'books_count', 1)
+        self.assertCounter(self.other_author, 'books_count', 1)
+
+        self.book.delete()
+        self.assertCounter(self.other_author, 'books_count', 0)
+
+    def test_genre_books_count(self):
+        self.book.genre.add(self.novel, self.drama)
+        self.book.genre.add(self.novel)
+        self.assertCounter(self.novel, 'books_count', 1)
+
+        self.book.genre.remove(self.drama, self.drama)
+        self.book.genre.remove(self.drama)
+        self.assertCounter(self.drama, 'books_count', 0)
+
+        other = Book.objects.create(title='Идиот', author=self.other_author, about='Роман')
+        self.novel.book_set.add(other)
+        self.assertCounter(self.novel, 'books_count', 2)
+
+        self.book.genre.clear()
+        self.assertCounter(self.novel, 'books_count', 1)
+
+        self.novel.book_set.clear()
+        self.assertCounter(self.novel, 'books_count', 0)
+
+    def test_genre_count_on_book_delete(self):
+        self.book.genre.set([self.novel, self.drama])
+        self.book.delete()
+        self.assertCounter(self.novel, 'books_count', 0)
+        self.assertCounter(self.drama, 'books_count', 0)
+
+    def test_bookshelves_count(self):
+        bookshelf = Bookshelf.objects.create(user=self.user)
+        bookshelf.book.add(self.book)
+        self.assertCounter(self.book, 'bookshelves_count', 1)
+
+        add_books(self.other_user, Book.objects.filter(pk=self.book.pk))
+        add_books(self.other_user, Book.objects.filter(pk=self.book.pk))
+        self.assertCounter(self.book, 'bookshelves_count', 2)
+
+        remove_books(self.other_user, [self.book.pk])
+        remove_books(self.other_user, [self.book.pk])
+        self.assertCounter(self.book, 'bookshelves_count', 1)
+
+        self.user.delete()
+        self.assertCounter(self.book, 'bookshelves_count', 0)
+
+    def test_save_does_not_overwrite_counter(self):
+        stale = Author.objects.get(pk=self.author.pk)
+        Book.objects.create(title='Анна Каренина', author=self.author, about='Роман')
+        stale.about = 'Русский писатель'
+        stale.save()
+        self.assertCounter(self.author, 'books_count', 2)
+        self.assertCounter(self.author, 'about', 'Русский писатель')
+
+    def test_change_counters_does_not_go_below_zero(self):
+        change_counters(Genre, 'books_count', {self.novel.pk: -5, self.drama.pk: 3})
+        self.assertCounter(self.novel, 'books_count', 0)
+        self.assertCounter(self.drama, 'books_count', 3)
+
+    def test_recount(self):
+        self.book.genre.add(self.novel)
+        for i in range(5):
+            Book.objects.create(title=f'Книга {i}', author=self.other_author, about='')
+        Author.objects.update(books_count=100)
+        Genre.objects.update(books_count=100)
+
+        self.assertEqual(recount(Author, 'books_count', batch_size=1), 2)
+        self.assertEqual(recount(Genre, 'books_count', batch_size=1), 2)
+        self.assertEqual(recount(Author, 'books_count'), 0)
+        self.assertCounter(self.author, 'books_count', 1)
+        self.assertCounter(self.other_author, 'books_count', 5)
+        self.assertCounter(self.novel, 'books_count', 1)
+        self.assertCounter(self.drama, 'books_count', 0)
+
+    def test_recount_command(self):
+        Book.objects.update(bookshelves_count=3)
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('bookshelves_count: исправлено 1', out.getvalue())
+        self.assertCounter(self.book, 'bookshelves_count', 0)
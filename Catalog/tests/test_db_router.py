@@ -0,0 +1,125 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.views import View
+
+from Catalog.fragments import can_cache_fragment, invalidate_fragments
+from Catalog.models import *
+from ReadMe.db_router import PRIMARY_COOKIE, ReplicaRoutingMiddleware, use_primary_db
+
+REPLICAS = ['replica1', 'replica2']
+
+
+def read_db_view(request):
+    return HttpResponse(router.db_for_read(Book))
+
+
+def write_then_read_view(request):
+    router.db_for_write(Book)
+    return HttpResponse(router.db_for_read(Book))
+
+
+class PrimaryView(View):
+    use_primary_db = True
+
+    def get(self, request):
+        return read_db_view(request)
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(SimpleTestCase):
+
+    def request(self, view, method='get', cookies=None):
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        middleware = ReplicaRoutingMiddleware(lambda request: middleware.process_view(request, view, (), {}) or view(request))
+        response = middleware(request)
+        return response.content.decode(), response
+
+    def test_safe_request_reads_from_replica(self):
+        db, response = self.request(read_db_view)
+        self.assertIn(db, REPLICAS)
+        self.assertNotIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_outside_request_reads_from_primary(self):
+        self.assertEqual(router.db_for_read(Book), 'default')
+
+    def test_write_request_uses_primary_and_pins_client(self):
+        db, response = self.request(read_db_view, method='post')
+        self.assertEqual(db, 'default')
+        self.assertEqual(response.cookies[PRIMARY_COOKIE]['max-age'], settings.DATABASE_REPLICA_LAG)
+
+        db, _ = self.request(read_db_view, cookies={PRIMARY_COOKIE: '1'})
+        self.assertEqual(db, 'default')
+
+    def test_read_after_write_in_same_request(self):
+        db, response = self.request(write_then_read_view)
+        self.assertEqual(db, 'default')
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+    def test_view_opt_out(self):
+        self.assertEqual(self.request(use_primary_db(read_db_view))[0], 'default')
+        self.assertEqual(self.request(PrimaryView.as_view())[0], 'default')
+
+    def test_transaction_reads_from_primary(self):
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.request(read_db_view)[0], 'default')
+
+    def test_users_and_sessions_read_from_primary(self):
+        def view(request):
+            return HttpResponse(','.join(router.db_for_read(model) for model in (get_user_model(), Group, Session)))
+
+        self.assertEqual(self.request(view)[0], 'default,default,default')
+
+    def test_recently_changed_fragment_is_not_cached_from_replica(self):
+        cache.clear()
+        invalidate_fragments(Book, [1])
+
+        def view(request):
+            return HttpResponse(f'{can_cache_fragment(Book(pk=1))},{can_cache_fragment(Book(pk=2))}')
+
+        self.assertEqual(self.request(view)[0], 'False,True')
+        self.assertEqual(self.request(view, cookies={PRIMARY_COOKIE: '1'})[0], 'True,True')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica1', 'Catalog'))
+        self.assertTrue(router.allow_migrate('default', 'Catalog'))
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'реплики не настроены (DB_REPLICA_HOSTS)')
+class ReplicaRoutingIntegrationTest(TransactionTestCase):
+    """
+    Запросы к реальным репликам: в тестах они указывают на тестовую базу основной (TEST.MIRROR)
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        self.book = Book.objects.create(title='Война и мир', about='Эпопея')
+
+    def replica_queries(self, *args, **kwargs):
+        contexts = [CaptureQueriesContext(connections[alias]) for alias in settings.DATABASE_REPLICAS]
+        for context in contexts:
+            context.__enter__()
+        response = Client().get(*args, **kwargs)
+        for context in contexts:
+            context.__exit__(None, None, None)
+        self.assertEqual(response.status_code, 200)
+        return sum(len(context) for context in contexts)
+
+    def test_catalog_pages_read_from_replica(self):
+        self.assertGreater(self.replica_queries(reverse('catalog:books')), 0)
+        self.assertGreater(self.replica_queries(self.book.get_absolute_url()), 0)
+        self.assertGreater(self.replica_queries(f'/api/v1/book/{self.book.pk}'), 0)
+
+    def test_pinned_client_reads_from_primary(self):
+        client_cookie = {'HTTP_COOKIE': f'{PRIMARY_COOKIE}=1'}
+        self.assertEqual(self.replica_queries(reverse('catalog:books'), **client_cookie), 0)
@@ -0,0 +1,103 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from Catalog.downloads import RangeNotSatisfiable, parse_range
+from Catalog.models import *
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = bytes(range(256)) * 40
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BookFileTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.book = Book.objects.create(
+            title='Война и мир',
+            about='Эпопея',
+            link_to_file=SimpleUploadedFile('book.pdf', CONTENT, content_type='application/pdf')
+        )
+        self.client = Client()
+        self.read_url = reverse('catalog:book_read', args=[self.book.slug])
+        self.download_url = reverse('catalog:book_download', args=[self.book.slug])
+
+    def test_full_file(self):
+        response = self.client.get(self.read_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+        self.assertIn('max-age', response['Cache-Control'])
+
+    def test_download_is_attachment(self):
+        response = self.client.get(self.download_url)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertIn(f'{self.book.slug}.pdf', response['Content-Disposition'])
+
+    def test_range(self):
+        response = self.client.get(self.download_url, HTTP_RANGE='bytes=100-1099')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[100:1100])
+        self.assertEqual(response['Content-Length'], '1000')
+        self.assertEqual(response['Content-Range'], f'bytes 100-1099/{len(CONTENT)}')
+
+    def test_resume_download(self):
+        response = self.client.get(self.download_url)
+        response = self.client.get(self.download_url, HTTP_RANGE='bytes=5000-', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[5000:])
+
+        # Файл изменился с прошлой загрузки: докачка невозможна, отдается весь файл
+        response = self.client.get(self.download_url, HTTP_RANGE='bytes=5000-', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.download_url, HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_not_modified(self):
+        response = self.client.get(self.read_url)
+        response = self.client.get(self.read_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(SENDFILE_BACKEND='x-accel-redirect', SENDFILE_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.download_url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.book.link_to_file.name}')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+
+    @override_settings(SENDFILE_BACKEND='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.read_url)
+        self.assertEqual(response['X-Sendfile'], self.book.link_to_file.path)
+
+    def test_book_without_file(self):
+        book = Book.objects.create(title='Анна Каренина', about='Роман')
+        response = self.client.get(reverse('catalog:book_read', args=[book.slug]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-2000', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 1000))
+        self.assertIsNone(parse_range('items=0-9', 1000))
+        self.assertIsNone(parse_range(None, 1000))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=1000-', 1000)
@@ -0,0 +1,194 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Catalog.facets import facet_counts, rebuild_facets, refresh_facets
+from Catalog.models import *
+from Catalog.ratings import rate_book
+
+BookGenre = Book.genre.through
+
+
+class FacetsTest(TestCase):
+
+    def setUp(self):
+        self.tolstoy = Author.objects.create(first_name='Лев', last_name='Толстой', date_of_birth='1828-09-09')
+        self.chekhov = Author.objects.create(first_name='Антон', last_name='Чехов', date_of_birth='1860-01-29')
+        self.novel = Genre.objects.create(genre='Роман')
+        self.story = Genre.objects.create(genre='Рассказ')
+        self.war = Book.objects.create(title='Война и мир', author=self.tolstoy, about='')
+        self.war.genre.set([self.novel])
+        self.anna = Book.objects.create(title='Анна Каренина', author=self.tolstoy, about='')
+        self.anna.genre.set([self.novel, self.story])
+        self.dama = Book.objects.create(title='Дама с собачкой', author=self.chekhov, about='')
+        self.dama.genre.set([self.story])
+        self.users = [get_user_model().objects.create(username=f'reader{i}') for i in range(2)]
+
+    def facets(self):
+        return list(BookFacet.objects.filter(books_count__gt=0).order_by('genre_id', 'author_id', 'rating')
+                    .values_list('genre_id', 'author_id', 'rating', 'books_count'))
+
+    def counts(self, **filters):
+        facets = facet_counts(**filters)
+        return {
+            'genres': {str(genre): count for genre, count in facets['genres']},
+            'authors': {str(author): count for author, count in facets['authors']},
+            'ratings': dict(facets['ratings']),
+        }
+
+    def test_counts(self):
+        self.assertEqual(self.counts(), {
+            'genres': {'Роман': 2, 'Рассказ': 2},
+            'authors': {'Толстой Лев': 2, 'Чехов Антон': 1},
+            'ratings': {5: 0, 4: 0, 3: 0, 2: 0, 1: 0},
+        })
+        self.assertEqual(self.counts(genre=self.story), {
+            'genres': {'Роман': 2, 'Рассказ': 2},
+            'authors': {'Толстой Лев': 1, 'Чехов Антон': 1},
+            'ratings': {5: 0, 4: 0, 3: 0, 2: 0, 1: 0},
+        })
+        self.assertEqual(self.counts(author=self.tolstoy)['genres'], {'Роман': 2, 'Рассказ': 1})
+
+    def test_rating_changes_counts(self):
+        rate_book(self.users[0], self.war, 5)
+        rate_book(self.users[1], self.war, 4)
+        rate_book(self.users[0], self.dama, 3)
+        self.assertEqual(self.counts()['ratings'], {5: 0, 4: 1, 3: 2, 2: 2, 1: 2})
+        self.assertEqual(self.counts(min_rating=4), {
+            'genres': {'Роман': 1},
+            'authors': {'Толстой Лев': 1},
+            'ratings': {5: 0, 4: 1, 3: 2, 2: 2, 1: 2},
+        })
+        self.assertEqual(self.counts(genre=self.story)['ratings'], {5: 0, 4: 0, 3: 1, 2: 1, 1: 1})
+
+    def test_book_changes(self):
+        self.dama.author = self.tolstoy
+        self.dama.save()
+        self.anna.genre.remove(self.story)
+        self.assertEqual(self.counts()['authors'], {'Толстой Лев': 3})
+        self.assertEqual(self.counts()['genres'], {'Роман': 2, 'Рассказ': 1})
+
+        self.story.book_set.add(self.war)
+        self.assertEqual(self.counts(author=self.tolstoy)['genres'], {'Роман': 2, 'Рассказ': 2})
+
+        self.war.delete()
+        self.assertEqual(self.counts()['genres'], {'Роман': 1, 'Рассказ': 1})
+
+        self.chekhov.delete()
+        self.novel.delete()
+        self.assertEqual(self.counts(), {
+            'genres': {'Рассказ': 1},
+            'authors': {'Толстой Лев': 2},
+            'ratings': {5: 0, 4: 0, 3: 0, 2: 0, 1: 0},
+        })
+
+    def test_refresh_is_idempotent(self):
+        before = self.facets()
+        refresh_facets([self.war.pk, self.anna.pk, self.dama.pk])
+        refresh_facets([self.war.pk, self.war.pk])
+        self.assertEqual(self.facets(), before)
+
+    def test_rebuild_matches_incremental(self):
+        rate_book(self.users[0], self.anna, 2)
+        self.dama.genre.add(self.novel)
+        incremental = self.facets()
+        BookFacet.objects.all().delete()
+        BookFacetState.objects.all().delete()
+
+        rebuild_facets()
+        self.assertEqual(self.facets(), incremental)
+        refresh_facets([self.war.pk, self.anna.pk, self.dama.pk])
+        self.assertEqual(self.facets(), incremental)
+
+    def test_rebuild_command(self):
+        BookFacet.objects.update(books_count=100)
+        out = StringIO()
+        call_command('rebuild_facets', stdout=out)
+        self.assertIn('Счетчики фасетов пересчитаны', out.getvalue())
+        self.assertEqual(self.counts()['authors'], {'Толстой Лев': 2, 'Чехов Антон': 1})
+
+    def test_filtered_list(self):
+        rate_book(self.users[0], self.anna, 5)
+        client = Client()
+        url = reverse('catalog:books')
+
+        response = client.get(url, {'genre': self.novel.slug})
+        self.assertEqual({book.title for book in response.context['book_list']}, {'Война и мир', 'Анна Каренина'})
+        self.assertContains(response, 'Толстой Лев</a> (2)')
+
+        response = client.get(url, {'genre': self.story.slug, 'author': self.tolstoy.slug, 'min_rating': 4})
+        self.assertEqual([book.title for book in response.context['book_list']], ['Анна Каренина'])
+        self.assertEqual(response.context['selected_min_rating'], 4)
+
+        # Недопустимый минимальный рейтинг не фильтрует, неизвестный жанр - 404
+        self.assertEqual(len(client.get(url, {'min_rating': 'abc'}).context['book_list']), 3)
+        self.assertEqual(client.get(url, {'genre': 'net-takogo'}).status_code, 404)
+
+    def test_filters_use_indexes(self):
+        # Планы зависят от статистики, поэтому таблицы заполняются до реалистичных размеров
+        tables = {model: connection.ops.quote_name(model._meta.db_table) for model in (Author, Genre, Book, BookGenre)}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {tables[Author]} (first_name, last_name, slug, date_of_birth, books_count, updated_at) '
+                f"SELECT 'Имя', 'Фамилия ' || i, 'avtor-' || i, DATE '1900-01-01', 0, now() FROM generate_series(1, 500) i")
+            cursor.execute(
+                f'INSERT INTO {tables[Genre]} (genre, slug, books_count) '
+                f"SELECT 'Жанр ' || i, 'zhanr-' || i, 0 FROM generate_series(1, 100) i")
+            cursor.execute(
+                f'INSERT INTO {tables[Book]} (title, slug, author_id, about, rating, rating_sum, rating_count, '
+                f'bookshelves_count, updated_at) '
+                f"SELECT 'Книга ' || i, 'kniga-' || i, (SELECT min(id) FROM {tables[Author]}) + i % 500, '', "
+                f'(i % 50) / 10.0, 0, 0, 0, now() FROM generate_series(1, 20000) i')
+            cursor.execute(
+                f'INSERT INTO {tables[BookGenre]} (book_id, genre_id) '
+                f'SELECT b.id, (SELECT min(id) FROM {tables[Genre]}) + (b.id + k * 37) % 100 '
+                f'FROM {tables[Book]} b, generate_series(0, 1) k')
+            # Редкий жанр: 20 книг из 20000
+            cursor.execute(
+                f"INSERT INTO {tables[Genre]} (genre, slug, books_count) VALUES ('Редкий жанр', 'redkiy-zhanr', 0)")
+            cursor.execute(
+                f'INSERT INTO {tables[BookGenre]} (book_id, genre_id) '
+                f"SELECT b.id, (SELECT id FROM {tables[Genre]} WHERE slug = 'redkiy-zhanr') "
+                f'FROM {tables[Book]} b WHERE b.id % 1000 = 0')
+            for table in tables.values():
+                cursor.execute(f'ANALYZE {table}')
+        rebuild_facets()
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {connection.ops.quote_name(BookFacet._meta.db_table)}')
+
+        author = Author.objects.get(slug='avtor-7')
+        # Книги редкого жанра выбираются по индексу genre_id таблицы связей, а для частого жанра
+        # дешевле идти по индексу названий до первых совпадений - в обоих случаях без полного чтения таблицы
+        self.assertUsesIndex({'genre': 'redkiy-zhanr'}, 'Catalog_book_genre_genre_id')
+        self.assertNotIn('Seq Scan', '\n'.join(self.plans({'genre': 'zhanr-7'})))
+        self.assertUsesIndex({'author': author.slug}, 'book_author_title_idx')
+        self.assertUsesIndex({'min_rating': 4, 'ordering': 'rating'}, 'book_rating_title_idx')
+        # Фасет жанров при выбранном авторе
+        self.assertUsesIndex({'author': author.slug, 'min_rating': 4}, 'book_facet_author_idx', BookFacet)
+
+    def assertUsesIndex(self, params, index, model=Book):
+        """
+        Проверяет, что один из запросов к таблице model на странице списка книг с фильтрами params использует index
+        """
+        plans = self.plans(params, model)
+        self.assertTrue(any(index in plan for plan in plans), '\n\n'.join(plans))
+
+    def plans(self, params, model=Book):
+        """
+        Планы (EXPLAIN) запросов к таблице model, которые выполняет страница списка книг с фильтрами params
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Client().get(reverse('catalog:books'), params).status_code, 200)
+        table = f'FROM "{model._meta.db_table}"'
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if table in query['sql']:
+                    cursor.execute('EXPLAIN ' + query['sql'])
+                    plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+        return plans
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from Catalog.fragments import fragment_key
+from Catalog.models import *
+
+
+class FragmentCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(
+            first_name='Лев',
+            last_name='Толстой',
+            date_of_birth='1828-09-09',
+            about='Русский писатель'
+        )
+        self.genre = Genre.objects.create(genre='Роман')
+        self.book = Book.objects.create(title='Война и мир', author=self.author, about='Эпопея')
+        self.other_book = Book.objects.create(title='Анна Каренина', author=self.author, about='Роман')
+        self.client = Client()
+
+    def get_books_page(self):
+        return self.client.get(reverse('catalog:books')).content.decode()
+
+    def test_list_item_is_served_from_cache(self):
+        self.get_books_page()
+        # update() не вызывает сигналов, поэтому закешированный фрагмент остается прежним
+        Book.objects.filter(pk=self.book.pk).update(about='Новое описание')
+        self.assertIn('Эпопея', self.get_books_page())
+
+    def test_book_save_invalidates_only_its_fragment(self):
+        book_key = fragment_key('book_list_item', self.book)
+        other_key = fragment_key('book_list_item', self.other_book)
+
+        self.book.about = 'Новое описание'
+        self.book.save()
+
+        self.assertNotEqual(fragment_key('book_list_item', self.book), book_key)
+        self.assertEqual(fragment_key('book_list_item', self.other_book), other_key)
+        self.assertIn('Новое описание', self.get_books_page())
+
+    def test_book_delete_invalidates_fragment(self):
+        key = fragment_key('book_list_item', self.book)
+        book = Book.objects.get(pk=self.book.pk)
+        book.delete()
+        self.assertNotEqual(fragment_key('book_list_item', self.book), key)
+
+    def test_genre_changes_invalidate_books(self):
+        key = fragment_key('book_list_item', self.book)
+        self.book.genre.add(self.genre)
+        changed_key = fragment_key('book_list_item', self.book)
+        self.assertNotEqual(changed_key, key)
+
+        self.genre.genre = 'Эпопея'
+        self.genre.save()
+        self.assertNotEqual(fragment_key('book_list_item', self.book), changed_key)
+
+        other_key = fragment_key('book_list_item', self.other_book)
+        self.genre.delete()
+        self.assertEqual(fragment_key('book_list_item', self.other_book), other_key)
+
+    def test_author_save_invalidates_author_fragment(self):
+        self.client.get(reverse('catalog:authors'))
+        book_key = fragment_key('book_list_item', self.book)
+
+        self.author.about = 'Автор романа «Война и мир»'
+        self.author.save()
+
+        self.assertIn('Автор романа «Война и мир»', self.client.get(reverse('catalog:authors')).content.decode())
+        self.assertEqual(fragment_key('book_list_item', self.book), book_key)
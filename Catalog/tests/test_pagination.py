@@ -0,0 +1,91 @@
+from urllib.parse import urlencode
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from Catalog.models import *
+from Catalog.pagination import CursorPaginator, ordering_key
+
+
+class CursorPaginatorTest(TestCase):
+
+    def setUp(self):
+        self.author = Author.objects.create(
+            first_name='Имя',
+            last_name='Фамилия',
+            date_of_birth='1900-01-01'
+        )
+        for i in range(12):
+            Book.objects.create(title=f'Книга {i:02}', author=self.author, about='Описание')
+        for first_name, last_name in [('Анна', 'Б'), ('Анна', 'А'), ('Борис', 'В'), ('Анна', 'В')]:
+            Author.objects.create(first_name=first_name, last_name=last_name, date_of_birth='1900-01-01')
+
+    def walk(self, queryset, per_page):
+        paginator = CursorPaginator(queryset, per_page)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_ordering_key_follows_meta_ordering(self):
+        self.assertEqual(ordering_key(Book.objects.all()), [('title', False)])
+        self.assertEqual(ordering_key(Author.objects.all()), [('first_name', False), ('last_name', False)])
+        self.assertEqual(ordering_key(Genre.objects.all()), [('genre', False)])
+        self.assertEqual(ordering_key(Book.objects.order_by('-rating')), [('rating', True), ('pk', False)])
+
+    def test_nullable_ordering_field_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ordering_key(Author.objects.order_by('date_of_death'))
+
+    def test_forward_walk_returns_every_object_once_in_order(self):
+        pages = self.walk(Book.objects.for_list(), 5)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        titles = [book.title for page in pages for book in page]
+        self.assertEqual(titles, list(Book.objects.values_list('title', flat=True)))
+
+    def test_backward_walk(self):
+        pages = self.walk(Book.objects.all(), 5)
+        paginator = CursorPaginator(Book.objects.all(), 5)
+
+        page = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual(list(page), list(pages[1]))
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+
+        page = paginator.page(page.previous_cursor)
+        self.assertEqual(list(page), list(pages[0]))
+        self.assertFalse(page.has_previous())
+
+    def test_composite_ordering(self):
+        pages = self.walk(Author.objects.all(), 2)
+        names = [(author.first_name, author.last_name) for page in pages for author in page]
+        self.assertEqual(names, list(Author.objects.values_list('first_name', 'last_name')))
+
+    def test_descending_ordering(self):
+        pages = self.walk(Book.objects.order_by('-title'), 5)
+        titles = [book.title for page in pages for book in page]
+        self.assertEqual(titles, sorted(titles, reverse=True))
+        self.assertEqual(len(titles), 12)
+
+    def test_broken_cursor_returns_first_page(self):
+        paginator = CursorPaginator(Book.objects.all(), 5)
+        self.assertEqual(list(paginator.get_page('broken')), list(paginator.page()))
+
+    def test_page_does_not_count_rows(self):
+        paginator = CursorPaginator(Book.objects.all(), 5)
+        cursor = paginator.page().next_cursor
+        with self.assertNumQueries(1):
+            paginator.page(cursor)
+
+    def test_book_list_view_follows_cursor(self):
+        client = Client()
+        response = client.get(reverse('catalog:books'))
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, '?' + urlencode({'cursor': next_cursor}))
+
+        response = client.get(reverse('catalog:books'), {'cursor': next_cursor})
+        self.assertEqual(
+            [book.title for book in response.context['book_list']],
+            [f'Книга {i:02}' for i in range(5, 10)]
+        )
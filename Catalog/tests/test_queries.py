@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Catalog.models import *
+from Catalog.views import AuthorDetailView, BookListView, BookshelfDetailView
+
+
+class CatalogQueryBudgetTest(TestCase):
+    """
+    Число SQL-запросов на страницу не должно зависеть от количества объектов на ней
+    """
+
+    def setUp(self):
+        self.author = Author.objects.create(
+            first_name='Имя',
+            last_name='Фамилия',
+            date_of_birth='1900-01-01'
+        )
+        self.genres = [Genre.objects.create(genre=f'Жанр {i}') for i in range(3)]
+        self.user = get_user_model().objects.create(username='reader')
+        self.bookshelf = Bookshelf.objects.create(user=self.user)
+
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def add_books(self, count):
+        start = Book.objects.count()
+        for i in range(start, start + count):
+            book = Book.objects.create(title=f'Книга {i}', author=self.author, about=f'Описание {i}')
+            book.genre.set(self.genres)
+            self.bookshelf.book.add(book)
+
+    def count_queries(self, client, url):
+        # Группы пользователя кешируются между запросами (users.roles), меряем с холодным кешем
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def assertQueryBudget(self, client, url, page_size):
+        self.add_books(1)
+        small_page = self.count_queries(client, url)
+        self.add_books(page_size * 2)
+        full_page = self.count_queries(client, url)
+        self.assertEqual(small_page, full_page)
+        return full_page
+
+    def test_book_list(self):
+        queries = self.assertQueryBudget(
+            self.guest_client, reverse('catalog:books'), BookListView.paginate_by)
+        # Выборка страницы (пагинация по курсору не выполняет COUNT(*)) и фасеты:
+        # три запроса к BookFacet и по одному на жанры и авторов из них
+        self.assertEqual(queries, 6)
+
+    def test_book_detail(self):
+        self.add_books(1)
+        book = Book.objects.first()
+        # Валидаторы условного GET + книга с автором через JOIN + жанры одним запросом + рекомендации
+        with self.assertNumQueries(4):
+            self.guest_client.get(book.get_absolute_url())
+
+    def test_author_detail(self):
+        queries = self.assertQueryBudget(
+            self.guest_client,
+            reverse('catalog:author_detail', args=[self.author.slug]),
+            AuthorDetailView.paginate_by
+        )
+        # Валидаторы условного GET + автор + выборка страницы
+        self.assertEqual(queries, 3)
+
+    def test_bookshelf(self):
+        self.assertQueryBudget(
+            self.authorized_client, reverse('catalog:bookshelf'), BookshelfDetailView.paginate_by)
+
+    def test_book_list_does_not_load_unused_fields(self):
+        self.add_books(1)
+        book = Book.objects.for_list().get()
+        self.assertEqual(book.get_deferred_fields(), {'link_to_file', 'search_vector', 'bookshelves_count', 'rating_sum', 'updated_at'})
@@ -0,0 +1,104 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from Catalog.models import *
+from Catalog.ratings import rate_book, recompute_ratings, unrate_book
+
+
+class RatingTest(TestCase):
+
+    def setUp(self):
+        self.author = Author.objects.create(first_name='Имя', last_name='Фамилия', date_of_birth='1900-01-01')
+        self.book = Book.objects.create(title='Книга', author=self.author, about='Описание')
+        self.other_book = Book.objects.create(title='Другая книга', author=self.author, about='Описание')
+        self.users = [get_user_model().objects.create(username=f'reader{i}') for i in range(3)]
+
+    def assertRating(self, book, rating, count, total):
+        book.refresh_from_db()
+        self.assertEqual((book.rating, book.rating_count, book.rating_sum), (Decimal(rating), count, total))
+
+    def test_rating_is_maintained(self):
+        self.assertRating(self.book, '0', 0, 0)
+        rate_book(self.users[0], self.book, 5)
+        rate_book(self.users[1], self.book, 4)
+        rate_book(self.users[2], self.book, 4)
+        self.assertRating(self.book, '4.33', 3, 13)
+
+        rate_book(self.users[2], self.book, 1)
+        self.assertRating(self.book, '3.33', 3, 10)
+        self.assertEqual(Rating.objects.count(), 3)
+
+        self.assertTrue(unrate_book(self.users[0], self.book))
+        self.assertFalse(unrate_book(self.users[0], self.book))
+        self.assertRating(self.book, '2.50', 2, 5)
+
+    def test_rating_moved_to_other_book(self):
+        rating = rate_book(self.users[0], self.book, 3)
+        rating.book = self.other_book
+        rating.save()
+        self.assertRating(self.book, '0', 0, 0)
+        self.assertRating(self.other_book, '3', 1, 3)
+
+    def test_user_delete_removes_ratings(self):
+        rate_book(self.users[0], self.book, 2)
+        rate_book(self.users[1], self.book, 4)
+        self.users[0].delete()
+        self.assertRating(self.book, '4', 1, 4)
+
+    def test_book_save_does_not_overwrite_rating(self):
+        stale = Book.objects.get(pk=self.book.pk)
+        rate_book(self.users[0], self.book, 5)
+        stale.about = 'Новое описание'
+        stale.save()
+        self.assertRating(self.book, '5', 1, 5)
+
+    def test_rating_changes_book_page(self):
+        client = Client()
+        url = reverse('catalog:book_detail', kwargs={'slug': self.book.slug})
+        etag = client.get(url)['ETag']
+        rate_book(self.users[0], self.book, 5)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Рейтинг: 5,00 / 5 (оценок: 1)')
+
+    def test_rating_shown_in_list(self):
+        client = Client()
+        client.get(reverse('catalog:books'))
+        rate_book(self.users[0], self.book, 4)
+        self.assertContains(client.get(reverse('catalog:books')), 'Рейтинг: 4,00 / 5', count=1)
+
+    def test_list_ordering_by_rating(self):
+        rate_book(self.users[0], self.other_book, 2)
+        rate_book(self.users[0], self.book, 5)
+        response = Client().get(reverse('catalog:books'), {'ordering': 'rating'})
+        self.assertEqual(list(response.context['book_list']), [self.book, self.other_book])
+
+    def test_ordering_by_rating_uses_index(self):
+        queryset = Book.objects.order_by('-rating', 'title')[:5]
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        self.assertIn('book_rating_title_idx', plan)
+
+    def test_recompute(self):
+        rate_book(self.users[0], self.book, 5)
+        rate_book(self.users[1], self.book, 3)
+        Book.objects.update(rating=1, rating_sum=100, rating_count=7)
+
+        self.assertEqual(recompute_ratings(batch_size=1), 2)
+        self.assertEqual(recompute_ratings(), 0)
+        self.assertRating(self.book, '4', 2, 8)
+        self.assertRating(self.other_book, '0', 0, 0)
+
+    def test_recompute_command(self):
+        Book.objects.filter(pk=self.book.pk).update(rating_count=1)
+        out = StringIO()
+        call_command('recompute_ratings', stdout=out)
+        self.assertIn('исправлено 1', out.getvalue())
+        self.assertRating(self.book, '0', 0, 0)
@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+
+from Catalog.bookshelf import add_books, remove_books
+from Catalog.models import *
+from Catalog.recommendations import also_shelved, build_recommendations, rebuild_stale
+
+
+class RecommendationsTest(TestCase):
+
+    def setUp(self):
+        author = Author.objects.create(first_name='Имя', last_name='Фамилия', date_of_birth='1900-01-01')
+        self.a, self.b, self.c, self.d = [
+            Book.objects.create(title=f'Книга {name}', author=author, about='') for name in 'ABCD'
+        ]
+        self.users = [get_user_model().objects.create(username=f'reader{i}') for i in range(3)]
+        self.shelve(self.users[0], self.a, self.b, self.c)
+        self.shelve(self.users[1], self.a, self.b)
+        self.shelve(self.users[2], self.a, self.d)
+        StaleRecommendations.objects.all().delete()
+
+    def shelve(self, user, *books):
+        add_books(user, Book.objects.filter(pk__in=[book.pk for book in books]))
+
+    def neighbours(self, book):
+        return list(BookNeighbour.objects.filter(book=book).order_by('-score', 'neighbour')
+                    .values_list('neighbour__title', 'score'))
+
+    def stale(self):
+        return set(StaleRecommendations.objects.values_list('book__title', flat=True))
+
+    def test_build(self):
+        self.assertEqual(build_recommendations(), 4)
+        self.assertEqual(self.neighbours(self.a), [('Книга B', 2), ('Книга C', 1), ('Книга D', 1)])
+        self.assertEqual(self.neighbours(self.b), [('Книга A', 2), ('Книга C', 1)])
+        self.assertEqual(self.neighbours(self.d), [('Книга A', 1)])
+        self.assertEqual(list(also_shelved(self.a)), [self.b, self.c, self.d])
+
+    def test_build_top_k_and_batches(self):
+        build_recommendations(top_k=2, batch_size=1)
+        self.assertEqual(self.neighbours(self.a), [('Книга B', 2), ('Книга C', 1)])
+
+    def test_rebuild_touches_only_changed_books(self):
+        build_recommendations()
+        before = dict(Book.objects.values_list('pk', 'updated_at'))
+        self.assertEqual(build_recommendations(), 0)
+        self.assertEqual(dict(Book.objects.values_list('pk', 'updated_at')), before)
+
+    def test_shelf_changes_mark_books_stale(self):
+        self.shelve(self.users[2], self.c)
+        self.assertEqual(self.stale(), {'Книга A', 'Книга C', 'Книга D'})
+
+        StaleRecommendations.objects.all().delete()
+        remove_books(self.users[1], [self.b.pk])
+        self.assertEqual(self.stale(), {'Книга A', 'Книга B'})
+
+        StaleRecommendations.objects.all().delete()
+        Bookshelf.objects.get(user=self.users[0]).book.remove(self.c)
+        self.assertEqual(self.stale(), {'Книга A', 'Книга B', 'Книга C'})
+
+        StaleRecommendations.objects.all().delete()
+        self.d.bookshelf_set.clear()
+        self.assertEqual(self.stale(), {'Книга A', 'Книга C', 'Книга D'})
+
+    def test_rebuild_stale(self):
+        build_recommendations()
+        self.shelve(self.users[2], self.c)
+        self.assertEqual(rebuild_stale(batch_size=1), 3)
+        self.assertEqual(self.stale(), set())
+        self.assertEqual(self.neighbours(self.c), [('Книга A', 2), ('Книга B', 1), ('Книга D', 1)])
+        self.assertEqual(self.neighbours(self.a), [('Книга B', 2), ('Книга C', 2), ('Книга D', 1)])
+
+    def test_book_page(self):
+        build_recommendations()
+        response = Client().get(self.a.get_absolute_url())
+        self.assertEqual(list(response.context['also_shelved']), [self.b, self.c, self.d])
+        self.assertContains(response, 'Читатели также добавляли')
+
+    def test_command(self):
+        out = StringIO()
+        call_command('build_recommendations', stdout=out)
+        self.assertIn('изменились у книг: 4', out.getvalue())
+
+        self.shelve(self.users[1], self.d)
+        out = StringIO()
+        call_command('build_recommendations', '--stale', stdout=out)
+        self.assertIn('Пересчитаны рекомендации книг: 3', out.getvalue())
@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from Catalog.models import *
+from Catalog.renditions import RENDITION_WIDTHS, rendition_name
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='image.png', size=(800, 1200), image_format='PNG', mode='RGBA'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 100, 50, 255) if mode == 'RGBA' else (200, 100, 50)).save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RenditionsTest(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_author(self, image, last_name='Толстой'):
+        return Author.objects.create(
+            first_name='Лев',
+            last_name=last_name,
+            date_of_birth='1828-09-09',
+            image=image
+        )
+
+    def rendition_path(self, image, width, extension):
+        return os.path.join(TEMP_MEDIA_ROOT, rendition_name(image.name, width, extension))
+
+    def test_renditions_created_on_upload(self):
+        author = self.create_author(make_image())
+
+        for width in RENDITION_WIDTHS:
+            for extension, image_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                with Image.open(self.rendition_path(author.image, width, extension)) as rendition:
+                    self.assertEqual(rendition.format, image_format)
+                    self.assertEqual(rendition.size, (width, width * 3 // 2))
+
+    def test_small_image_not_upscaled(self):
+        author = self.create_author(make_image(size=(150, 150)))
+
+        with Image.open(self.rendition_path(author.image, 120, 'jpg')) as rendition:
+            self.assertEqual(rendition.size, (120, 120))
+        with Image.open(self.rendition_path(author.image, 400, 'webp')) as rendition:
+            self.assertEqual(rendition.size, (150, 150))
+
+    def test_renditions_for_book_and_user(self):
+        author = self.create_author(None)
+        book = Book.objects.create(title='Война и мир', author=author, image=make_image())
+        user = get_user_model().objects.create(username='reader', image=make_image(image_format='JPEG', mode='RGB'))
+
+        self.assertTrue(os.path.exists(self.rendition_path(book.image, 200, 'webp')))
+        self.assertTrue(os.path.exists(self.rendition_path(user.image, 200, 'jpg')))
+
+    def test_invalid_image_is_skipped(self):
+        author = self.create_author(SimpleUploadedFile('image.png', b'png info', content_type='image/png'))
+        self.assertFalse(os.path.exists(self.rendition_path(author.image, 200, 'jpg')))
+
+    def test_renditions_generated_only_on_image_change(self):
+        author = self.create_author(make_image())
+
+        with mock.patch('Catalog.signals.generate_renditions') as generate:
+            author = Author.objects.get(pk=author.pk)
+            author.about = 'Русский писатель'
+            author.save()
+            Author.objects.only('pk', 'first_name', 'last_name').get(pk=author.pk).save()
+            generate.assert_not_called()
+
+            author.image = make_image()
+            author.save()
+            generate.assert_called_once_with(author.image)
+
+    def test_picture_tag(self):
+        author = self.create_author(make_image())
+        template = Template('{% load catalog_tags %}{% picture image 160 "Толстой" %}')
+
+        with mock.patch('Catalog.renditions.generate_renditions') as generate, \
+                mock.patch('django.core.files.storage.FileSystemStorage.exists') as exists:
+            html = template.render(Context({'image': author.image}))
+            generate.assert_not_called()
+            exists.assert_not_called()
+
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(f'{settings.MEDIA_URL}{rendition_name(author.image.name, 320, "webp")} 320w', html)
+        self.assertIn(f'src="{settings.MEDIA_URL}{rendition_name(author.image.name, 160, "jpg")}"', html)
+        self.assertIn('sizes="160px"', html)
+        self.assertIn('width="160"', html)
+
+    def test_picture_tag_without_renditions(self):
+        # Изображение, загруженное до появления копий: в srcset нет ссылок на несуществующие файлы
+        with mock.patch('Catalog.signals.generate_renditions'):
+            author = self.create_author(make_image())
+        template = Template('{% load catalog_tags %}{% picture image 160 "Толстой" %}')
+
+        html = template.render(Context({'image': author.image}))
+        self.assertNotIn('srcset', html)
+        self.assertIn(f'src="{author.image.url}"', html)
+
+        # Наличие копий проверяется один раз на изображение
+        with mock.patch('django.core.files.storage.FileSystemStorage.exists') as exists:
+            template.render(Context({'image': author.image}))
+            exists.assert_not_called()
+
+        call_command('generate_renditions', stdout=StringIO())
+        html = template.render(Context({'image': author.image}))
+        self.assertIn(f'{settings.MEDIA_URL}{rendition_name(author.image.name, 320, "webp")} 320w', html)
+
+    def test_picture_tag_for_invalid_image(self):
+        author = self.create_author(SimpleUploadedFile('image.png', b'png info', content_type='image/png'))
+        html = Template('{% load catalog_tags %}{% picture image 160 %}').render(Context({'image': author.image}))
+        self.assertNotIn('srcset', html)
+        self.assertIn(f'src="{author.image.url}"', html)
+
+    def test_generate_renditions_command(self):
+        with mock.patch('Catalog.signals.generate_renditions'):
+            author = self.create_author(make_image())
+        self.assertFalse(os.path.exists(self.rendition_path(author.image, 200, 'jpg')))
+
+        out = StringIO()
+        call_command('generate_renditions', stdout=out)
+        self.assertTrue(os.path.exists(self.rendition_path(author.image, 200, 'jpg')))
+        self.assertIn('Авторы: обработано изображений 1', out.getvalue())
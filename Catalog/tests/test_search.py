@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from Catalog.models import *
+from Catalog.books import create_books
+from Catalog.search import search_books
+
+
+class BookSearchTest(TestCase):
+
+    def setUp(self):
+        self.author = Author.objects.create(
+            first_name='Лев',
+            last_name='Толстой',
+            date_of_birth='1828-09-09'
+        )
+        self.other_author = Author.objects.create(
+            first_name='Фёдор',
+            last_name='Достоевский',
+            date_of_birth='1821-11-11'
+        )
+        self.genre = Genre.objects.create(genre='Роман')
+
+        self.war_and_peace = Book.objects.create(
+            title='Война и мир',
+            author=self.author,
+            about='Эпопея о войне 1812 года'
+        )
+        self.war_and_peace.genre.add(self.genre)
+        self.idiot = Book.objects.create(
+            title='Идиот',
+            author=self.other_author,
+            about='Роман о князе Мышкине, который вернулся из Швейцарии'
+        )
+
+    def titles(self, query):
+        return [book.title for book in search_books(query)]
+
+    def test_search_by_title(self):
+        self.assertEqual(self.titles('мир'), ['Война и мир'])
+
+    def test_search_uses_russian_stemming(self):
+        self.assertEqual(self.titles('войны'), ['Война и мир'])
+
+    def test_search_by_author_name(self):
+        self.assertEqual(self.titles('Толстой'), ['Война и мир'])
+
+    def test_search_by_about(self):
+        self.assertEqual(self.titles('Швейцария'), ['Идиот'])
+
+    def test_search_ranks_genre_above_about(self):
+        self.assertEqual(self.titles('роман'), ['Война и мир', 'Идиот'])
+
+    @mock.patch('Catalog.search.SEARCH_CANDIDATES_LIMIT', 10)
+    def test_title_match_among_many_matches(self):
+        # Книги с совпадением в названии и у автора добавлены последними, после множества совпадений в описании
+        create_books([{'title': f'Книга {i}', 'about': 'Повесть о путешествии'} for i in range(300)])
+        Book.objects.create(title='Путешествие', about='')
+        Book.objects.create(title='Записки', author=Author.objects.create(
+            first_name='Иван', last_name='Путешествие', date_of_birth='1900-01-01'), about='')
+        titles = self.titles('путешествие')
+        self.assertEqual(len(titles), 12)
+        self.assertEqual(titles[:2], ['Путешествие', 'Записки'])
+
+    def test_search_vector_follows_author_change(self):
+        self.author.last_name = 'Толстый'
+        self.author.save()
+        self.assertEqual(self.titles('Толстый'), ['Война и мир'])
+
+    def test_search_vector_follows_genre_change(self):
+        fantasy = Genre.objects.create(genre='Фэнтези')
+        self.idiot.genre.add(fantasy)
+        self.assertEqual(self.titles('фэнтези'), ['Идиот'])
+
+        fantasy.book_set.clear()
+        self.assertEqual(self.titles('фэнтези'), [])
+
+    def test_search_vector_follows_author_delete(self):
+        self.other_author.delete()
+        self.assertEqual(self.titles('Достоевский'), [])
+
+    def test_search_page(self):
+        response = Client().get(reverse('catalog:book_search'), {'q': 'Толстой'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'catalog/books/book_search.html')
+        self.assertEqual(list(response.context['book_list']), [self.war_and_peace])
+
+    def test_search_page_without_query(self):
+        response = Client().get(reverse('catalog:book_search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['book_list']), [])
+
+    def test_api_search(self):
+        response = Client().get('/api/v1/books/', {'q': 'Мышкин'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book['title'] for book in response.json()['results']], ['Идиот'])
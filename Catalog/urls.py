@@ -1,21 +1,28 @@
+from django.conf import settings
 from django.urls import path, include
-from . import views
+from . import async_views, views
+
+# Представления, которые только читают данные: при запуске через ASGI - асинхронные
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 app_name = 'catalog'
 
 authors_urls = [
-    path('', views.AuthorListView.as_view(), name='authors'),
+    path('', read_views.AuthorListView.as_view(), name='authors'),
     path('add_author', views.AddAuthor.as_view(), name='add_author'),
-    path('<slug:slug>', views.AuthorDetailView.as_view(), name='author_detail'),
+    path('<slug:slug>', read_views.AuthorDetailView.as_view(), name='author_detail'),
     path('<slug:slug>/edit', views.EditAuthor.as_view(), name='edit_author'),
     path('<slug:slug>/delete', views.DeleteAuthor.as_view(), name='delete_author'),
 ]
 
 books_urls = [
-    path('', views.BookListView.as_view(), name='books'),
+    path('', read_views.BookListView.as_view(), name='books'),
     path('add_book', views.AddBook.as_view(), name='add_book'),
     path('add_genre', views.AddGenre.as_view(), name='add_genre'),
-    path('<slug:slug>', views.BookDetailView.as_view(), name='book_detail'),
+    path('search', views.BookSearchView.as_view(), name='book_search'),
+    path('<slug:slug>', read_views.BookDetailView.as_view(), name='book_detail'),
+    path('<slug:slug>/read', views.BookFileView.as_view(), name='book_read'),
+    path('<slug:slug>/download', views.BookFileView.as_view(as_attachment=True), name='book_download'),
     path('<slug:slug>/edit', views.EditBook.as_view(), name='edit_book'),
     path('<slug:slug>/delete', views.DeleteBook.as_view(), name='delete_book'),
 ]
@@ -24,5 +31,5 @@ urlpatterns = [
     path('', views.Index.as_view(), name='index'),
     path('authors/', include(authors_urls)),
     path('books/', include(books_urls)),
-    path('bookshelf/', views.BookshelfDetailView.as_view(), name='bookshelf'),
+    path('bookshelf/', read_views.BookshelfDetailView.as_view(), name='bookshelf'),
 ]
@@ -1,12 +1,23 @@
+import os
 from typing import Any
 from django.views.generic import TemplateView, CreateView, ListView, DetailView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.contrib.auth.views import redirect_to_login
 from django.urls import reverse_lazy
-from django.core.paginator import Paginator
-from django.http import HttpResponseRedirect
-
+from django.db.models import Max
+from django.http import Http404, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.views import View
+
+from .bookshelf import add_books
+from .conditional import ConditionalGetMixin
+from .downloads import file_response
+from .facets import RATING_FACET_VALUES, facet_counts
 from .models import *
 from .forms import AddBookForm, AddAuthorForm, AddGenreForm
+from .pagination import PaginationMixin
+from .recommendations import also_shelved
+from .search import search_books
 
 
 class Index(TemplateView):
@@ -21,46 +32,134 @@ class Index(TemplateView):
         return context
 
 
-class BookListView(ListView):
+class BookListView(PaginationMixin, ListView):
     """
     Класс для отображения страницы списка всех книг
     """
-    model = Book
+    queryset = Book.objects.for_list()
     template_name = 'catalog/books/book_list.html'
     paginate_by = 5
 
+    def get(self, request, *args, **kwargs):
+        self.load_facets()
+        return super().get(request, *args, **kwargs)
+
+    def get_filter_object(self, model, name):
+        slug = self.request.GET.get(name)
+        if not slug:
+            return None
+        return get_object_or_404(model, slug=slug)
+
+    def load_facets(self):
+        """
+        Фильтры ?genre=<slug>&author=<slug>&min_rating=<1..5> и числа книг для значений фасетов
+        """
+        self.genre = self.get_filter_object(Genre, 'genre')
+        self.author = self.get_filter_object(Author, 'author')
+        min_rating = self.request.GET.get('min_rating', '')
+        self.min_rating = int(min_rating) if min_rating.isdigit() and int(min_rating) in RATING_FACET_VALUES else None
+        self.facets = facet_counts(self.genre, self.author, self.min_rating)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Фильтры используют индексы таблицы связей жанров, book_author_title_idx и book_rating_title_idx
+        if self.genre:
+            queryset = queryset.filter(genre=self.genre)
+        if self.author:
+            # У всех книг один автор, поэтому сортировка только по названию (индекс book_author_title_idx)
+            queryset = queryset.filter(author=self.author).order_by('title')
+        if self.min_rating:
+            queryset = queryset.filter(rating__gte=self.min_rating)
+        # ?ordering=rating - по убыванию рейтинга (индекс book_rating_title_idx)
+        if self.request.GET.get('ordering') == 'rating':
+            queryset = queryset.order_by('-rating', 'title')
+        return queryset
+
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context['title_name'] = 'Все книги'
+        context['facets'] = self.facets
+        context['selected_genre'] = self.genre
+        context['selected_author'] = self.author
+        context['selected_min_rating'] = self.min_rating
         return context
 
 
-class BookDetailView(DetailView):
+class BookSearchView(ListView):
+    """
+    Класс для отображения результатов полнотекстового поиска по книгам
+    """
+    template_name = 'catalog/books/book_search.html'
+    context_object_name = 'book_list'
+    paginate_by = 5
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        if not self.query:
+            return Book.objects.none()
+        return search_books(self.query, Book.objects.for_list())
+
+    def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['title_name'] = 'Поиск'
+        context['query'] = self.query
+        return context
+
+
+class BookDetailView(ConditionalGetMixin, DetailView):
     """
     Класс для отображения страницы экземпляра книги
     """
-    model = Book
+    queryset = Book.objects.for_detail()
     template_name = 'catalog/books/book_detail.html'
 
+    def get_validators(self):
+        book = Book.objects.filter(slug=self.kwargs['slug']).values_list('pk', 'updated_at').first()
+        if book is None:
+            return None
+        return f'book:{book[0]}', book[1]
+
+    def get_also_shelved(self):
+        """
+        Рекомендации "Читатели также добавляли" (Catalog.recommendations)
+        """
+        return also_shelved(self.object)
+
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context['title_name'] = context['book'].title
+        context['also_shelved'] = self.get_also_shelved()
         return context
 
     def post(self, request, *args, **kwargs):
         """
         Переопределение метода POST, нужен для добавления книги в свою полку
         """
-        slug = self.kwargs['slug']
-        book = Book.objects.get(slug=slug)
-        bookshelf = Bookshelf.objects.get_or_create(user=self.request.user)[0]
-
-        bookshelf.book.add(book)
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        add_books(request.user, Book.objects.filter(slug=self.kwargs['slug']))
 
         return HttpResponseRedirect(self.request.path_info)
 
 
-class AuthorListView(ListView):
+class BookFileView(View):
+    """
+    Класс для чтения (as_attachment = False) и скачивания (as_attachment = True) файла книги.
+    Поддерживает докачку (Range); при настроенном SENDFILE_BACKEND файл отдает фронтенд-сервер
+    """
+    as_attachment = False
+
+    def get(self, request, *args, **kwargs):
+        book = get_object_or_404(Book.objects.only('id', 'slug', 'link_to_file'), slug=self.kwargs['slug'])
+        if not book.link_to_file:
+            raise Http404('У книги нет файла')
+
+        extension = os.path.splitext(book.link_to_file.name)[1]
+        return file_response(request, book.link_to_file, as_attachment=self.as_attachment,
+                             filename=f'{book.slug}{extension}')
+
+
+class AuthorListView(PaginationMixin, ListView):
     """
     Класс для отображения страницы списка всех авторов
     """
@@ -74,7 +173,7 @@ class AuthorListView(ListView):
         return context
 
 
-class AuthorDetailView(DetailView):
+class AuthorDetailView(ConditionalGetMixin, PaginationMixin, DetailView):
     """
     Класс для отображения страницы экземпляра автора
     """
@@ -82,17 +181,28 @@ class AuthorDetailView(DetailView):
     template_name = 'catalog/authors/author_detail.html'
     paginate_by = 5
 
+    def get_validators(self):
+        """
+        Страница автора меняется вместе с автором и любой из его книг
+        """
+        author = (
+            Author.objects.filter(slug=self.kwargs['slug'])
+            .annotate(books_updated_at=Max('book__updated_at'))
+            .order_by()
+            .values_list('pk', 'updated_at', 'books_updated_at')
+            .first()
+        )
+        if author is None:
+            return None
+        pk, updated_at, books_updated_at = author
+        return f'author:{pk}', max(updated_at, books_updated_at or updated_at)
+
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context['title_name'] = f'{context["author"].first_name} {context["author"].last_name}'
 
-        books = context['author'].book_set.all()
-        paginator = Paginator(books, self.paginate_by)
-
-        page_number = self.request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-
-        context['page_obj'] = page_obj
+        books = context['author'].book_set.for_list()
+        context['page_obj'] = self.get_page_obj(books, self.paginate_by)
 
         return context
 
@@ -146,6 +256,8 @@ class EditAuthor(PermissionRequiredMixin, UpdateView):
     Доступен только для пользователей с разрешением change_author
     """
     model = Author
+    # Форма редактирования должна показывать актуальные данные, а не копию с реплики
+    use_primary_db = True
     fields = ['first_name', 'last_name', 'date_of_birth', 'date_of_death', 'about', 'image',]
     template_name = 'catalog/authors/edit_author.html'
     permission_required = 'Catalog.change_author'
@@ -161,7 +273,9 @@ class EditBook(PermissionRequiredMixin, UpdateView):
     Доступен только для пользователей с разрешением change_book
     """
     model = Book
-    fields = ['title', 'author', 'genre', 'about', 'link_to_file', 'image',]
+    # Форма редактирования должна показывать актуальные данные, а не копию с реплики
+    use_primary_db = True
+    form_class = AddBookForm
     template_name = 'catalog/books/edit_book.html'
     permission_required = 'Catalog.change_book'
 
@@ -176,6 +290,7 @@ class DeleteAuthor(PermissionRequiredMixin, DeleteView):
     Доступен только для пользователей с разрешением delete_author
     """
     model = Author
+    use_primary_db = True
     template_name = 'catalog/authors/author_confirm_delete.html'
     permission_required = 'Catalog.delete_author'
     success_url = reverse_lazy('authors')
@@ -187,12 +302,13 @@ class DeleteBook(PermissionRequiredMixin, DeleteView):
     Доступен только для пользователей с разрешением delete_book
     """
     model = Book
+    use_primary_db = True
     template_name = 'catalog/books/book_confirm_delete.html'
     success_url = reverse_lazy('books')
     permission_required = 'Catalog.delete_book'
 
 
-class BookshelfDetailView(LoginRequiredMixin, DetailView):
+class BookshelfDetailView(LoginRequiredMixin, PaginationMixin, DetailView):
     """
     Класс для отображения полки книг пользователя
     Доступен только для авторизованных пользователей
@@ -211,11 +327,6 @@ class BookshelfDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         context['title_name'] = f"Книжная полка"
 
-        books = self.object.book.all()
-        paginator = Paginator(books, self.paginate_by)
-
-        page_number = self.request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-
-        context['page_obj'] = page_obj
+        books = self.object.book.for_list()
+        context['page_obj'] = self.get_page_obj(books, self.paginate_by)
         return context
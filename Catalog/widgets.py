@@ -0,0 +1,44 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteMixin:
+    """
+    Виджет выбора объектов с подсказками (Catalog.autocomplete): в HTML попадают только
+    выбранные варианты, остальные подгружает скрипт по мере ввода. Поэтому форма отрисовывается
+    за одно и то же число запросов при любом размере каталога
+    """
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    class Media:
+        js = ['Catalog/js/autocomplete.js']
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse('autocomplete', kwargs={'kind': self.kind})
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        pks = [pk for pk in value if str(pk).isdigit()]
+        choices = [('', field.empty_label)] if getattr(field, 'empty_label', None) is not None else []
+        if pks:
+            choices += [(field.prepare_value(obj), field.label_from_instance(obj))
+                        for obj in field.queryset.filter(pk__in=pks)]
+
+        all_choices, self.choices = self.choices, choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = all_choices
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
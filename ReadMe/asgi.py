@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ReadMe.settings')
+# Представления каталога, которые только читают данные, работают асинхронно (Catalog.async_views).
+# Запуск: WEB_CONCURRENCY=4 uvicorn ReadMe.asgi:application (нескольким воркерам нужен REDIS_URL, см. CACHES)
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,179 @@
+"""
+Сжатие ответов (HTML-страницы, API, потоковая выдача) с выбором кодирования по Accept-Encoding:
+brotli (br) или gzip. Сжимаются только текстовые форматы не меньше COMPRESSION_MIN_SIZE байт,
+поэтому маленькие ответы, изображения и файлы книг отдаются как есть.
+
+Потоковые ответы сжимаются по мере отдачи: сжатые данные отправляются клиенту не реже,
+чем через каждые STREAM_FLUSH_SIZE байт исходного содержимого.
+
+Защита от BREACH (подбор секрета по размеру сжатого ответа), как в django.middleware.gzip:
+в заголовок gzip добавляется имя файла случайной длины. У brotli такого поля нет, поэтому
+ответы с CSRF-токеном (Django ставит его cookie в ответ, когда токен выведен в страницу)
+сжимаются только gzip
+"""
+import gzip
+import re
+import secrets
+import struct
+import zlib
+
+import brotli
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.crypto import get_random_string
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+# Качество сжатия: у brotli 4-5 - лучшее соотношение скорости и размера для сжатия на лету
+# (по умолчанию 11 - в десятки раз медленнее), у gzip 6 - значение по умолчанию zlib
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+STREAM_FLUSH_SIZE = 64 * 1024
+# Наибольшая длина случайного имени файла в заголовке gzip (как GZipMiddleware.max_random_bytes)
+MAX_RANDOM_BYTES = 100
+
+COMPRESSIBLE_TYPES = re.compile(r'^(text/|application/(json|x-ndjson|javascript|xml)|image/svg\+xml)', re.IGNORECASE)
+QUALITY = re.compile(r'q\s*=\s*([0-9.]+)')
+# Кодирование -> предпочтение сервера при одинаковом q
+ENCODINGS = {'br': 2, 'gzip': 1}
+
+
+class Compressor:
+    """
+    Сжатие одного ответа: compress() для очередной части, finish() в конце
+    """
+
+    def __init__(self, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._flush, self._finish = compressor.process, compressor.flush, compressor.finish
+        else:
+            # Заголовок и контрольная сумма gzip пишутся здесь, zlib сжимает без обертки (wbits < 0)
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self._compress, self._finish = self._gzip_compress, self._gzip_finish
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._deflate = compressor
+            self._crc = self._size = 0
+            self._header = gzip_header()
+        self._pending = 0
+
+    def _gzip_compress(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        output, self._header = self._header + self._deflate.compress(data), b''
+        return output
+
+    def _gzip_finish(self):
+        return self._header + self._deflate.flush() + struct.pack('<2L', self._crc, self._size & 0xffffffff)
+
+    def compress(self, data):
+        output = self._compress(data)
+        self._pending += len(data)
+        if self._pending >= STREAM_FLUSH_SIZE:
+            output += self._flush()
+            self._pending = 0
+        return output
+
+    def finish(self):
+        return self._finish()
+
+
+def gzip_header():
+    """
+    Заголовок gzip с именем файла случайной длины (от 1 до MAX_RANDOM_BYTES), как у
+    django.utils.text.compress_string: длина сжатого ответа меняется от запроса к запросу
+    """
+    filename = get_random_string(secrets.randbelow(MAX_RANDOM_BYTES) + 1).encode()
+    # Метод deflate, флаг FNAME, mtime 0, без доп. флагов, ОС неизвестна
+    return b'\x1f\x8b\x08' + bytes([gzip.FNAME]) + bytes(4) + b'\x00\xff' + filename + b'\x00'
+
+
+def select_encoding(accept_encoding, encodings=ENCODINGS):
+    """
+    Кодирование из encodings по заголовку Accept-Encoding (с учетом q) или None,
+    если клиент не принимает ни одного
+    """
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        quality = 1.0
+        match = QUALITY.search(params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                continue
+        if name == '*':
+            for encoding in encodings:
+                weights.setdefault(encoding, quality)
+        elif name in encodings:
+            weights[name] = quality
+
+    acceptable = [(quality, encodings[encoding], encoding) for encoding, quality in weights.items() if quality > 0]
+    return max(acceptable)[2] if acceptable else None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Как django.middleware.gzip.GZipMiddleware, но с выбором между brotli и gzip,
+    порогом размера и сжатием потока одним непрерывным потоком
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        # Файлы и их части (Range) отдаются как есть: Content-Range и Content-Length описывают
+        # несжатые байты, а содержимое FileResponse может отдать сервер (wsgi.file_wrapper)
+        if (response.status_code == 206 or response.has_header('Content-Range')
+                or response.get('Accept-Ranges') == 'bytes' or isinstance(response, FileResponse)):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        # Кеши должны различать ответы для разных Accept-Encoding, даже если этот не сжат
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # Ответ с CSRF-токеном: brotli без случайного дополнения открыт для BREACH
+        encodings = {'gzip': ENCODINGS['gzip']} if settings.CSRF_COOKIE_NAME in response.cookies else ENCODINGS
+        encoding = select_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), encodings)
+        if encoding is None:
+            return response
+
+        compressor = Compressor(encoding)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.acompress_stream(compressor, response.streaming_content)
+            else:
+                response.streaming_content = self.compress_stream(compressor, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = compressor.compress(response.content) + compressor.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # Сжатое представление отличается побайтно: сильный ETag становится слабым (как в GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def compress_stream(compressor, content):
+        for chunk in content:
+            output = compressor.compress(chunk)
+            if output:
+                yield output
+        yield compressor.finish()
+
+    @staticmethod
+    async def acompress_stream(compressor, content):
+        async for chunk in content:
+            output = compressor.compress(chunk)
+            if output:
+                yield output
+        yield compressor.finish()
@@ -0,0 +1,128 @@
+import random
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Cookie, по которой запросы клиента после записи читают с основной базы, пока реплики догоняют ее
+PRIMARY_COOKIE = 'use_primary_db'
+# Сессии, пользователи, группы и токены всегда читаются с основной базы: они кешируются по версиям
+# (users.authentication, users.roles), и прежняя строка с отстающей реплики попала бы в кеш
+# под только что обновленной версией, например сразу после входа или смены групп
+PRIMARY_APPS = frozenset({'sessions', 'auth', 'users', 'authtoken'})
+
+
+@dataclass
+class RoutingState:
+    use_replica: bool
+    wrote: bool = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def use_primary_db(view_func):
+    """
+    Декоратор представления, которое всегда читает с основной базы.
+    Для представлений-классов то же самое задает атрибут use_primary_db = True
+    """
+    view_func.use_primary_db = True
+    return view_func
+
+
+def reads_from_replica():
+    """
+    Идет ли чтение в текущем запросе с реплики (то есть может отставать от основной базы)
+    """
+    state = _state.get()
+    if state is None or not state.use_replica or state.wrote:
+        return False
+    return bool(settings.DATABASE_REPLICAS) and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+    """
+    Роутер баз данных: чтение в запросах, разрешенных ReplicaRoutingMiddleware,
+    идет на одну из реплик settings.DATABASE_REPLICAS, запись и все остальное - на основную базу.
+    Внутри транзакции основной базы чтение тоже идет на нее, чтобы видеть свои же изменения.
+    Модели приложений PRIMARY_APPS всегда читаются с основной базы
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS or not reads_from_replica():
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # После записи чтение до конца запроса идет с основной базы
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик для безопасных запросов (GET, HEAD, OPTIONS), если:
+    - представление не отказалось от реплик (use_primary_db);
+    - клиент не выполнял запись за последние DATABASE_REPLICA_LAG секунд (cookie PRIMARY_COOKIE).
+    После запроса с записью клиенту выставляется эта cookie, чтобы он сразу видел свои изменения
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        state = RoutingState(
+            use_replica=request.method in SAFE_METHODS and PRIMARY_COOKIE not in request.COOKIES,
+        )
+        return state, _state.set(state)
+
+    def finish(self, request, response, state):
+        if state.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PRIMARY_COOKIE, '1', max_age=settings.DATABASE_REPLICA_LAG, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if getattr(view_func, 'use_primary_db', False) or getattr(view_class, 'use_primary_db', False):
+            _state.get().use_replica = False
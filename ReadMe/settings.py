@@ -1,5 +1,7 @@
+from datetime import timedelta
 from pathlib import Path
 from dotenv import dotenv_values
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 # config - секретрные данные из файла .env
@@ -20,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'Catalog.apps.CatalogConfig',
     'users.apps.UsersConfig',
     'api.apps.ApiConfig',
@@ -30,16 +33,27 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'ReadMe.compression.CompressionMiddleware',
+    'ReadMe.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.throttling.RateLimitHeadersMiddleware',
 ]
 
 ROOT_URLCONF = 'ReadMe.urls'
 
+# Ответы меньше этого размера (байт) не сжимаются (ReadMe.compression): выигрыш меньше
+# накладных расходов, а ответ и так помещается в несколько TCP-пакетов
+COMPRESSION_MIN_SIZE = 1024
+
+# Асинхронные представления каталога (Catalog.async_views) вместо синхронных.
+# Включаются в ReadMe/asgi.py: под WSGI асинхронные представления работали бы медленнее
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -70,6 +84,52 @@ DATABASES = {
    }
 }
 
+# Реплики основной базы только для чтения, например DB_REPLICA_HOSTS=10.0.0.2:5432,10.0.0.3:5432.
+# В тестах реплики указывают на тестовую базу основной (TEST.MIRROR)
+DATABASE_REPLICAS = []
+for number, address in enumerate(filter(None, (config.get('DB_REPLICA_HOSTS') or '').split(',')), start=1):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or config['DB_PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['ReadMe.db_router.ReplicaRouter']
+# Сколько секунд после записи клиент читает с основной базы (допустимое отставание реплик)
+DATABASE_REPLICA_LAG = 5
+
+# Число процессов сервера: gunicorn и uvicorn берут из WEB_CONCURRENCY число воркеров
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Кеш: группы и пользователи (users), HTML элементов списков (Catalog.fragments), версии
+# автодополнения, счетчики ограничений частоты (api.throttling). Записи кеша сбрасываются
+# сменой версии, которая должна быть видна всем процессам, поэтому при нескольких процессах
+# нужен общий кеш - REDIS_URL в .env, например redis://localhost:6379/0.
+# Без REDIS_URL - кеш в памяти процесса (разработка, тесты, один воркер); MAX_ENTRIES увеличен,
+# чтобы фрагменты всех страниц каталога помещались в кеш
+if config.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config['REDIS_URL'],
+        }
+    }
+elif WEB_CONCURRENCY > 1:
+    raise ImproperlyConfigured(
+        f'WEB_CONCURRENCY={WEB_CONCURRENCY}: для нескольких процессов нужен общий кеш, укажите REDIS_URL в .env')
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -100,23 +160,84 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# Отдача файлов книг фронтенд-сервером: 'x-accel-redirect' (nginx) или 'x-sendfile' (Apache, lighttpd).
+# Без настройки файлы отдает Django. Для nginx SENDFILE_ACCEL_PREFIX - internal location,
+# указывающий на MEDIA_ROOT:  location /protected-media/ { internal; alias /path/to/media/; }
+SENDFILE_BACKEND = config.get('SENDFILE_BACKEND') or None
+SENDFILE_ACCEL_PREFIX = '/protected-media/'
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Пользователь сессии загружается из кеша (users.authentication)
 AUTHENTICATION_BACKENDS = [
-    "django.contrib.auth.backends.ModelBackend",
+    'users.authentication.CachedModelBackend',
     'users.authentication.EmailAuthBackend',
+    # Сессии, созданные до перехода на кеш, хранят этот путь в _auth_user_backend;
+    # без него такие пользователи будут разлогинены. Можно убрать через SESSION_COOKIE_AGE.
+    'django.contrib.auth.backends.ModelBackend',
 ]
 
 AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
+    # Представления каталога (api.views) проверяют JWT без запросов к БД (users.jwt.StatelessJWTAuthentication)
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.jwt.JWTAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
+    # JSON на orjson (api.renderers)
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # Ограничения частоты (api.throttling): скользящее окно по IP для анонимных запросов,
+    # по пользователю и отдельно по токену, а выдача токенов - по IP против перебора паролей
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.AnonRateThrottle',
+        'api.throttling.UserRateThrottle',
+        'api.throttling.TokenRateThrottle',
+        'api.throttling.AuthRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '120/min',
+        'user': '600/min',
+        'token': '300/min',
+        'auth': '10/min',
+        'autocomplete': '600/min',
+    },
 }
 
+# JWT для API (users.jwt): роли пользователя хранятся в access-токене,
+# поэтому его срок жизни определяет, как долго действуют устаревшие роли
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_USER_CLASS': 'users.jwt.JWTUser',
+    'TOKEN_OBTAIN_SERIALIZER': 'users.jwt.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.jwt.RoleTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'users.jwt.RoleTokenVerifySerializer',
+}
+
+# Максимальный размер страницы, который клиент может запросить параметром ?page_size=
+API_MAX_PAGE_SIZE = 100
+# Размер пачки книг при потоковой выдаче ?stream=ndjson (выборка по серверному курсору)
+API_STREAM_CHUNK_SIZE = 1000
+# Сколько дорогих запросов (список книг, в том числе потоковая выдача) клиент может
+# выполнять одновременно (api.throttling.ConcurrencyLimitMixin)
+API_MAX_CONCURRENT_REQUESTS = 2
+# Сколько книг можно добавить на полку или убрать с нее одним запросом к API
+API_BOOKSHELF_MAX_BOOKS = 1000
+# Сколько книг можно создать, изменить или удалить одним запросом к API (Catalog.books)
+API_BULK_MAX_BOOKS = 5000
+
 LOGIN_REDIRECT_URL = "/users/login/"
 LOGIN_URL = "/users/login/"
@@ -0,0 +1,56 @@
+"""
+Выборочные поля ответа API: ?fields=title,author - только перечисленные поля,
+?expand=author,genre - связанные объекты целиком вместо первичных ключей.
+
+Поля сокращают и ответ, и список столбцов в SQL (Book.objects.for_api), а раскрытые связи
+загружаются фиксированным числом запросов на страницу. Параметры действуют только на чтение:
+запись (POST, PATCH) принимает и возвращает полное представление
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _parse_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Разбирает ?fields= и ?expand= для сериализатора с SparseFieldsetSerializerMixin
+    (api.serializer) и передает результат в его контекст. Представление строит queryset
+    по get_fieldset(). Неизвестные поля - ошибка 400
+    """
+
+    def get_fieldset(self):
+        """
+        Пара (отдаваемые поля или None - все поля сериализатора, раскрываемые связи)
+        """
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = self.parse_fieldset()
+        return self._fieldset
+
+    def parse_fieldset(self):
+        if self.request.method not in SAFE_METHODS:
+            return None, ()
+
+        serializer_class = self.get_serializer_class()
+        params = self.request.query_params
+        errors = {}
+        fields = None
+        if 'fields' in params:
+            fields = tuple(_parse_list(params['fields']))
+            unknown = [field for field in fields if field not in serializer_class.Meta.fields]
+            if not fields or unknown:
+                errors['fields'] = f'Неизвестные поля: {", ".join(unknown)}' if unknown else 'Не указаны поля'
+        expand = tuple(_parse_list(params.get('expand', '')))
+        unknown = [field for field in expand if field not in serializer_class.expandable_fields]
+        if unknown:
+            errors['expand'] = f'Эти связи нельзя раскрыть: {", ".join(unknown)}'
+        if errors:
+            raise ValidationError(errors)
+        return fields, expand
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+        return context
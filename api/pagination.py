@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db.models import BigIntegerField, F, Value
+from django.db.models.functions import Cast, Floor
+from rest_framework.pagination import CursorPagination
+
+# Ключ сортировки результатов поиска (BookCursorPagination.search_key): pk книг меньше
+# SEARCH_KEY_PK_RANGE, ранг учитывается с точностью до 1 / SEARCH_KEY_RANK_SCALE
+SEARCH_KEY_PK_RANGE = 10 ** 10
+SEARCH_KEY_RANK_SCALE = 10 ** 6
+
+
+class BookCursorPagination(CursorPagination):
+    """
+    Пагинация списка книг по курсору: сортировка по уникальному названию,
+    размер страницы задается параметром ?page_size= (не больше API_MAX_PAGE_SIZE)
+    """
+    ordering = 'title'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if 'rank' in queryset.query.annotations:
+            queryset = queryset.annotate(search_key=self.search_key())
+        return super().paginate_queryset(queryset, request, view)
+
+    @staticmethod
+    def search_key():
+        """
+        Ключ сортировки результатов поиска. Курсор DRF хранит значение только первого поля
+        сортировки, а ранг (real) неточно переживает сохранение в курсоре и часто совпадает
+        у разных книг - страницы повторялись и пропускали книги. Поэтому ключ - одно
+        уникальное целое: ранг с точностью SEARCH_KEY_RANK_SCALE и pk (при равной
+        релевантности книги идут по возрастанию pk)
+        """
+        rank = Cast(Floor(F('rank') * SEARCH_KEY_RANK_SCALE), BigIntegerField())
+        return rank * Value(SEARCH_KEY_PK_RANGE) - F('pk')
+
+    def get_ordering(self, request, queryset, view):
+        # Результаты поиска (?q=) отдаются в порядке релевантности
+        if 'search_key' in queryset.query.annotations:
+            return ('-search_key',)
+        # ?ordering=rating - по убыванию рейтинга (индекс book_rating_title_idx)
+        if request.query_params.get('ordering') == 'rating':
+            return ('-rating', 'title')
+        return super().get_ordering(request, queryset, view)
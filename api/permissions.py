@@ -1,8 +1,10 @@
 from rest_framework import permissions
 
+from users.roles import has_group
+
 
 class IsStaff(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return request.user.groups.filter(name='staff').exists()
+        return has_group(request.user, 'staff')
@@ -0,0 +1,52 @@
+"""
+JSON на orjson вместо модуля json стандартной библиотеки: сериализация ответов API
+(в том числе потоковой выдачи ?stream=ndjson) и разбор тел запросов.
+
+Типы, которых нет в orjson (Decimal, ленивые строки переводов, QuerySet и т. п.),
+преобразуются так же, как в rest_framework.renderers.JSONRenderer - его JSONEncoder.default.
+Вывод компактный, без экранирования не-ASCII символов (как при UNICODE_JSON и COMPACT_JSON)
+"""
+import orjson
+from django.utils.http import parse_header_parameters
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+
+def dumps(data, option=0):
+    """
+    Сериализует data в JSON (bytes)
+    """
+    # Даты и время - тоже через JSONEncoder: DRF обрезает время до миллисекунд и пишет UTC как Z
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | option
+    return orjson.dumps(data, default=_encoder.default, option=options)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Отступы запрашивает браузерный API (BrowsableAPIRenderer) или клиент параметром
+        # Accept: application/json; indent=4. orjson поддерживает только отступ в 2 пробела
+        indent = (renderer_context or {}).get('indent')
+        if accepted_media_type:
+            indent = indent or parse_header_parameters(accepted_media_type)[1].get('indent', '0') != '0'
+        return dumps(data, orjson.OPT_INDENT_2 if indent else 0)
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
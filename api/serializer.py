@@ -1,8 +1,185 @@
+from django.conf import settings
+from django.db.models import Q
 from rest_framework import serializers
-from Catalog.models import Book
+from slugify import slugify
+from Catalog.autocomplete import AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT
+from Catalog.models import Author, Book, Genre
 
 
-class BookSerializer(serializers.ModelSerializer):
+class AuthorBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ('id', 'first_name', 'last_name', 'slug')
+
+
+class GenreBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Genre
+        fields = ('id', 'genre', 'slug')
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Поля ответа по параметрам запроса (api.fieldsets.SparseFieldsetMixin): в контексте
+    сериализатора fieldset - пара (отдаваемые поля или None - все, раскрываемые связи).
+    Связи из expandable_fields раскрываются во вложенные объекты вместо первичных ключей
+    """
+    # Связь -> сериализатор вложенного объекта для ?expand=
+    expandable_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return fields
+
+        only, expand = fieldset
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+        for name in expand:
+            if name in fields:
+                field = fields[name]
+                many = isinstance(field, serializers.ManyRelatedField)
+                fields[name] = self.expandable_fields[name](many=many, read_only=True)
+        return fields
+
+
+class BookSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'author': AuthorBriefSerializer,
+        'genre': GenreBriefSerializer,
+    }
+
+    class Meta:
+        model = Book
+        fields = ('title', 'author', 'genre', 'about', 'rating', 'rating_count')
+
+
+class BookshelfChangeSerializer(serializers.Serializer):
+    """
+    Первичные ключи книг, которые добавляются на полку или убираются с нее
+    """
+    books = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.API_BOOKSHELF_MAX_BOOKS,
+    )
+
+
+class BookRatingSerializer(serializers.ModelSerializer):
+    """
+    Рейтинг книги и оценка текущего пользователя (score, null - пользователь книгу не оценивал)
+    """
+    score = serializers.IntegerField(min_value=1, max_value=5)
+
     class Meta:
         model = Book
-        fields = ('title', 'author', 'genre', 'about')
+        fields = ('rating', 'rating_count', 'score')
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """
+    Параметры запроса подсказок: начало строки q и число подсказок limit
+    """
+    q = serializers.CharField(max_length=150, allow_blank=True, trim_whitespace=False, default='')
+    limit = serializers.IntegerField(min_value=1, max_value=AUTOCOMPLETE_MAX_LIMIT, default=AUTOCOMPLETE_LIMIT)
+
+
+class BookBulkListSerializer(serializers.ListSerializer):
+    """
+    Пачка книг для массового создания или изменения (partial=True). Сначала каждая книга
+    проверяется отдельно без запросов к БД, затем вся пачка - по одному запросу на проверку:
+    существование книг (при изменении), авторов и жанров и уникальность названий.
+    Ошибки возвращаются списком по одному словарю на книгу, как у ListSerializer
+    """
+
+    def to_internal_value(self, data):
+        # Ошибки из validate() ListSerializer превращает в non_field_errors,
+        # поэтому пачка проверяется здесь, после проверки каждой книги
+        attrs = super().to_internal_value(data)
+        errors = [{} for _ in attrs]
+
+        def add_error(index, field, message):
+            errors[index].setdefault(field, []).append(message)
+
+        if self.partial:
+            book_ids = {item['id'] for item in attrs if 'id' in item}
+            existing = set(Book.objects.filter(pk__in=book_ids).values_list('pk', flat=True))
+            seen = set()
+            for index, item in enumerate(attrs):
+                # При partial=True отсутствие обязательного поля не считается ошибкой
+                if 'id' not in item:
+                    add_error(index, 'id', 'Обязательное поле.')
+                elif item['id'] not in existing:
+                    add_error(index, 'id', f'Книга {item["id"]} не найдена.')
+                elif item['id'] in seen:
+                    add_error(index, 'id', f'Книга {item["id"]} указана в пачке несколько раз.')
+                else:
+                    seen.add(item['id'])
+
+        author_ids = {item['author'] for item in attrs if item.get('author') is not None}
+        genre_ids = {genre_id for item in attrs for genre_id in item.get('genre', ())}
+        authors = set(Author.objects.filter(pk__in=author_ids).values_list('pk', flat=True)) if author_ids else set()
+        genres = set(Genre.objects.filter(pk__in=genre_ids).values_list('pk', flat=True)) if genre_ids else set()
+        for index, item in enumerate(attrs):
+            if item.get('author') is not None and item['author'] not in authors:
+                add_error(index, 'author', f'Автор {item["author"]} не найден.')
+            missing = [genre_id for genre_id in item.get('genre', ()) if genre_id not in genres]
+            if missing:
+                add_error(index, 'genre', f'Жанры не найдены: {", ".join(map(str, missing))}.')
+
+        # Уникальность названий и slug: внутри пачки и одним запросом среди остальных книг
+        titled = [(index, item) for index, item in enumerate(attrs) if 'title' in item]
+        slugs = set()
+        for index, item in titled:
+            slug = slugify(item['title'])
+            if slug in slugs:
+                add_error(index, 'title', 'Книга с таким названием уже есть в пачке.')
+            slugs.add(slug)
+        if titled:
+            taken = Book.objects.filter(
+                Q(title__in=[item['title'] for _, item in titled]) | Q(slug__in=slugs)
+            ).values_list('pk', 'title', 'slug')
+            taken_by = {}
+            for pk, title, slug in taken:
+                taken_by[title] = taken_by[slug] = pk
+            for index, item in titled:
+                owner = taken_by.get(item['title'], taken_by.get(slugify(item['title'])))
+                if owner is not None and owner != item.get('id'):
+                    add_error(index, 'title', 'Книга с таким Название уже существует.')
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class BookBulkSerializer(serializers.Serializer):
+    """
+    Книга в пачке: автор и жанры - первичные ключи, их существование проверяет
+    BookBulkListSerializer сразу для всей пачки
+    """
+    title = serializers.CharField(max_length=150)
+    author = serializers.IntegerField(min_value=1, allow_null=True, required=False)
+    genre = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    about = serializers.CharField()
+
+    class Meta:
+        list_serializer_class = BookBulkListSerializer
+
+
+class BookBulkUpdateSerializer(BookBulkSerializer):
+    """
+    Изменение книги в пачке (partial=True): id книги и только изменяемые поля
+    """
+    id = serializers.IntegerField(min_value=1)
+
+
+class BookBulkDeleteSerializer(serializers.Serializer):
+    """
+    Первичные ключи удаляемых книг
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.API_BULK_MAX_BOOKS,
+    )
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+
+from Catalog import autocomplete
+from Catalog.models import *
+
+
+class AutocompleteApiTest(TestCase):
+
+    def setUp(self):
+        autocomplete._indexes.clear()
+        cache.clear()
+        author = Author.objects.create(first_name='Лев', last_name='Толстой', date_of_birth='1828-09-09')
+        self.books = [
+            Book.objects.create(title=f'Война и мир, том {i}', author=author, about='') for i in range(1, 5)
+        ]
+        self.client = Client()
+
+    def test_suggestions(self):
+        response = self.client.get('/api/v1/autocomplete/book/', {'q': 'война', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': [
+            {'id': self.books[0].pk, 'text': 'Война и мир, том 1'},
+            {'id': self.books[1].pk, 'text': 'Война и мир, том 2'},
+        ]})
+        self.assertEqual(self.client.get('/api/v1/autocomplete/author/', {'q': 'лев т'}).json(),
+                         {'results': [{'id': self.books[0].author_id, 'text': 'Толстой Лев'}]})
+
+    def test_no_queries_after_index_is_built(self):
+        self.client.get('/api/v1/autocomplete/book/', {'q': 'в'})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/autocomplete/book/', {'q': 'война и мир, том 3'})
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get('/api/v1/autocomplete/user/', {'q': 'a'}).status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/autocomplete/book/', {'q': 'в', 'limit': 1000}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/autocomplete/book/').json(), {'results': []})
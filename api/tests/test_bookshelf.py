@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from Catalog.models import *
+
+User = get_user_model()
+
+
+class BookshelfApiTest(TestCase):
+    url = '/api/v1/bookshelf/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='password')
+        self.other_user = User.objects.create_user(username='other', email='other@example.com', password='password')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+        author = Author.objects.create(first_name='Имя', last_name='Фамилия', date_of_birth='1900-01-01')
+        self.books = [
+            Book.objects.create(title=f'Книга {i}', author=author, about=f'Описание {i}') for i in range(5)
+        ]
+        self.ids = [book.pk for book in self.books]
+
+    def change(self, method, ids):
+        return getattr(self.client, method)(self.url, {'books': ids}, content_type='application/json')
+
+    def shelved(self, user=None):
+        return sorted(Bookshelf.objects.get(user=user or self.user).book.values_list('pk', flat=True))
+
+    def test_requires_authentication(self):
+        for method in ('get', 'post', 'delete'):
+            response = getattr(Client(), method)(self.url)
+            self.assertIn(response.status_code, (401, 403))
+
+    # Сессия и пользователь + один запрос на изменение полки
+    def test_add_creates_bookshelf_in_one_query(self):
+        with self.assertNumQueries(3):
+            response = self.change('post', self.ids[:3])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'added': self.ids[:3]})
+        self.assertEqual(self.shelved(), self.ids[:3])
+
+    def test_add_is_idempotent(self):
+        self.change('post', self.ids[:3])
+        response = self.change('post', self.ids)
+        self.assertEqual(response.json(), {'added': self.ids[3:]})
+
+        response = self.change('post', self.ids)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'added': []})
+        self.assertEqual(self.shelved(), self.ids)
+        self.assertEqual(Bookshelf.objects.filter(user=self.user).count(), 1)
+
+    def test_add_ignores_missing_and_duplicate_books(self):
+        response = self.change('post', [self.ids[0], self.ids[0], max(self.ids) + 100])
+        self.assertEqual(response.json(), {'added': [self.ids[0]]})
+
+    def test_remove_in_one_query(self):
+        self.change('post', self.ids)
+        # Сессия + один запрос: пользователь после первого запроса берется из кеша
+        with self.assertNumQueries(2):
+            response = self.change('delete', self.ids[:2] + [max(self.ids) + 100])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'removed': self.ids[:2]})
+        self.assertEqual(self.shelved(), self.ids[2:])
+
+        self.assertEqual(self.change('delete', self.ids[:2]).json(), {'removed': []})
+
+    def test_remove_does_not_touch_other_users(self):
+        self.change('post', self.ids)
+        other = Client()
+        other.force_login(self.other_user)
+        other.post(self.url, {'books': self.ids}, content_type='application/json')
+
+        self.change('delete', self.ids)
+        self.assertEqual(self.shelved(), [])
+        self.assertEqual(self.shelved(self.other_user), self.ids)
+
+    def test_invalid_input(self):
+        for data in ({}, {'books': []}, {'books': ['abc']}, {'books': [0]}):
+            response = self.client.post(self.url, data, content_type='application/json')
+            self.assertEqual(response.status_code, 400, data)
+
+    def test_list(self):
+        self.change('post', self.ids[1:4])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(book['title'] for book in response.json()['results']),
+                         [book.title for book in self.books[1:4]])
+
+    def test_list_pagination(self):
+        self.change('post', self.ids)
+        response = self.client.get(self.url, {'page_size': 2})
+        data = response.json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+
+        seen = [book['title'] for book in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            seen += [book['title'] for book in data['results']]
+        self.assertEqual(sorted(seen), [book.title for book in self.books])
+
+    def test_book_page_adds_book_to_bookshelf(self):
+        url = reverse('catalog:book_detail', kwargs={'slug': self.books[0].slug})
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(self.shelved(), [self.ids[0]])
+
+    def test_book_page_add_requires_login(self):
+        response = Client().post(reverse('catalog:book_detail', kwargs={'slug': self.books[0].slug}))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('users:login'), response.url)
+        self.assertFalse(Bookshelf.objects.exists())
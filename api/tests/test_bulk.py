@@ -0,0 +1,200 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection, models
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from Catalog.facets import facet_counts
+from Catalog.models import Author, Book, Bookshelf, Genre, Rating
+from Catalog.search import search_books
+
+
+class BookBulkApiTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='editor', password='secret-password')
+        self.user.groups.add(Group.objects.create(name='staff'))
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.authors = [
+            Author.objects.create(first_name='Имя', last_name=f'Фамилия {i}', date_of_birth='1900-01-01')
+            for i in range(2)
+        ]
+        self.genres = [Genre.objects.create(genre=f'Жанр {i}') for i in range(3)]
+
+    def send(self, method, data):
+        return getattr(self.client, method)('/api/v1/books/', json.dumps(data), content_type='application/json')
+
+    def book_items(self, count, start=0):
+        return [
+            {'title': f'Книга {i}', 'about': f'Описание {i}', 'author': self.authors[i % 2].pk,
+             'genre': [self.genres[0].pk, self.genres[1 + i % 2].pk]}
+            for i in range(start, start + count)
+        ]
+
+    def refresh_counters(self):
+        for obj in [*self.authors, *self.genres]:
+            obj.refresh_from_db(fields=['books_count'])
+
+    def test_create(self):
+        response = self.send('post', self.book_items(4))
+        self.assertEqual(response.status_code, 201)
+        ids = response.json()['created']
+        self.assertEqual(list(Book.objects.filter(pk__in=ids).order_by('pk').values_list('title', flat=True)),
+                         ['Книга 0', 'Книга 1', 'Книга 2', 'Книга 3'])
+
+        book = Book.objects.get(pk=ids[1])
+        self.assertEqual(book.slug, 'kniga-1')
+        self.assertEqual(book.author, self.authors[1])
+        self.assertEqual(sorted(book.genre.values_list('pk', flat=True)), [self.genres[0].pk, self.genres[2].pk])
+
+        # То, что при сохранении одной книги делают сигналы
+        self.refresh_counters()
+        self.assertEqual([author.books_count for author in self.authors], [2, 2])
+        self.assertEqual([genre.books_count for genre in self.genres], [4, 2, 2])
+        self.assertEqual([book.title for book in search_books('Описание 3')][:1], ['Книга 3'])
+        self.assertEqual(dict(facet_counts()['genres'])[self.genres[0]], 4)
+
+    def test_single_create_still_works(self):
+        response = self.send('post', {'title': 'Одна книга', 'about': 'Описание', 'genre': [self.genres[0].pk]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['title'], 'Одна книга')
+
+    def test_create_query_count_does_not_depend_on_size(self):
+        # Первый запрос загружает в кеш пользователя сессии и его группы
+        self.send('post', self.book_items(1, start=1000))
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.send('post', self.book_items(5)).status_code, 201)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.send('post', self.book_items(100, start=5)).status_code, 201)
+        self.assertEqual(len(small), len(large))
+
+    def test_create_errors_per_item(self):
+        Book.objects.create(title='Книга 1', about='Уже есть')
+        items = self.book_items(5)
+        items[2]['author'] = 10 ** 6
+        items[3]['genre'] = [self.genres[0].pk, 10 ** 6]
+        items[4]['title'] = 'Книга 0'
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.send('post', items)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertEqual(list(errors[1]), ['title'])
+        self.assertEqual(list(errors[2]), ['author'])
+        self.assertEqual(list(errors[3]), ['genre'])
+        self.assertEqual(list(errors[4]), ['title'])
+        # Ничего не создано
+        self.assertEqual(Book.objects.count(), 1)
+        # Уникальность названий - один запрос на пачку
+        self.assertEqual(sum('"Catalog_book"."title" IN' in query['sql'] for query in queries), 1)
+
+        response = self.send('post', [{'title': 'Книга'}, {'about': 'Описание'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([list(error) for error in response.json()], [['about'], ['title']])
+
+    @override_settings(API_BULK_MAX_BOOKS=3)
+    def test_batch_size_is_limited(self):
+        self.assertEqual(self.send('post', self.book_items(4)).status_code, 400)
+        self.assertEqual(self.send('post', []).status_code, 400)
+        self.assertFalse(Book.objects.exists())
+
+    def test_update(self):
+        ids = self.send('post', self.book_items(3)).json()['created']
+        response = self.send('patch', [
+            {'id': ids[0], 'title': 'Новое название'},
+            {'id': ids[1], 'author': self.authors[0].pk, 'genre': [self.genres[2].pk]},
+            {'id': ids[2], 'about': 'Новое описание', 'author': None},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'updated': sorted(ids)})
+
+        books = Book.objects.in_bulk(ids)
+        self.assertEqual((books[ids[0]].title, books[ids[0]].slug), ('Новое название', 'novoe-nazvanie'))
+        self.assertEqual(books[ids[0]].about, 'Описание 0')
+        self.assertEqual(books[ids[1]].author, self.authors[0])
+        self.assertEqual(list(books[ids[1]].genre.values_list('pk', flat=True)), [self.genres[2].pk])
+        self.assertEqual((books[ids[2]].about, books[ids[2]].author), ('Новое описание', None))
+
+        self.refresh_counters()
+        self.assertEqual([author.books_count for author in self.authors], [2, 0])
+        self.assertEqual([genre.books_count for genre in self.genres], [2, 2, 1])
+        self.assertEqual([book.title for book in search_books('Новое название')], ['Новое название'])
+
+    def test_update_query_count_does_not_depend_on_size(self):
+        ids = self.send('post', self.book_items(105)).json()['created']
+
+        def update(book_ids, suffix):
+            changes = [{'id': pk, 'title': f'Название {pk} {suffix}', 'genre': [self.genres[2].pk]}
+                       for pk in book_ids]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.send('patch', changes).status_code, 200)
+            return len(queries)
+
+        self.assertEqual(update(ids[:5], 'а'), update(ids[5:], 'б'))
+
+    def test_update_errors_per_item(self):
+        ids = self.send('post', self.book_items(3)).json()['created']
+        response = self.send('patch', [
+            {'id': ids[0], 'title': 'Книга 2'},
+            {'id': ids[1], 'title': 'Книга 1'},
+            {'title': 'Без id'},
+            {'id': 10 ** 6, 'about': 'Нет такой книги'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(list(errors[0]), ['title'])
+        # Книга может сохранить свое название
+        self.assertEqual(errors[1], {})
+        self.assertEqual(list(errors[2]), ['id'])
+        self.assertEqual(list(errors[3]), ['id'])
+        self.assertEqual(Book.objects.get(pk=ids[0]).title, 'Книга 0')
+
+    def test_delete(self):
+        ids = self.send('post', self.book_items(4)).json()['created']
+        Rating.objects.create(user=self.user, book_id=ids[0], score=5)
+        Bookshelf.objects.create(user=self.user).book.add(ids[0], ids[3])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.send('delete', {'ids': [ids[0], ids[1], 10 ** 6]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'deleted': [ids[0], ids[1]]})
+        self.assertEqual(list(Book.objects.order_by('pk').values_list('pk', flat=True)), ids[2:])
+        self.assertFalse(Rating.objects.exists())
+        self.assertEqual(list(self.user.bookshelf.book.values_list('pk', flat=True)), [ids[3]])
+
+        self.refresh_counters()
+        self.assertEqual([author.books_count for author in self.authors], [1, 1])
+        self.assertEqual([genre.books_count for genre in self.genres], [2, 1, 1])
+        self.assertEqual(dict(facet_counts()['genres'])[self.genres[0]], 2)
+        # Без загрузки книг и сигналов на каждую книгу
+        self.assertLess(len(queries), 30)
+
+    def test_delete_protected(self):
+        ids = self.send('post', self.book_items(2)).json()['created']
+        Rating.objects.create(user=self.user, book_id=ids[0], score=5)
+
+        # Оценки не удаляются каскадно - удаление идет через QuerySet.delete()
+        with mock.patch.object(Rating._meta.get_field('book').remote_field, 'on_delete', models.PROTECT):
+            response = self.send('delete', {'ids': ids})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(list(response.json()), ['ids'])
+            self.assertEqual(Book.objects.filter(pk__in=ids).count(), 2)
+            self.assertTrue(Rating.objects.exists())
+
+            response = self.send('delete', {'ids': [ids[1]]})
+        self.assertEqual(response.json(), {'deleted': [ids[1]]})
+        self.refresh_counters()
+        self.assertEqual(sum(author.books_count for author in self.authors), 1)
+
+    def test_staff_only(self):
+        self.client.logout()
+        self.assertIn(self.send('post', self.book_items(1)).status_code, (401, 403))
+        self.assertIn(self.send('patch', [{'id': 1, 'about': 'Описание'}]).status_code, (401, 403))
+        self.assertIn(self.send('delete', {'ids': [1]}).status_code, (401, 403))
@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+
+from Catalog.models import Author, Book, Genre
+
+
+class SparseFieldsetTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = Author.objects.create(first_name='Лев', last_name='Толстой', date_of_birth='1828-09-09')
+        self.genres = [Genre.objects.create(genre=f'Жанр {i}') for i in range(2)]
+        for i in range(5):
+            book = Book.objects.create(title=f'Книга {i}', author=self.author, about='Описание ' * 200)
+            book.genre.set(self.genres)
+
+    def get(self, url='/api/v1/books/', **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_full_representation_by_default(self):
+        response, queries = self.get()
+        book = response.json()['results'][0]
+        self.assertEqual(set(book), {'title', 'author', 'genre', 'about', 'rating', 'rating_count'})
+        self.assertEqual(book['author'], self.author.pk)
+        self.assertEqual(len(queries), 2)
+
+    def test_fields_trim_payload_and_columns(self):
+        full, _ = self.get()
+        response, queries = self.get(fields='title,rating')
+        books = response.json()['results']
+        self.assertEqual(set(books[0]), {'title', 'rating'})
+        self.assertEqual(books[0]['title'], 'Книга 0')
+        self.assertLess(len(response.content) * 10, len(full.content))
+
+        # Без жанров нет и запроса за ними, а описание не читается из БД
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"about"', queries[0])
+        self.assertNotIn('"author_id"', queries[0])
+
+    def test_expand(self):
+        for expand in ('author', 'genre', 'author,genre'):
+            response, queries = self.get(expand=expand)
+            self.assertEqual(len(queries), 2, expand)
+
+        book = response.json()['results'][0]
+        self.assertEqual(book['author'], {
+            'id': self.author.pk, 'first_name': 'Лев', 'last_name': 'Толстой', 'slug': self.author.slug,
+        })
+        self.assertEqual([genre['genre'] for genre in book['genre']], ['Жанр 0', 'Жанр 1'])
+
+    def test_expand_query_count_does_not_depend_on_page_size(self):
+        _, queries = self.get(expand='author,genre', page_size=2)
+        _, more_queries = self.get(expand='author,genre', page_size=5)
+        self.assertEqual(len(queries), len(more_queries))
+
+    def test_fields_with_expand(self):
+        response, queries = self.get(fields='title,author', expand='author,genre')
+        book = response.json()['results'][0]
+        self.assertEqual(set(book), {'title', 'author'})
+        self.assertEqual(book['author']['last_name'], 'Толстой')
+        # Жанры не запрошены, поэтому и не загружаются
+        self.assertEqual(len(queries), 1)
+
+    def test_unknown_fields(self):
+        response = self.client.get('/api/v1/books/', {'fields': 'title,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.json())
+
+        response = self.client.get('/api/v1/books/', {'expand': 'about'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.json())
+
+    def test_book_detail(self):
+        book = Book.objects.get(title='Книга 0')
+        url = f'/api/v1/book/{book.pk}'
+        full, _ = self.get(url)
+        response, queries = self.get(url, fields='title,author', expand='author')
+        self.assertEqual(response.json()['author']['first_name'], 'Лев')
+        # Валидаторы условного GET + книга с автором
+        self.assertEqual(len(queries), 2)
+        # У разных наборов полей разные ETag
+        self.assertNotEqual(response['ETag'], full['ETag'])
+
+    def test_cursor_pagination_with_fields(self):
+        # Поле сортировки загружается, даже если его нет в ответе: курсор строится без лишних запросов
+        response, queries = self.get(fields='about', page_size=3)
+        data = response.json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(len(queries), 1)
+        response = self.client.get(data['next'])
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_ndjson_stream_with_fields(self):
+        response = self.client.get('/api/v1/books/', {'stream': 'ndjson', 'fields': 'title', 'expand': 'genre'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0], '{"title":"Книга 0"}')
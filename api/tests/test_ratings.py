@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+
+from Catalog.models import *
+
+
+class BookRatingApiTest(TestCase):
+
+    def setUp(self):
+        author = Author.objects.create(first_name='Имя', last_name='Фамилия', date_of_birth='1900-01-01')
+        self.book = Book.objects.create(title='Книга', author=author, about='Описание')
+        self.url = f'/api/v1/book/{self.book.pk}/rating/'
+        self.user = get_user_model().objects.create(username='reader')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def put(self, data):
+        return self.client.put(self.url, data, content_type='application/json')
+
+    def test_requires_authentication(self):
+        self.assertIn(Client().get(self.url).status_code, (401, 403))
+
+    def test_rate(self):
+        self.assertEqual(self.client.get(self.url).json(), {'rating': '0.00', 'rating_count': 0, 'score': None})
+
+        response = self.put({'score': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'rating': '4.00', 'rating_count': 1, 'score': 4})
+
+        other = Client()
+        other.force_login(get_user_model().objects.create(username='other'))
+        other.put(self.url, {'score': 1}, content_type='application/json')
+
+        self.assertEqual(self.put({'score': 5}).json(), {'rating': '3.00', 'rating_count': 2, 'score': 5})
+        self.assertEqual(self.client.delete(self.url).json(), {'rating': '1.00', 'rating_count': 1, 'score': None})
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+
+    def test_invalid_score(self):
+        for data in ({}, {'score': 0}, {'score': 6}, {'score': 'abc'}):
+            self.assertEqual(self.put(data).status_code, 400, data)
+        self.assertFalse(Rating.objects.exists())
+
+    def test_unknown_book(self):
+        response = self.client.put(f'/api/v1/book/{self.book.pk + 100}/rating/', {'score': 3},
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_book_list_ordering_by_rating(self):
+        other = Book.objects.create(title='Другая книга', author=self.book.author, about='Описание')
+        self.put({'score': 3})
+        self.client.put(f'/api/v1/book/{other.pk}/rating/', {'score': 5}, content_type='application/json')
+
+        staff = get_user_model().objects.create(username='staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        response = client.get('/api/v1/books/', {'ordering': 'rating'})
+        self.assertEqual([book['title'] for book in response.json()['results']], ['Другая книга', 'Книга'])
@@ -0,0 +1,68 @@
+import datetime
+import json
+from decimal import Decimal
+from io import BytesIO
+
+from django.test import SimpleTestCase, TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONParser, ORJSONRenderer
+from Catalog.models import Book, Genre
+
+
+class ORJSONRendererTest(SimpleTestCase):
+
+    def render(self, data, accepted_media_type='application/json', renderer_context=None):
+        return ORJSONRenderer().render(data, accepted_media_type, renderer_context)
+
+    def test_same_data_as_drf_renderer(self):
+        data = {
+            'title': 'Война и мир',
+            'rating': Decimal('4.50'),
+            'created': datetime.datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc),
+            'date': datetime.date(1869, 1, 1),
+            'error': gettext_lazy('This field is required.'),
+            'genre': (1, 2),
+            'author': None,
+            1: 'ключ-число',
+        }
+        content = self.render(data)
+        self.assertEqual(json.loads(content), json.loads(JSONRenderer().render(data)))
+        # Компактный вывод без экранирования кириллицы
+        self.assertIn('"title":"Война и мир"'.encode(), content)
+
+    def test_empty(self):
+        self.assertEqual(self.render(None), b'')
+
+    def test_indent(self):
+        self.assertEqual(self.render({'a': 1}, 'application/json; indent=4'), b'{\n  "a": 1\n}')
+        self.assertEqual(self.render({'a': 1}, renderer_context={'indent': 4}), b'{\n  "a": 1\n}')
+        self.assertEqual(self.render({'a': 1}, 'application/json; indent=0'), b'{"a":1}')
+
+
+class ORJSONParserTest(SimpleTestCase):
+
+    def test_parse(self):
+        self.assertEqual(ORJSONParser().parse(BytesIO('{"title": "Книга", "genre": [1]}'.encode())),
+                         {'title': 'Книга', 'genre': [1]})
+
+    def test_invalid(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"title": '))
+
+
+class JSONApiTest(TestCase):
+
+    def test_response(self):
+        genre = Genre.objects.create(genre='Роман')
+        Book.objects.create(title='Книга', about='Описание').genre.add(genre)
+        response = self.client.get('/api/v1/books/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['results'][0]['genre'], [genre.pk])
+
+    def test_invalid_body(self):
+        response = self.client.post('/api/v1/auth/jwt/create/', '{"username": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
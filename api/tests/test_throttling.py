@@ -0,0 +1,202 @@
+import itertools
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.throttling import AutocompleteRateThrottle
+from Catalog.models import Book
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates},
+    })
+
+
+class SlidingWindowTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = Request(APIRequestFactory().get('/api/v1/autocomplete/book/'))
+        self.start = 60 * 1000
+
+    def allow(self, now):
+        throttle = AutocompleteRateThrottle()
+        with mock.patch('api.throttling.time.time', return_value=now):
+            return throttle.allow_request(self.request, None), throttle
+
+    @throttle_rates(autocomplete='10/min')
+    def test_limit_in_window(self):
+        for _ in range(10):
+            allowed, _ = self.allow(self.start)
+            self.assertTrue(allowed)
+        allowed, throttle = self.allow(self.start + 1)
+        self.assertFalse(allowed)
+        # Только через полное окно вес предыдущего окна опустится до 9 запросов
+        self.assertEqual(throttle.wait(), 65)
+        self.assertEqual(self.request._request.rate_limit[:2], (10, 0))
+
+    @throttle_rates(autocomplete='10/min')
+    def test_previous_window_is_weighted(self):
+        for _ in range(10):
+            self.allow(self.start)
+        # Середина следующего окна: из предыдущего учитывается половина запросов
+        results = [self.allow(self.start + 90)[0] for _ in range(6)]
+        self.assertEqual(results, [True] * 5 + [False])
+
+        allowed, _ = self.allow(self.start + 120)
+        self.assertTrue(allowed)
+
+    @throttle_rates(autocomplete='10/min')
+    def test_counter_expires_before_incr(self):
+        add = cache.add
+
+        def add_and_expire(key, value, timeout):
+            # Срок жизни счетчика истекает сразу после первого add
+            added = add(key, value, timeout)
+            if value == 0:
+                cache.delete(key)
+            return added
+
+        with mock.patch.object(cache, 'add', side_effect=add_and_expire):
+            allowed, _ = self.allow(self.start)
+        self.assertTrue(allowed)
+        self.assertEqual(self.request._request.rate_limit[:2], (10, 9))
+
+
+@throttle_rates(anon='3/min', user='5/min', token='3/min', auth='2/min')
+class RateLimitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = get_user_model().objects.create_user(username='reader', password='secret-password')
+        self.book = Book.objects.create(title='Книга', about='Описание')
+        self.url = f'/api/v1/book/{self.book.pk}'
+
+    def test_anonymous_limit(self):
+        for remaining in (2, 1, 0):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-RateLimit-Limit'], '3')
+            self.assertEqual(response['X-RateLimit-Remaining'], str(remaining))
+            self.assertIn('X-RateLimit-Reset', response)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        # Другой IP-адрес считается отдельно
+        response = self.client.get(self.url, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_and_user_limits(self):
+        token = Token.objects.create(user=self.user)
+        access = RefreshToken.for_user(self.user).access_token
+
+        def get(authorization):
+            return self.client.get(self.url, HTTP_AUTHORIZATION=authorization)
+
+        first, second = f'Token {token.key}', f'Bearer {access}'
+        for _ in range(3):
+            self.assertEqual(get(first).status_code, 200)
+        # Лимит одного токена исчерпан, а другой токен того же пользователя работает
+        self.assertEqual(get(first).status_code, 429)
+        response = get(second)
+        self.assertEqual(response.status_code, 200)
+        # Заголовки - по самому строгому лимиту: отклоненный запрос тоже учтен в лимите
+        # пользователя, поэтому из 5 запросов у него не осталось ни одного
+        self.assertEqual(response['X-RateLimit-Limit'], '5')
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+
+        # Лимит пользователя исчерпан всеми токенами вместе
+        self.assertEqual(get(second).status_code, 429)
+
+    def test_token_login_limit(self):
+        for _ in range(2):
+            response = self.client.post('/api/v1/auth/token/login/',
+                                        {'username': 'reader', 'password': 'wrong-password'})
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/v1/auth/token/login/',
+                                    {'username': 'reader', 'password': 'secret-password'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        response = self.client.post('/api/v1/auth/jwt/create/',
+                                    {'username': 'reader', 'password': 'secret-password'})
+        self.assertEqual(response.status_code, 429)
+
+
+class ConcurrencyLimitTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        Book.objects.create(title='Книга', about='Описание')
+
+    def stream(self):
+        return self.client.get('/api/v1/books/', {'stream': 'ndjson'})
+
+    @override_settings(API_MAX_CONCURRENT_REQUESTS=2)
+    def test_streaming_requests_are_limited(self):
+        first, second = self.stream(), self.stream()
+        self.assertEqual(second.status_code, 200)
+
+        response = self.stream()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+
+        # Место освобождается, когда ответ отдан целиком
+        b''.join(first.streaming_content)
+        third = self.stream()
+        self.assertEqual(third.status_code, 200)
+        b''.join(second.streaming_content)
+        b''.join(third.streaming_content)
+
+        # Обычные запросы освобождают место сразу
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/v1/books/').status_code, 200)
+
+    @override_settings(API_MAX_CONCURRENT_REQUESTS=2)
+    def test_expired_counter_does_not_go_negative(self):
+        first = self.stream()
+        # Счетчик истек, пока отдавался первый ответ
+        cache.clear()
+        second = self.stream()
+        b''.join(second.streaming_content)
+        b''.join(first.streaming_content)
+
+        responses = [self.stream() for _ in range(3)]
+        self.assertEqual([response.status_code for response in responses], [200, 200, 429])
+        for response in responses[:2]:
+            b''.join(response.streaming_content)
+
+    @override_settings(API_MAX_CONCURRENT_REQUESTS=2)
+    def test_expired_request_does_not_release_other_requests(self):
+        first = self.stream()
+        # Место первого запроса истекло, пока отдавался ответ, и его заняли другие
+        cache.clear()
+        second, third = self.stream(), self.stream()
+        b''.join(first.streaming_content)
+
+        self.assertEqual(self.stream().status_code, 429)
+        b''.join(second.streaming_content)
+        b''.join(third.streaming_content)
+
+    def test_streaming_response_refreshes_slot(self):
+        Book.objects.create(title='Другая книга', about='Описание')
+        with override_settings(API_STREAM_CHUNK_SIZE=1):
+            response = self.stream()
+        with mock.patch('api.throttling.time.monotonic', side_effect=itertools.count(step=60)), \
+                mock.patch('api.throttling.cache.touch') as touch:
+            b''.join(response.streaming_content)
+        touch.assert_called()
+        self.assertTrue(touch.call_args.args[0].startswith('throttle:concurrency:BookApiList:'))
@@ -0,0 +1,159 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, Client, override_settings
+
+from api.pagination import BookCursorPagination
+from Catalog.models import *
+
+
+class BookApiQueryBudgetTest(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.author = Author.objects.create(
+            first_name='Имя',
+            last_name='Фамилия',
+            date_of_birth='1900-01-01'
+        )
+        self.genres = [Genre.objects.create(genre=f'Жанр {i}') for i in range(3)]
+
+    def add_books(self, count):
+        start = Book.objects.count()
+        for i in range(start, start + count):
+            book = Book.objects.create(title=f'Книга {i}', author=self.author, about=f'Описание {i}')
+            book.genre.set(self.genres)
+
+    def test_book_list_query_count_does_not_depend_on_size(self):
+        self.add_books(1)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/books/')
+        self.assertEqual(len(response.json()['results']), 1)
+
+        self.add_books(20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/books/')
+        self.assertEqual(len(response.json()['results']), 20)
+
+    def test_book_detail(self):
+        self.add_books(1)
+        book = Book.objects.get()
+        # Валидаторы условного GET + книга + жанры
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/v1/book/{book.pk}')
+        self.assertEqual(response.json()['genre'], [genre.pk for genre in self.genres])
+
+
+class BookApiConditionalGetTest(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.book = Book.objects.create(title='Война и мир', about='Эпопея')
+        self.url = f'/api/v1/book/{self.book.pk}'
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_modified_after_save(self):
+        response = self.client.get(self.url)
+        self.book.about = 'Роман-эпопея'
+        self.book.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['about'], 'Роман-эпопея')
+
+
+class BookApiPaginationTest(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.genre = Genre.objects.create(genre='Жанр')
+        for i in range(25):
+            book = Book.objects.create(title=f'Книга {i:02}', about='Описание')
+            book.genre.add(self.genre)
+
+    def test_first_page(self):
+        data = self.client.get('/api/v1/books/').json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0]['title'], 'Книга 00')
+        self.assertIsNone(data['previous'])
+        self.assertIsNotNone(data['next'])
+
+    def test_follow_next_link(self):
+        data = self.client.get('/api/v1/books/').json()
+        data = self.client.get(data['next']).json()
+        self.assertEqual([book['title'] for book in data['results']], [f'Книга {i:02}' for i in range(20, 25)])
+        self.assertIsNone(data['next'])
+
+    def test_search_pages_have_no_duplicates_or_gaps(self):
+        # Книги с совпадением в названии выше, у остальных 25 ранг одинаковый
+        for i in range(5):
+            Book.objects.create(title=f'Описание книги {i}', about='Описание')
+
+        def walk(data, link):
+            pages = [[book['title'] for book in data['results']]]
+            while data[link]:
+                data = self.client.get(data[link]).json()
+                pages.append([book['title'] for book in data['results']])
+            return pages, data
+
+        first_page = self.client.get('/api/v1/books/', {'q': 'описание', 'page_size': 7}).json()
+        pages, last_page = walk(first_page, 'next')
+        titles = [title for page in pages for title in page]
+        self.assertEqual(len(titles), 30)
+        self.assertEqual(len(set(titles)), 30)
+        self.assertEqual(set(titles[:5]), {f'Описание книги {i}' for i in range(5)})
+
+        # Обратно по ссылкам previous с последней страницы - те же страницы
+        self.assertEqual(walk(last_page, 'previous')[0][::-1], pages)
+
+    def test_page_size_param_is_limited(self):
+        data = self.client.get('/api/v1/books/', {'page_size': 5}).json()
+        self.assertEqual(len(data['results']), 5)
+
+        with mock.patch.object(BookCursorPagination, 'max_page_size', 10):
+            data = self.client.get('/api/v1/books/', {'page_size': 1000}).json()
+        self.assertEqual(len(data['results']), 10)
+
+    @override_settings(API_STREAM_CHUNK_SIZE=10)
+    def test_ndjson_stream(self):
+        # Один серверный курсор по книгам + запрос жанров на каждую из 3 пачек
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/v1/books/', {'stream': 'ndjson'})
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        books = [json.loads(line) for line in lines]
+        self.assertEqual(len(books), 25)
+        self.assertEqual(books[0], {
+            'title': 'Книга 00',
+            'author': None,
+            'genre': [self.genre.pk],
+            'about': 'Описание',
+            'rating': '0.00',
+            'rating_count': 0,
+        })
+
+    @override_settings(API_STREAM_CHUNK_SIZE=10)
+    async def test_ndjson_stream_asgi(self):
+        response = await self.async_client.get('/api/v1/books/', {'stream': 'ndjson'})
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+
+        # Одна строка на книгу, одна часть ответа на пачку
+        self.assertEqual(len(chunks), 3)
+        books = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+        self.assertEqual([book['title'] for book in books], [f'Книга {i:02}' for i in range(25)])
+        self.assertEqual(books[0]['genre'], [self.genre.pk])
+
+    def test_ndjson_stream_with_search(self):
+        response = self.client.get('/api/v1/books/', {'stream': 'ndjson', 'q': 'Книга 07'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])['title'], 'Книга 07')
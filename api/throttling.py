@@ -0,0 +1,271 @@
+"""
+Ограничение частоты и параллельности запросов к API на общем кеше Django
+(в тестах и при одном процессе работает и с LocMemCache).
+
+Частота считается скользящим окном по двум счетчикам: запросы текущего окна фиксированной
+длины плюс запросы предыдущего окна с весом, равным доле предыдущего окна, которая еще
+попадает в последние duration секунд. В кеше на клиента два числа вместо списка отметок
+времени, как у rest_framework.throttling.SimpleRateThrottle.
+
+Ответ 429 содержит Retry-After, а все ответы ограниченных представлений - заголовки
+X-RateLimit-Limit / X-RateLimit-Remaining / X-RateLimit-Reset самого строгого из лимитов
+(их добавляет RateLimitHeadersMiddleware)
+"""
+import math
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+def increment(key, timeout):
+    """
+    Увеличивает счетчик в кеше, создавая его со сроком жизни timeout, и возвращает новое значение
+    """
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Счетчик истек между add и incr
+        if cache.add(key, 1, timeout):
+            return 1
+        return cache.incr(key)
+
+
+class SlidingWindowRateThrottle(BaseThrottle):
+    """
+    Лимит scope из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] ('число/период', как в DRF)
+    для клиента, которого определяет get_cache_key (None - лимит к запросу не применяется)
+    """
+    scope = None
+    durations = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+    def get_rate(self):
+        num, period = api_settings.DEFAULT_THROTTLE_RATES[self.scope].split('/')
+        return int(num), self.durations[period[0]]
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        limit, duration = self.get_rate()
+        now = time.time()
+        window, elapsed = divmod(now, duration)
+        current_key = f'throttle:{self.scope}:{key}:{int(window)}'
+        counts = cache.get_many([f'throttle:{self.scope}:{key}:{int(window) - 1}', current_key])
+        previous = counts.get(f'throttle:{self.scope}:{key}:{int(window) - 1}', 0)
+        current = counts.get(current_key, 0)
+        estimate = previous * (duration - elapsed) / duration + current
+
+        allowed = estimate + 1 <= limit
+        if allowed:
+            current = increment(current_key, duration * 2)
+            estimate = previous * (duration - elapsed) / duration + current
+        self.wait_seconds = 0 if allowed else self.get_wait(limit, duration, elapsed, previous, current)
+        self.record(request, limit, max(0, math.floor(limit - estimate)), math.ceil(duration - elapsed))
+        return allowed
+
+    @staticmethod
+    def get_wait(limit, duration, elapsed, previous, current):
+        """
+        Через сколько секунд оценка числа запросов опустится до limit - 1 и запрос пройдет
+        """
+        if current + 1 <= limit:
+            # Хватит того, что вес предыдущего окна уменьшится
+            return max(0, duration - elapsed - (limit - 1 - current) * duration / previous)
+        # В следующем окне предыдущим станет текущее
+        return duration - elapsed + max(0, duration * (1 - (limit - 1) / current))
+
+    def record(self, request, limit, remaining, reset):
+        # Заголовки ответа - по лимиту с наименьшим остатком
+        django_request = request._request
+        headers = getattr(django_request, 'rate_limit', None)
+        if headers is None or remaining < headers[1]:
+            django_request.rate_limit = (limit, remaining, reset)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AnonRateThrottle(SlidingWindowRateThrottle):
+    """
+    Анонимные запросы: по IP-адресу
+    """
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserRateThrottle(SlidingWindowRateThrottle):
+    """
+    Запросы пользователя через все его сессии и токены
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class TokenRateThrottle(SlidingWindowRateThrottle):
+    """
+    Запросы с одним токеном (authtoken или JWT): один токен не расходует весь лимит пользователя
+    """
+    scope = 'token'
+
+    def get_cache_key(self, request, view):
+        token = request.auth
+        if token is None:
+            return None
+        # Ключ authtoken или jti access-токена JWT
+        return getattr(token, 'key', None) or token.get('jti')
+
+
+class AuthRateThrottle(SlidingWindowRateThrottle):
+    """
+    Выдача, обновление и отзыв токенов (auth/token/login/, auth/jwt/...): по IP-адресу,
+    чтобы пароли нельзя было перебирать
+    """
+    scope = 'auth'
+
+    def get_cache_key(self, request, view):
+        # Модуль импортируется при загрузке rest_framework.views (DEFAULT_THROTTLE_CLASSES),
+        # поэтому представления djoser и simplejwt импортируются здесь
+        from djoser.views import TokenCreateView
+        from rest_framework_simplejwt.views import TokenViewBase
+
+        if request.method == 'POST' and isinstance(view, (TokenCreateView, TokenViewBase)):
+            return self.get_ident(request)
+        return None
+
+
+class AutocompleteRateThrottle(SlidingWindowRateThrottle):
+    """
+    Подсказки запрашиваются при вводе каждого символа, поэтому у них свой, более высокий лимит по IP
+    """
+    scope = 'autocomplete'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class ConcurrencyLimitMixin:
+    """
+    Не больше settings.API_MAX_CONCURRENT_REQUESTS одновременных запросов клиента (пользователя
+    или IP-адреса) к дорогому представлению. Запрос считается выполняющимся до конца отдачи
+    ответа, в том числе потокового. Каждый запрос занимает в кеше свое место (ключ со случайным
+    значением) на concurrency_timeout секунд, поэтому запросы упавшего процесса не занимают
+    его навсегда. Потоковый ответ продлевает место, пока отдается, а освобождает только свое:
+    если оно истекло и занято другим запросом, тот продолжает считаться
+    """
+    concurrency_timeout = 60
+
+    def get_concurrency_key(self, request):
+        if request.user and request.user.is_authenticated:
+            client = f'user:{request.user.pk}'
+        else:
+            client = f'ip:{BaseThrottle().get_ident(request)}'
+        return f'throttle:concurrency:{type(self).__name__}:{client}'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = self.get_concurrency_key(request)
+        owner = uuid.uuid4().hex
+        for slot in range(settings.API_MAX_CONCURRENT_REQUESTS):
+            if cache.add(f'{key}:{slot}', owner, self.concurrency_timeout):
+                self.concurrency_slot = (f'{key}:{slot}', owner)
+                return
+        raise Throttled(wait=1, detail='Слишком много одновременных запросов.')
+
+    def release_concurrency(self, slot):
+        key, owner = slot
+        if cache.get(key) == owner:
+            cache.delete(key)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        slot = getattr(self, 'concurrency_slot', None)
+        if slot is None:
+            return response
+        self.concurrency_slot = None
+
+        if not response.streaming:
+            self.release_concurrency(slot)
+        elif response.is_async:
+            response.streaming_content = self.arelease_after(response.streaming_content, slot)
+        else:
+            response.streaming_content = self.release_after(response.streaming_content, slot)
+        return response
+
+    def refresh_concurrency(self, slot, refreshed_at):
+        """
+        Продлевает место потокового ответа не чаще чем раз в треть concurrency_timeout;
+        возвращает время последнего продления
+        """
+        now = time.monotonic()
+        if now - refreshed_at < self.concurrency_timeout / 3:
+            return refreshed_at
+        cache.touch(slot[0], self.concurrency_timeout)
+        return now
+
+    def release_after(self, content, slot):
+        refreshed_at = time.monotonic()
+        try:
+            for chunk in content:
+                refreshed_at = self.refresh_concurrency(slot, refreshed_at)
+                yield chunk
+        finally:
+            self.release_concurrency(slot)
+
+    async def arelease_after(self, content, slot):
+        refreshed_at = time.monotonic()
+        try:
+            async for chunk in content:
+                refreshed_at = self.refresh_concurrency(slot, refreshed_at)
+                yield chunk
+        finally:
+            self.release_concurrency(slot)
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Добавляет к ответу API заголовки X-RateLimit-* по данным ограничителей частоты
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.add_headers(request, await self.get_response(request))
+
+    def add_headers(self, request, response):
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            limit, remaining, reset = rate_limit
+            response['X-RateLimit-Limit'] = limit
+            response['X-RateLimit-Remaining'] = remaining
+            response['X-RateLimit-Reset'] = reset
+        return response
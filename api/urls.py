@@ -7,6 +7,12 @@ urlpatterns = [
     path('drf-auth/', include('rest_framework.urls')),
     path("books/", views.BookApiList.as_view()),
     path("book/<int:pk>", views.BookApiUpdate.as_view()),
+    path("book/<int:pk>/rating/", views.BookRatingApi.as_view()),
+    path("bookshelf/", views.BookshelfApi.as_view()),
+    path("autocomplete/<str:kind>/", views.AutocompleteApi.as_view(), name="autocomplete"),
     path('auth/', include('djoser.urls')),
+    # Обновление и проверка JWT: djoser (auth/jwt/create/, refresh/, verify/), выход - auth/jwt/revoke/
+    path('auth/jwt/revoke/', views.TokenRevokeApi.as_view(), name='jwt-revoke'),
+    re_path(r'^auth/', include('djoser.urls.jwt')),
     re_path(r'^auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,18 +1,247 @@
-from rest_framework import generics
-from .serializer import BookSerializer
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import ProtectedError, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenViewBase
+from .serializer import (
+    AutocompleteQuerySerializer, BookBulkDeleteSerializer, BookBulkSerializer, BookBulkUpdateSerializer,
+    BookRatingSerializer, BookSerializer, BookshelfChangeSerializer,
+)
 
-from Catalog.models import Book
+from Catalog.autocomplete import SOURCES, autocomplete
+from Catalog.books import create_books, delete_books, update_books
+from Catalog.bookshelf import add_books, remove_books
+from Catalog.conditional import ConditionalGetMixin
+from Catalog.models import Book, Rating
+from Catalog.ratings import rate_book, unrate_book
+from Catalog.search import search_books
+from users.jwt import JWTAuthentication, StatelessJWTAuthentication, TokenRevokeSerializer
+from .fieldsets import SparseFieldsetMixin
+from .pagination import BookCursorPagination
 from .permissions import IsStaff
+from .renderers import dumps
+from .throttling import AutocompleteRateThrottle, ConcurrencyLimitMixin
 
+# Представлениям каталога нужны только pk и роли пользователя: access-токен JWT проверяется
+# без запросов к БД (JWTUser), остальные способы аутентификации - как по умолчанию
+CATALOG_AUTHENTICATION_CLASSES = [
+    StatelessJWTAuthentication,
+    *(cls for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES if cls is not JWTAuthentication),
+]
 
-class BookApiList(generics.ListCreateAPIView):
-    queryset = Book.objects.all()
+
+class BookApiList(ConcurrencyLimitMixin, SparseFieldsetMixin, generics.ListCreateAPIView):
+    """
+    Список книг и создание книги. Массовые операции (Catalog.books), каждая пачка - одна транзакция:
+    POST [{...}, ...] - создание, PATCH [{"id": ..., ...}, ...] - частичное изменение,
+    DELETE {"ids": [...]} - удаление
+    """
+    queryset = Book.objects.for_api()
     serializer_class = BookSerializer
+    authentication_classes = CATALOG_AUTHENTICATION_CLASSES
     permission_classes = [IsStaff,]
+    pagination_class = BookCursorPagination
+
+    def get_queryset(self):
+        fields, expand = self.get_fieldset()
+        if fields is not None:
+            # Поля сортировки нужны пагинации для курсора следующей страницы
+            fields = (*fields, 'title', 'rating')
+        queryset = Book.objects.for_api(fields, expand)
+        query = self.request.query_params.get('q', '').strip()
+        if query:
+            queryset = search_books(query, queryset)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        # Список книг - массовое создание (Catalog.books)
+        if isinstance(request.data, list):
+            items = self.validate_bulk(BookBulkSerializer, request.data)
+            books = create_books(items)
+            return Response({'created': [book.pk for book in books]}, status=status.HTTP_201_CREATED)
+        return super().create(request, *args, **kwargs)
+
+    def patch(self, request, *args, **kwargs):
+        """
+        Массовое частичное изменение: [{"id": ..., изменяемые поля}, ...]
+        """
+        changes = self.validate_bulk(BookBulkUpdateSerializer, request.data, partial=True)
+        return Response({'updated': sorted(update_books(changes))})
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Массовое удаление: {"ids": [...]}. Книги, которых уже нет, пропускаются
+        """
+        serializer = BookBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            deleted = delete_books(serializer.validated_data['ids'])
+        except ProtectedError:
+            raise ValidationError({'ids': ['На книги ссылаются объекты, которые нельзя удалить.']})
+        return Response({'deleted': deleted})
+
+    def validate_bulk(self, serializer_class, data, partial=False):
+        serializer = serializer_class(data=data, many=True, partial=partial, allow_empty=False,
+                                      max_length=settings.API_BULK_MAX_BOOKS)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('stream') == 'ndjson':
+            return self.stream_ndjson(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
+
+    def stream_ndjson(self, queryset):
+        """
+        Отдает все книги потоком в формате NDJSON (одна книга на строку).
+        Книги читаются серверным курсором пачками по API_STREAM_CHUNK_SIZE,
+        жанры подгружаются одним запросом на пачку, поэтому память не растет с размером каталога
+        """
+        serializer = self.get_serializer()
+        chunk_size = settings.API_STREAM_CHUNK_SIZE
 
+        def row(book):
+            return dumps(serializer.to_representation(book)) + b'\n'
 
-class BookApiUpdate(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Book.objects.all()
+        def rows():
+            for book in queryset.iterator(chunk_size=chunk_size):
+                yield row(book)
+
+        async def arows():
+            # Под ASGI синхронный итератор был бы целиком прочитан в память до отправки,
+            # поэтому книги читаются асинхронно. aiterator() в Django 4.2 не поддерживает
+            # prefetch_related, поэтому жанры подгружаются отдельно на каждую пачку
+            lookups = queryset._prefetch_related_lookups
+            chunk = []
+            async for book in queryset.prefetch_related(None).aiterator(chunk_size=chunk_size):
+                chunk.append(book)
+                if len(chunk) == chunk_size:
+                    await sync_to_async(prefetch_related_objects)(chunk, *lookups)
+                    yield b''.join(map(row, chunk))
+                    chunk = []
+            if chunk:
+                await sync_to_async(prefetch_related_objects)(chunk, *lookups)
+                yield b''.join(map(row, chunk))
+
+        content = arows() if isinstance(self.request._request, ASGIRequest) else rows()
+        return StreamingHttpResponse(content, content_type='application/x-ndjson; charset=utf-8')
+
+
+class BookApiUpdate(ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Book.objects.for_api()
     serializer_class = BookSerializer
     permission_required = 'Catalog.delete_book'
+    authentication_classes = CATALOG_AUTHENTICATION_CLASSES
     permission_classes = [IsStaff,]
+    # Представление книги в API не зависит от пользователя
+    etag_per_user = False
+
+    def get_queryset(self):
+        return Book.objects.for_api(*self.get_fieldset())
+
+    def get_validators(self):
+        book = Book.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', flat=True).first()
+        if book is None:
+            return None
+        # Переименование автора или жанра меняет updated_at книги (Catalog.signals),
+        # поэтому раскрытые связи в ETag учитывать не нужно - достаточно набора полей
+        return f'book:{self.kwargs["pk"]}:{self.get_fieldset()}', book
+
+
+class BookshelfApi(SparseFieldsetMixin, generics.ListAPIView):
+    """
+    Книжная полка текущего пользователя:
+    GET - книги на полке, POST {"books": [...]} - добавить книги, DELETE {"books": [...]} - убрать книги.
+    Изменение полки - один запрос к БД независимо от числа книг
+    """
+    serializer_class = BookSerializer
+    authentication_classes = CATALOG_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated,]
+    pagination_class = BookCursorPagination
+
+    def get_queryset(self):
+        fields, expand = self.get_fieldset()
+        if fields is not None:
+            fields = (*fields, 'title', 'rating')
+        return Book.objects.for_api(fields, expand).filter(bookshelf__user_id=self.request.user.pk)
+
+    def get_book_ids(self, request):
+        serializer = BookshelfChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['books']
+
+    def post(self, request, *args, **kwargs):
+        added = add_books(request.user, Book.objects.filter(pk__in=self.get_book_ids(request)))
+        return Response({'added': sorted(added)}, status=status.HTTP_201_CREATED if added else status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        removed = remove_books(request.user, self.get_book_ids(request))
+        return Response({'removed': sorted(removed)})
+
+
+class BookRatingApi(generics.GenericAPIView):
+    """
+    Оценка книги текущим пользователем:
+    GET - рейтинг книги и своя оценка, PUT {"score": 1..5} - поставить или изменить оценку,
+    DELETE - убрать оценку. Рейтинг книги пересчитывается сразу (Catalog.ratings)
+    """
+    queryset = Book.objects.only('id', 'rating', 'rating_count')
+    serializer_class = BookRatingSerializer
+    authentication_classes = CATALOG_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated,]
+
+    def rating_response(self, book):
+        book.score = Rating.objects.filter(user_id=self.request.user.pk, book=book).values_list('score', flat=True).first()
+        return Response(self.get_serializer(book).data)
+
+    def get(self, request, *args, **kwargs):
+        return self.rating_response(self.get_object())
+
+    def put(self, request, *args, **kwargs):
+        book = self.get_object()
+        serializer = self.get_serializer(book, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rate_book(request.user, book, serializer.validated_data['score'])
+        book.refresh_from_db(fields=['rating', 'rating_count'])
+        return self.rating_response(book)
+
+    def delete(self, request, *args, **kwargs):
+        book = self.get_object()
+        if not unrate_book(request.user, book):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        book.refresh_from_db(fields=['rating', 'rating_count'])
+        return self.rating_response(book)
+
+
+class AutocompleteApi(APIView):
+    """
+    Подсказки по началу строки: GET autocomplete/<book|author|genre>/?q=...&limit=...
+    Ищутся в индексе процесса (Catalog.autocomplete) без запросов к БД, поэтому
+    аутентификация (сессия, токен) не выполняется: названия и имена и так публичны
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny,]
+    throttle_classes = [AutocompleteRateThrottle,]
+
+    def get(self, request, kind):
+        if kind not in SOURCES:
+            raise NotFound()
+        serializer = AutocompleteQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        results = autocomplete(kind, serializer.validated_data['q'], serializer.validated_data['limit'])
+        return Response({'results': [{'id': pk, 'text': text} for pk, text in results]})
+
+
+class TokenRevokeApi(TokenViewBase):
+    """
+    Отзыв JWT при выходе: POST {"refresh": "...", "access": "..."} (access необязателен).
+    Отозванные токены попадают в список отзыва (users.jwt) до истечения их срока
+    """
+    serializer_class = TokenRevokeSerializer
@@ -0,0 +1,63 @@
+"""
+Бенчмарки производительности ReadMe на локальном PostgreSQL.
+
+Каждый бенчмарк запускается как модуль из корня проекта, например:
+
+    python -m benchmarks.search --books 1000000
+
+Данные генерируются во временной тестовой базе (как у `manage.py test`),
+поэтому рабочая база из .env не затрагивается.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ReadMe.settings')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+
+@contextmanager
+def bench_database(keepdb=False):
+    """
+    Создает временную тестовую базу данных и удаляет ее после завершения бенчмарка
+    """
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def measure(func, repeat=20, warmup=2):
+    """
+    Выполняет func несколько раз и возвращает время выполнения (мс): медиану, p95 и максимум
+    """
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        'median': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'max': timings[-1],
+    }
+
+
+def report(name, timings):
+    print(f'{name:<40} median {timings["median"]:8.2f} ms   '
+          f'p95 {timings["p95"]:8.2f} ms   max {timings["max"]:8.2f} ms')
@@ -0,0 +1,53 @@
+"""
+Бенчмарк потоковой выдачи /api/v1/books/?stream=ndjson.
+
+    python -m benchmarks.api_stream --books 10000 100000
+
+Для каждого размера каталога замеряет время чтения всего ответа и пиковое
+потребление памяти Python (tracemalloc).
+"""
+import argparse
+import time
+import tracemalloc
+
+from django.test import Client
+
+from benchmarks import bench_database
+from benchmarks.search import populate
+
+from Catalog.models import Author, Book, Genre
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    client = Client()
+    with bench_database() as connection:
+        for books in args.books:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'TRUNCATE "{Book._meta.db_table}", "{Author._meta.db_table}", "{Genre._meta.db_table}" CASCADE')
+                populate(cursor, books)
+
+            def read_stream():
+                response = client.get('/api/v1/books/', {'stream': 'ndjson'})
+                return sum(len(chunk) for chunk in response.streaming_content)
+
+            start = time.perf_counter()
+            size = read_stream()
+            elapsed = time.perf_counter() - start
+
+            # Память меряется отдельным проходом: tracemalloc сильно замедляет выполнение
+            tracemalloc.start()
+            read_stream()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f'{books:>9} books: {size / 2 ** 20:8.1f} MiB streamed in {elapsed:6.2f} s, '
+                  f'peak Python memory {peak / 2 ** 20:6.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Нагрузочный бенчмарк: синхронные представления под WSGI (gunicorn) против
+асинхронных под ASGI (uvicorn, Catalog.async_views).
+
+    python -m benchmarks.asgi_vs_wsgi --books 10000 --concurrency 50 200 --duration 15
+
+Серверы запускаются отдельными процессами на временной тестовой базе. Нагрузку создает
+встроенный клиент на asyncio с постоянными (keep-alive) соединениями; для каждого уровня
+параллельности выводятся запросы в секунду и задержки p50 / p99. Для нескольких воркеров
+нужен общий кеш (REDIS_URL в .env, см. CACHES в ReadMe.settings)
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks import bench_database
+from benchmarks.search import populate
+
+from Catalog.models import Author, Book
+
+SERVERS = {
+    'wsgi': lambda port, threads: [
+        sys.executable, '-m', 'gunicorn', 'ReadMe.wsgi:application', '--bind', f'127.0.0.1:{port}',
+        '--threads', str(threads), '--log-level', 'warning',
+    ],
+    'asgi': lambda port, threads: [
+        sys.executable, '-m', 'uvicorn', 'ReadMe.asgi:application', '--port', str(port),
+        '--log-level', 'warning', '--no-access-log',
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Сервер не запустился на порту {port}')
+
+
+async def request(reader, writer, path):
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n'.encode())
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = None
+    chunked = False
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'transfer-encoding' and 'chunked' in value:
+            chunked = True
+
+    if chunked:
+        while size := int((await reader.readline()).strip(), 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def load(port, paths, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                status = await request(reader, writer, random.choice(paths))
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2] * 1000,
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=10_000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--threads', type=int, default=8, help='потоков на воркер gunicorn')
+    args = parser.parse_args()
+
+    with bench_database() as connection:
+        with connection.cursor() as cursor:
+            populate(cursor, args.books)
+
+        paths = ['/books/', '/authors/', '/api/v1/books/']
+        paths += [f'/books/{slug}' for slug in Book.objects.order_by('?').values_list('slug', flat=True)[:50]]
+        paths += [f'/authors/{slug}' for slug in Author.objects.order_by('?').values_list('slug', flat=True)[:50]]
+
+        # Число воркеров серверы берут из WEB_CONCURRENCY, как и настройки (CACHES)
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'benchmarks.server_settings',
+               'BENCH_DB_NAME': connection.settings_dict['NAME'], 'WEB_CONCURRENCY': str(args.workers)}
+        for name, command in SERVERS.items():
+            port = free_port()
+            server = subprocess.Popen(command(port, args.threads), env=env)
+            try:
+                wait_for_port(port)
+                asyncio.run(load(port, paths, 10, 2))
+                for concurrency in args.concurrency:
+                    result = asyncio.run(load(port, paths, concurrency, args.duration))
+                    print(f'{name}  concurrency {concurrency:>4}: {result["rps"]:8.1f} req/s   '
+                          f'p50 {result["p50"]:8.1f} ms   p99 {result["p99"]:8.1f} ms   '
+                          f'errors {result["errors"]}')
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    main()
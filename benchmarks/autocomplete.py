@@ -0,0 +1,50 @@
+"""
+Бенчмарк автодополнения (Catalog.autocomplete).
+
+    python -m benchmarks.autocomplete --books 1000000
+
+Генерирует каталог заданного размера, строит индекс подсказок по книгам и авторам и замеряет
+время ответа на префиксы разной длины в сравнении с запросом istartswith к базе
+"""
+import argparse
+import time
+
+from benchmarks import bench_database, measure, report
+from benchmarks.search import populate
+
+from Catalog.autocomplete import AUTOCOMPLETE_LIMIT, autocomplete, build_index, get_index
+from Catalog.models import Author, Book
+
+PREFIXES = ['в', 'вой', 'война мир', 'Фамилия12', 'несуществующий']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    with bench_database() as connection:
+        with connection.cursor() as cursor:
+            populate(cursor, args.books)
+            cursor.execute('ANALYZE')
+
+        for kind in ('book', 'author'):
+            start = time.perf_counter()
+            index = build_index(kind)
+            print(f'Индекс {kind}: {len(index)} объектов, {len(index.entries)} ключей, '
+                  f'построен за {time.perf_counter() - start:.1f} с')
+            get_index(kind)
+
+        for prefix in PREFIXES:
+            kind = 'author' if prefix.startswith('Фамилия') else 'book'
+            report(f'index {kind} {prefix!r}', measure(lambda: autocomplete(kind, prefix), repeat=args.repeat))
+
+            model, field = (Author, 'last_name') if kind == 'author' else (Book, 'title')
+            queryset = model.objects.filter(**{f'{field}__istartswith': prefix}).values_list('pk', field)
+            report(f'db istartswith {kind} {prefix!r}',
+                   measure(lambda: list(queryset[:AUTOCOMPLETE_LIMIT]), repeat=max(args.repeat // 50, 5)))
+
+
+if __name__ == '__main__':
+    main()
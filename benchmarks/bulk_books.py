@@ -0,0 +1,79 @@
+"""
+Бенчмарк массовых операций с книгами через API (/api/v1/books/, Catalog.books).
+
+    python -m benchmarks.bulk_books --books 5000 --catalog 100000
+
+В каталог из --catalog книг одним запросом создается --books книг, затем они же
+изменяются (название, автор, жанры) и удаляются. Для сравнения замеряется создание
+той же пачки по одной книге через POST.
+"""
+import argparse
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import Client
+
+from benchmarks import bench_database
+from benchmarks.search import populate
+
+from Catalog.models import Author, Book, Genre
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--catalog', type=int, default=100_000)
+    parser.add_argument('--single', type=int, default=200, help='сколько книг создать по одной для сравнения')
+    args = parser.parse_args()
+
+    with bench_database() as connection:
+        with connection.cursor() as cursor:
+            populate(cursor, args.catalog)
+
+        user = get_user_model().objects.create_user(username='bench', password='bench-password')
+        user.groups.add(Group.objects.create(name='staff'))
+        client = Client()
+        client.force_login(user)
+        author_ids = list(Author.objects.values_list('pk', flat=True)[:100])
+        genre_ids = list(Genre.objects.values_list('pk', flat=True))
+
+        def send(method, data):
+            start = time.perf_counter()
+            response = getattr(client, method)('/api/v1/books/', json.dumps(data), content_type='application/json')
+            elapsed = time.perf_counter() - start
+            assert response.status_code in (200, 201), response.content[:500]
+            return response.json(), elapsed
+
+        items = [
+            {'title': f'Массовая книга {i}', 'about': f'Описание массовой книги {i}',
+             'author': author_ids[i % len(author_ids)], 'genre': [genre_ids[i % len(genre_ids)]]}
+            for i in range(args.books)
+        ]
+        result, elapsed = send('post', items)
+        ids = result['created']
+        print(f'create {args.books:>6} books: {elapsed:6.2f} s')
+
+        changes = [
+            {'id': pk, 'title': f'Измененная книга {i}', 'author': author_ids[(i + 1) % len(author_ids)],
+             'genre': genre_ids[i % 3:i % 3 + 2]}
+            for i, pk in enumerate(ids)
+        ]
+        _, elapsed = send('patch', changes)
+        print(f'update {args.books:>6} books: {elapsed:6.2f} s')
+
+        _, elapsed = send('delete', {'ids': ids})
+        print(f'delete {args.books:>6} books: {elapsed:6.2f} s')
+
+        start = time.perf_counter()
+        for item in items[:args.single]:
+            send('post', item)
+        elapsed = time.perf_counter() - start
+        print(f'create {args.single:>6} books one by one: {elapsed:6.2f} s '
+              f'(~{elapsed / args.single * args.books:6.1f} s for {args.books})')
+        assert Book.objects.count() == args.catalog + args.single
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Бенчмарк JSON-рендерера на orjson (api.renderers) и сжатия ответов (ReadMe.compression).
+
+    python -m benchmarks.compression --books 10000 --page-size 100
+
+Для /api/v1/books/ сравнивает время сериализации страницы книг рендерером DRF (json)
+и ORJSONRenderer, для /api/v1/books/, /api/v1/books/?stream=ndjson и /books/ - время
+ответа и число байт, переданных клиенту, без сжатия (как до изменений), с gzip и с brotli
+"""
+import argparse
+from unittest import mock
+
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks import bench_database, measure, report
+from benchmarks.search import populate
+
+from api.renderers import ORJSONRenderer
+from api.views import BookApiList
+
+ENCODINGS = {'identity': 'identity', 'gzip': 'gzip', 'br': 'br, gzip'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=10_000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    client = Client()
+    with bench_database() as connection:
+        with connection.cursor() as cursor:
+            populate(cursor, args.books)
+
+        api_page = ('/api/v1/books/', {'page_size': args.page_size})
+        data = client.get(*api_page).data
+        for name, renderer in (('JSONRenderer (json)', JSONRenderer()), ('ORJSONRenderer', ORJSONRenderer())):
+            size = len(renderer.render(data, 'application/json'))
+            report(f'render {args.page_size} books, {name}', measure(
+                lambda: renderer.render(data, 'application/json'), repeat=args.repeat * 10))
+            print(f'{"":<40} {size} bytes')
+        print()
+
+        def get(path, params, accept_encoding, renderer=ORJSONRenderer):
+            with mock.patch.object(BookApiList, 'renderer_classes', [renderer]):
+                response = client.get(path, params, HTTP_ACCEPT_ENCODING=accept_encoding)
+            assert response.status_code == 200
+            if response.streaming:
+                return sum(len(chunk) for chunk in response.streaming_content)
+            return len(response.content)
+
+        # (название, путь, параметры, отдается ли ответ рендерером DRF, повторов)
+        pages = [
+            ('/api/v1/books/', '/api/v1/books/', {'page_size': args.page_size}, True, args.repeat),
+            ('/api/v1/books/?stream=ndjson', '/api/v1/books/', {'stream': 'ndjson'}, False, 3),
+            ('/books/', '/books/', {}, False, args.repeat),
+        ]
+        for name, path, params, rendered, repeat in pages:
+            # До изменений: рендерер DRF и ответ без сжатия
+            variants = [('до: json, identity', JSONRenderer, 'identity')] if rendered else []
+            variants += [(encoding, ORJSONRenderer, accept) for encoding, accept in ENCODINGS.items()]
+            for variant, renderer, accept_encoding in variants:
+                size = get(path, params, accept_encoding, renderer)
+                timings = measure(lambda: get(path, params, accept_encoding, renderer), repeat=repeat, warmup=1)
+                report(f'{name} {variant}', timings)
+                print(f'{"":<40} {size / 1024:10.1f} KiB on the wire')
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Бенчмарк команды import_catalog.
+
+    python -m benchmarks.import_catalog --books 200000 --batch-size 5000
+
+Генерирует JSONL файлы авторов, жанров и книг и импортирует их во временную базу.
+"""
+import argparse
+import json
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+
+from benchmarks import bench_database
+from benchmarks.search import GENRES, WORDS
+
+
+def write_jsonl(path, records):
+    with path.open('w', encoding='utf-8') as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    authors = max(args.books // 10, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        write_jsonl(directory / 'authors.jsonl', (
+            {'first_name': f'Имя{i}', 'last_name': f'Фамилия{i}', 'date_of_birth': '1900-01-01'}
+            for i in range(authors)
+        ))
+        write_jsonl(directory / 'genres.jsonl', ({'genre': genre} for genre in GENRES))
+        write_jsonl(directory / 'books.jsonl', (
+            {
+                'title': f'{WORDS[i % 40].capitalize()} {WORDS[i // 40 % 40]} {i}',
+                'author': f'Имя{i % authors} Фамилия{i % authors}',
+                'genres': [GENRES[i % len(GENRES)], GENRES[i * 3 % len(GENRES)]],
+                'about': ' '.join(WORDS[i * k % 40] for k in (7, 13, 17, 19)),
+            }
+            for i in range(args.books)
+        ))
+
+        with bench_database():
+            for name in ('authors', 'genres', 'books'):
+                start = time.perf_counter()
+                out = StringIO()
+                call_command('import_catalog', f'--{name}', str(directory / f'{name}.jsonl'),
+                             '--batch-size', str(args.batch_size), stdout=out)
+                elapsed = time.perf_counter() - start
+                print(out.getvalue().splitlines()[-1])
+                print(f'  {name}: {elapsed:.1f} с')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Бенчмарк кеширования фрагментов списков (Catalog.fragments) на странице /books/.
+
+    python -m benchmarks.list_pages --books 10000
+
+Сравнивает время ответа страницы списка книг без кеша фрагментов и с прогретым кешем.
+Описания книг удлиняются до нескольких сотен слов, как у настоящих аннотаций
+"""
+import argparse
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+from django.test import Client
+
+from benchmarks import bench_database, measure, report
+from benchmarks.search import populate
+
+from Catalog.models import Book
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=10_000)
+    parser.add_argument('--about-words', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    client = Client()
+    with bench_database() as connection:
+        with connection.cursor() as cursor:
+            populate(cursor, args.books)
+            cursor.execute(
+                f'UPDATE "{Book._meta.db_table}" SET about = repeat(about || \' \', %s)',
+                [max(args.about_words // 7, 1)],
+            )
+
+        def get_page():
+            response = client.get('/books/')
+            assert response.status_code == 200
+
+        with mock.patch('Catalog.templatetags.catalog_tags.cache', DummyCache('dummy', {})):
+            without_cache = measure(get_page, repeat=args.repeat, warmup=5)
+        cache.clear()
+        with_cache = measure(get_page, repeat=args.repeat, warmup=5)
+
+    report('/books/ без кеша фрагментов', without_cache)
+    report('/books/ с кешем фрагментов', with_cache)
+    for name, timings in (('без кеша', without_cache), ('с кешем', with_cache)):
+        print(f'Пропускная способность {name}: {1000 / timings["median"]:7.1f} запросов/с')
+
+
+if __name__ == '__main__':
+    main()
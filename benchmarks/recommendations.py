@@ -0,0 +1,88 @@
+"""
+Бенчмарк построения рекомендаций "Читатели также добавляли" (Catalog.recommendations).
+
+    python -m benchmarks.recommendations --users 100000 --shelf-rows 1000000
+
+Генерирует пользователей с книжными полками (популярность книг неравномерная: несколько
+книг есть почти на каждой полке, большинство - на единицах), строит рекомендации для всех
+книг, затем меняет часть полок и пересчитывает только затронутые книги (--stale)
+"""
+import argparse
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from benchmarks import bench_database
+from benchmarks.search import populate
+
+from Catalog.bookshelf import add_books
+from Catalog.models import Book, BookNeighbour, Bookshelf, StaleRecommendations
+from Catalog.recommendations import build_recommendations, rebuild_stale
+
+
+def populate_shelves(cursor, users, shelf_rows):
+    User = get_user_model()
+    Shelved = Bookshelf.book.through
+    per_shelf = max(shelf_rows // users, 1)
+
+    cursor.execute(
+        f'INSERT INTO "{User._meta.db_table}" (password, is_superuser, username, first_name, last_name, '
+        f'email, is_staff, is_active, date_joined, last_update) '
+        f"SELECT '', false, 'reader' || i, '', '', '', false, true, now(), now() "
+        f'FROM generate_series(1, %s) AS i',
+        [users],
+    )
+    cursor.execute(
+        f'INSERT INTO "{Bookshelf._meta.db_table}" (user_id) SELECT id FROM "{User._meta.db_table}"'
+    )
+    # Номер книги на полке распределен как n * random()^3: первые книги популярнее остальных
+    cursor.execute(
+        f'INSERT INTO "{Shelved._meta.db_table}" (bookshelf_id, book_id) '
+        f'SELECT s.id, b.first + floor(b.total * power(random(), 3))::bigint '
+        f'FROM "{Bookshelf._meta.db_table}" s, generate_series(1, %s) AS j, '
+        f'(SELECT min(id) AS first, count(*) AS total FROM "{Book._meta.db_table}") AS b '
+        f'ON CONFLICT DO NOTHING',
+        [per_shelf],
+    )
+    cursor.execute('ANALYZE')
+    cursor.execute(f'SELECT count(*) FROM "{Shelved._meta.db_table}"')
+    return cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--shelf-rows', type=int, default=1_000_000)
+    parser.add_argument('--changes', type=int, default=1000, help='сколько полок изменить перед --stale')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with bench_database():
+        with connection.cursor() as cursor:
+            populate(cursor, args.books)
+            rows = populate_shelves(cursor, args.users, args.shelf_rows)
+        print(f'Книг {args.books}, полок {args.users}, строк в таблице связей {rows}')
+
+        started = time.perf_counter()
+        changed = build_recommendations(batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f'Полное построение: {elapsed:.1f} с, книг с рекомендациями {changed}, '
+              f'строк BookNeighbour {BookNeighbour.objects.count()}')
+
+        users = get_user_model().objects.order_by('?')[:args.changes]
+        books = list(Book.objects.order_by('?').values_list('pk', flat=True)[:args.changes])
+        for user, book_id in zip(users, books):
+            add_books(user, Book.objects.filter(pk=book_id))
+        stale = StaleRecommendations.objects.count()
+
+        started = time.perf_counter()
+        rebuilt = rebuild_stale(batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+        print(f'Пересчет после изменения {args.changes} полок: {elapsed:.1f} с, '
+              f'в очереди {stale}, пересчитано {rebuilt}')
+
+
+if __name__ == '__main__':
+    main()
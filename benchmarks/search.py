@@ -0,0 +1,88 @@
+"""
+Бенчмарк полнотекстового поиска по книгам (Catalog.search).
+
+    python -m benchmarks.search --books 1000000
+
+Генерирует каталог заданного размера, строит поисковые векторы одним UPDATE
+и замеряет время получения первой страницы ранжированных результатов.
+"""
+import argparse
+import time
+
+from benchmarks import bench_database, measure, report
+
+from Catalog.models import Author, Book, Genre
+from Catalog.search import search_books, update_search_vector
+
+WORDS = [
+    'война', 'мир', 'любовь', 'смерть', 'время', 'город', 'дорога', 'море', 'ночь', 'зима',
+    'лето', 'история', 'тайна', 'дом', 'сад', 'король', 'звезда', 'река', 'остров', 'память',
+    'путешествие', 'человек', 'жизнь', 'судьба', 'свет', 'тень', 'огонь', 'ветер', 'капитан', 'доктор',
+    'княжна', 'братья', 'отцы', 'дети', 'преступление', 'наказание', 'мастер', 'игрок', 'идиот', 'бесы',
+]
+GENRES = [
+    'Роман', 'Повесть', 'Рассказ', 'Поэзия', 'Драма', 'Комедия', 'Трагедия', 'Фантастика',
+    'Фэнтези', 'Детектив', 'Триллер', 'Ужасы', 'Приключения', 'История', 'Биография', 'Мемуары',
+]
+QUERIES = ['война', 'капитан дочка', 'Фантастика', 'Фамилия123', 'преступление наказание', '"тайна острова"']
+
+
+def populate(cursor, books):
+    authors = max(books // 10, 1)
+    words = 'ARRAY[' + ', '.join(f"'{word}'" for word in WORDS) + ']'
+
+    cursor.execute(
+        f'INSERT INTO "{Author._meta.db_table}" (first_name, last_name, slug, date_of_birth, books_count, updated_at) '
+        f"SELECT 'Имя' || i, 'Фамилия' || i, 'author-' || i, DATE '1900-01-01', 0, now() "
+        f'FROM generate_series(1, %s) AS i',
+        [authors],
+    )
+    for i, genre in enumerate(GENRES):
+        Genre.objects.create(genre=genre)
+
+    cursor.execute(
+        f'INSERT INTO "{Book._meta.db_table}" (title, slug, author_id, about, rating, rating_sum, rating_count, bookshelves_count, updated_at) '
+        f'SELECT initcap(w[1 + i %% 40]) || \' \' || w[1 + (i / 40) %% 40] || \' \' || i, '
+        f"'book-' || i, "
+        f'(SELECT min(id) FROM "{Author._meta.db_table}") + i %% %s, '
+        f"w[1 + (i * 7) %% 40] || ' ' || w[1 + (i * 13) %% 40] || ' ' || w[1 + (i * 17) %% 40] || ' и ' || "
+        f"w[1 + (i * 19) %% 40], 0, 0, 0, 0, now() "
+        f'FROM generate_series(1, %s) AS i, (SELECT {words} AS w) AS vocabulary',
+        [authors, books],
+    )
+    cursor.execute(
+        f'INSERT INTO "{Book.genre.through._meta.db_table}" (book_id, genre_id) '
+        f'SELECT b.id, g.id FROM "{Book._meta.db_table}" b '
+        f'JOIN "{Genre._meta.db_table}" g ON g.id %% %s IN (b.id %% %s, (b.id * 3) %% %s)',
+        [len(GENRES)] * 3,
+    )
+    cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--keepdb', action='store_true', help='не удалять тестовую базу после запуска')
+    args = parser.parse_args()
+
+    with bench_database(keepdb=args.keepdb) as connection:
+        with connection.cursor() as cursor:
+            start = time.perf_counter()
+            populate(cursor, args.books)
+            print(f'Сгенерировано книг: {args.books} за {time.perf_counter() - start:.1f} с')
+
+            start = time.perf_counter()
+            update_search_vector(Book.objects.all())
+            cursor.execute('VACUUM ANALYZE "%s"' % Book._meta.db_table)
+            print(f'Поисковые векторы построены за {time.perf_counter() - start:.1f} с')
+
+        for query in QUERIES:
+            report(f'search {query!r} (first page)',
+                   measure(lambda: list(search_books(query)[:20]), repeat=args.repeat))
+            report(f'search {query!r} (count)',
+                   measure(lambda: search_books(query).count(), repeat=args.repeat))
+
+
+if __name__ == '__main__':
+    main()
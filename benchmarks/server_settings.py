@@ -0,0 +1,9 @@
+"""
+Настройки Django для серверов, которые запускает benchmarks.asgi_vs_wsgi:
+база данных - временная тестовая база бенчмарка
+"""
+from ReadMe.settings import *  # noqa: F401,F403
+from ReadMe.settings import DATABASES, os
+
+DATABASES['default']['NAME'] = os.environ['BENCH_DB_NAME']
+DEBUG = False
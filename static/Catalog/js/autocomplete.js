@@ -0,0 +1,76 @@
+// Выбор объектов с подсказками (Catalog.widgets): в <select> изначально есть только выбранные
+// варианты, остальные подгружаются из /api/v1/autocomplete/<вид>/?q= по мере ввода
+(function () {
+    'use strict';
+
+    var DELAY = 150;
+
+    function setup(select) {
+        var input = document.createElement('input');
+        var list = document.createElement('ul');
+        var timer = null;
+        var request = 0;
+
+        input.type = 'text';
+        input.autocomplete = 'off';
+        input.placeholder = 'Начните вводить...';
+        input.className = 'autocomplete__input';
+        list.className = 'autocomplete__list';
+        select.parentNode.insertBefore(input, select);
+        select.parentNode.insertBefore(list, select.nextSibling);
+
+        function choose(id, text) {
+            var option = select.querySelector('option[value="' + id + '"]');
+            if (!option) {
+                option = new Option(text, id);
+                select.add(option);
+            }
+            if (!select.multiple) {
+                select.value = String(id);
+            }
+            option.selected = true;
+            input.value = '';
+            list.innerHTML = '';
+        }
+
+        function show(results) {
+            list.innerHTML = '';
+            results.forEach(function (result) {
+                var item = document.createElement('li');
+                item.textContent = result.text;
+                item.addEventListener('mousedown', function (event) {
+                    event.preventDefault();
+                    choose(result.id, result.text);
+                });
+                list.appendChild(item);
+            });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            var query = input.value.trim();
+            if (!query) {
+                list.innerHTML = '';
+                return;
+            }
+            timer = setTimeout(function () {
+                var current = ++request;
+                fetch(select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query))
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) {
+                        // Ответ на устаревший запрос не показывается
+                        if (current === request) {
+                            show(data.results);
+                        }
+                    });
+            }, DELAY);
+        });
+        input.addEventListener('blur', function () {
+            list.innerHTML = '';
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+    });
+})();
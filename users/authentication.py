@@ -1,12 +1,82 @@
 from django.contrib.auth import get_user_model
-from django.contrib.auth.backends import BaseBackend
+from django.contrib.auth.backends import BaseBackend, ModelBackend
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Время жизни закешированного пользователя и токена (секунды)
+USER_CACHE_TIMEOUT = 60 * 15
+
+
+def _version_key(user_id):
+    return f'users:user-version:{user_id}'
+
+
+def _token_key(key):
+    return f'users:token:{key}'
+
+
+def get_cached_user(user_id):
+    """
+    Возвращает пользователя по pk или None. Между запросами пользователь хранится в кеше
+    под ключом с версией - отметкой User.last_update, которая меняется при каждом сохранении
+    пользователя (в том числе при смене пароля и входе), а при выходе версия сбрасывается
+    """
+    version = cache.get(_version_key(user_id))
+    if version is not None:
+        user = cache.get(f'users:user:{user_id}:{version}')
+        if user is not None:
+            return user
+
+    user_model = get_user_model()
+    try:
+        user = user_model.objects.get(pk=user_id)
+    except user_model.DoesNotExist:
+        return None
+    cache_user(user)
+    return user
+
+
+def cache_user(user):
+    version = user.last_update.timestamp()
+    # Версию, записанную при более позднем сохранении пользователя (user_version_changed),
+    # загруженный раньше объект не перезаписывает
+    cache.add(_version_key(user.pk), version, USER_CACHE_TIMEOUT)
+    cache.set(f'users:user:{user.pk}:{version}', user, USER_CACHE_TIMEOUT)
+
+
+def user_version_changed(user):
+    """
+    Новая версия пользователя после сохранения: закешированная копия перестает читаться
+    """
+    cache.set(_version_key(user.pk), user.last_update.timestamp(), USER_CACHE_TIMEOUT)
+
+
+def invalidate_user(user_id):
+    cache.delete(_version_key(user_id))
+
+
+def invalidate_token(key):
+    cache.delete(_token_key(key))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который загружает пользователя сессии из кеша (get_cached_user)
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
 
 
 class EmailAuthBackend(BaseBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         user_model = get_user_model()
         try:
-            user = user_model.objects.get(email=username)
+            # Без учета регистра, по индексу users_user_email_upper_idx
+            user = user_model.objects.get(email__iexact=username)
             if user.check_password(password):
                 return user
             return None
@@ -14,8 +84,24 @@ class EmailAuthBackend(BaseBackend):
             return None
 
     def get_user(self, user_id):
-        user_model = get_user_model()
-        try:
-            return user_model.objects.get(pk=user_id)
-        except user_model.DoesNotExist:
-            return None
+        return get_cached_user(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, который хранит в кеше pk пользователя по ключу токена,
+    а самого пользователя берет из get_cached_user. Запись сбрасывается при удалении токена
+    """
+
+    def authenticate_credentials(self, key):
+        user_id = cache.get(_token_key(key))
+        if user_id is None:
+            user_id = Token.objects.filter(key=key).values_list('user_id', flat=True).first()
+            if user_id is None:
+                raise exceptions.AuthenticationFailed('Недействительный токен.')
+            cache.set(_token_key(key), user_id, USER_CACHE_TIMEOUT)
+
+        user = get_cached_user(user_id)
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed('Пользователь неактивен или удален.')
+        return user, Token(key=key, user=user)
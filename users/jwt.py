@@ -0,0 +1,211 @@
+"""
+JWT для REST API (/api/v1/auth/jwt/...): короткоживущий access-токен и refresh-токен.
+
+Access-токен содержит роли пользователя (названия групп, claim roles) и is_staff, поэтому
+в представлениях каталога (api.views) аутентификация (StatelessJWTAuthentication) и проверка
+прав (api.permissions.IsStaff) не обращаются к БД: пользователь запроса - JWTUser, построенный
+по claims токена. Остальным представлениям (djoser: /auth/users/me/, set_password и т. п.) нужна
+модель пользователя - по умолчанию используется JWTAuthentication, который берет ее из кеша.
+Роли обновляются при обновлении access-токена через refresh (RoleTokenRefreshSerializer).
+
+Отзыв токенов - список RevokedToken: отдельные токены (jti) и все токены пользователя, выданные
+до момента отзыва (смена пароля, блокировка, удаление). Проверка токена - одно чтение из кеша
+(get_revocations): ключ jti токена и ключ пользователя; при промахе значение берется из БД
+"""
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from rest_framework import serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication as BaseJWTAuthentication
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer, TokenRefreshSerializer, TokenVerifySerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken, UntypedToken
+
+from .authentication import get_cached_user
+from .models import RevokedToken
+from .roles import get_group_names
+
+# Claim с названиями групп пользователя
+ROLES_CLAIM = 'roles'
+# Claim с точным временем выпуска токена (секунды с дробной частью): iat - целые секунды,
+# и по нему нельзя отличить токен, выпущенный в ту же секунду до отзыва всех токенов, от выпущенного после
+ISSUED_AT_CLAIM = 'issued_at'
+# Сколько секунд в кеше хранится отметка "токен/пользователь не отозван". Отзыв сразу
+# перезаписывает ее (_revoke), так что время только ограничивает объем кеша
+REVOCATION_CACHE_TIMEOUT = 60 * 15
+
+
+def add_role_claims(token, user):
+    token[ISSUED_AT_CLAIM] = token.current_time.timestamp()
+    token[ROLES_CLAIM] = sorted(get_group_names(user))
+    token['is_staff'] = user.is_staff
+    return token
+
+
+def _token_key(jti):
+    return f'users:jwt-revoked:token:{jti}'
+
+
+def _user_key(user_id):
+    return f'users:jwt-revoked:user:{user_id}'
+
+
+def get_revocations(jti, user_id):
+    """
+    Отзыв токена: (отозван ли jti, время отзыва всех токенов пользователя или 0).
+    Оба значения читаются из кеша одним запросом; недостающие - из БД, где учитываются
+    только не истекшие записи. Они добавляются через cache.add, чтобы не затереть
+    отметку об отзыве, записанную параллельно
+    """
+    keys = {'token': _token_key(jti), 'user': _user_key(user_id)}
+    cached = cache.get_many(keys.values())
+    revoked = RevokedToken.objects.filter(expires_at__gt=datetime.now(timezone.utc))
+
+    token_revoked = cached.get(keys['token'])
+    if token_revoked is None:
+        token_revoked = bool(jti) and revoked.filter(jti=jti).exists()
+        cache.add(keys['token'], token_revoked, REVOCATION_CACHE_TIMEOUT)
+
+    user_revoked_at = cached.get(keys['user'])
+    if user_revoked_at is None:
+        last = revoked.filter(user_id=user_id, jti='').aggregate(last=Max('revoked_at'))['last']
+        user_revoked_at = last.timestamp() if last else 0
+        cache.add(keys['user'], user_revoked_at, REVOCATION_CACHE_TIMEOUT)
+    return token_revoked, user_revoked_at
+
+
+def is_revoked(token):
+    token_revoked, revoked_at = get_revocations(
+        token.get(api_settings.JTI_CLAIM, ''), token.get(api_settings.USER_ID_CLAIM))
+    if token_revoked:
+        return True
+    # У токенов без ISSUED_AT_CLAIM (выпущенных до его появления) отзывается
+    # и токен, выданный в ту же секунду после отзыва
+    return bool(revoked_at) and token.get(ISSUED_AT_CLAIM, token['iat']) <= revoked_at
+
+
+def _revoke(key, **fields):
+    now = datetime.now(timezone.utc)
+    RevokedToken.objects.filter(expires_at__lte=now).delete()
+    revoked = RevokedToken.objects.create(revoked_at=now, **fields)
+    value = True if revoked.jti else now.timestamp()
+    cache.set(key, value, (revoked.expires_at - now).total_seconds())
+
+
+def revoke_token(token):
+    """
+    Отзывает один токен (access или refresh) до истечения его срока
+    """
+    _revoke(
+        _token_key(token[api_settings.JTI_CLAIM]),
+        user_id=token[api_settings.USER_ID_CLAIM],
+        jti=token[api_settings.JTI_CLAIM],
+        expires_at=datetime.fromtimestamp(token['exp'], timezone.utc),
+    )
+
+
+def revoke_user_tokens(user_id):
+    """
+    Отзывает все выданные пользователю токены: запись живет, пока не истечет самый долгий из них
+    """
+    lifetime = max(settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'], settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'])
+    _revoke(_user_key(user_id), user_id=user_id, jti='', expires_at=datetime.now(timezone.utc) + lifetime)
+
+
+class JWTUser(TokenUser):
+    """
+    Пользователь запроса по claims access-токена. Группы берутся из claim roles,
+    поэтому users.roles.get_group_names не обращается ни к кешу, ни к БД
+    """
+
+    def __init__(self, token):
+        super().__init__(token)
+        self._group_names = frozenset(token.get(ROLES_CLAIM, ()))
+
+
+class RevocationCheckMixin:
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if is_revoked(token):
+            raise InvalidToken('Токен отозван')
+        return token
+
+
+class StatelessJWTAuthentication(RevocationCheckMixin, JWTStatelessUserAuthentication):
+    """
+    Аутентификация по заголовку "Authorization: Bearer <access-токен>" без запросов к БД.
+    Пользователь запроса - JWTUser без строки в БД, поэтому подходит только представлениям,
+    которым нужны pk и роли пользователя (api.views)
+    """
+
+
+class JWTAuthentication(RevocationCheckMixin, BaseJWTAuthentication):
+    """
+    Аутентификация по access-токену с моделью пользователя из кеша (users.authentication.get_cached_user)
+    """
+
+    def get_user(self, validated_token):
+        user = get_cached_user(validated_token[api_settings.USER_ID_CLAIM])
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('Пользователь неактивен или удален', code='user_inactive')
+        return user
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+
+    @classmethod
+    def get_token(cls, user):
+        return add_role_claims(super().get_token(user), user)
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Новый access-токен по refresh-токену с актуальными ролями пользователя
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_revoked(refresh):
+            raise InvalidToken('Токен отозван')
+
+        user = get_cached_user(refresh[api_settings.USER_ID_CLAIM])
+        if user is None or not user.is_active:
+            raise InvalidToken('Пользователь неактивен или удален')
+        return {'access': str(add_role_claims(refresh.access_token, user))}
+
+
+class RoleTokenVerifySerializer(TokenVerifySerializer):
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if is_revoked(UntypedToken(attrs['token'])):
+            raise InvalidToken('Токен отозван')
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    """
+    Выход: отзыв refresh-токена и, если передан, текущего access-токена
+    """
+    refresh = serializers.CharField()
+    access = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        tokens = [RefreshToken(attrs['refresh'])]
+        if 'access' in attrs:
+            access = AccessToken(attrs['access'])
+            # Иначе по своему refresh-токену можно отозвать чужой access-токен
+            if access.get(api_settings.USER_ID_CLAIM) != tokens[0].get(api_settings.USER_ID_CLAIM):
+                raise serializers.ValidationError({'access': 'Токен выдан другому пользователю'})
+            tokens.append(access)
+        for token in tokens:
+            revoke_token(token)
+        return {}
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser
 
 
@@ -17,3 +18,23 @@ class User(AbstractUser):
         auto_now=True,
         verbose_name="Дата последнего обновления"
     )
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Вход по email без учета регистра (email__iexact сравнивает UPPER(email))
+            models.Index(Upper('email'), name='users_user_email_upper_idx'),
+        ]
+
+
+# Отозванный JWT (users.jwt): один токен по jti или, если jti пуст, все токены пользователя,
+# выданные до revoked_at. Запись нужна только до expires_at - после него токены истекают сами.
+# user_id не внешний ключ: отзыв токенов удаленного пользователя должен сохраниться
+class RevokedToken(models.Model):
+    user_id = models.BigIntegerField(db_index=True, verbose_name="Пользователь")
+    jti = models.CharField(max_length=64, blank=True, db_index=True, verbose_name="Идентификатор токена")
+    revoked_at = models.DateTimeField(verbose_name="Дата отзыва")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Действует до")
+
+    class Meta:
+        verbose_name = "Отозванный токен"
+        verbose_name_plural = "Отозванные токены"
@@ -0,0 +1,52 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+
+# Время жизни закешированного списка групп пользователя (секунды)
+GROUP_NAMES_CACHE_TIMEOUT = 60 * 60
+
+
+def _version_key(user_id):
+    return f'users:groups-version:{user_id}'
+
+
+def get_group_names(user):
+    """
+    Возвращает множество названий групп пользователя.
+    В пределах запроса список хранится в объекте пользователя, между запросами - в кеше
+    под ключом с версией, которая меняется при изменении членства в группах
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    group_names = getattr(user, '_group_names', None)
+    if group_names is not None:
+        return group_names
+
+    version = cache.get(_version_key(user.pk))
+    if version is None:
+        version = uuid4().hex
+        cache.set(_version_key(user.pk), version, None)
+
+    key = f'users:groups:{user.pk}:{version}'
+    group_names = cache.get(key)
+    if group_names is None:
+        group_names = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(key, group_names, GROUP_NAMES_CACHE_TIMEOUT)
+
+    user._group_names = group_names
+    return group_names
+
+
+def has_group(user, group_name):
+    """
+    Проверяет, состоит ли пользователь в группе group_name
+    """
+    return group_name in get_group_names(user)
+
+
+def invalidate_group_names(user_ids):
+    """
+    Сбрасывает закешированные группы пользователей сменой версии ключа
+    """
+    cache.set_many({_version_key(user_id): uuid4().hex for user_id in user_ids}, None)
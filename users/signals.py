@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user, user_version_changed
+from .jwt import revoke_user_tokens
+from .roles import invalidate_group_names
+
+
+# Сброс кеша групп (users.roles) при изменении членства пользователей в группах
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_group_names([instance.pk])
+        return
+
+    # Изменение со стороны группы: group.user_set.add(...) / remove(...) / clear()
+    if action == 'pre_clear':
+        instance._member_ids = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        invalidate_group_names(getattr(instance, '_member_ids', []))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        invalidate_group_names(pk_set)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_group_names(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_members(sender, instance, **kwargs):
+    instance._member_ids = list(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_group_names(getattr(instance, '_member_ids', []))
+
+
+# Сброс закешированного пользователя и токенов (users.authentication)
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'last_update' in update_fields:
+        user_version_changed(instance)
+    else:
+        # last_update не сохранялся (например, update_last_login при входе)
+        invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+    revoke_user_tokens(instance.pk)
+
+
+# Отзыв JWT (users.jwt) при смене пароля и блокировке пользователя
+@receiver(post_init, sender=get_user_model())
+def remember_credentials(sender, instance, **kwargs):
+    if 'password' in instance.__dict__ and 'is_active' in instance.__dict__:
+        instance._initial_credentials = (instance.password, instance.is_active)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_credentials_changed(sender, instance, created, **kwargs):
+    initial = getattr(instance, '_initial_credentials', None)
+    if not created and initial is not None and initial != (instance.password, instance.is_active):
+        revoke_user_tokens(instance.pk)
+    instance._initial_credentials = (instance.password, instance.is_active)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
@@ -0,0 +1,89 @@
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from rest_framework.authtoken.models import Token
+
+from users.authentication import get_cached_user
+
+
+class CachedAuthenticationTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='reader', email='Reader@Example.com', password='secret-password')
+        self.token = Token.objects.create(user=self.user)
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = '/api/v1/bookshelf/'
+
+    def token_get(self, key=None):
+        return Client().get(self.url, HTTP_AUTHORIZATION=f'Token {key or self.token.key}')
+
+    def test_session_user_is_cached(self):
+        # Сессия + пользователь + полка; со второго запроса пользователь берется из кеша
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_is_cached(self):
+        # Токен + пользователь + полка, затем только полка
+        with self.assertNumQueries(3):
+            self.token_get()
+        with self.assertNumQueries(1):
+            response = self.token_get()
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted_token_is_rejected(self):
+        self.token_get()
+        self.token.delete()
+        self.assertEqual(self.token_get().status_code, 401)
+        self.assertEqual(self.token_get('0' * 40).status_code, 401)
+
+    def test_user_change_invalidates_cache(self):
+        self.assertEqual(get_cached_user(self.user.pk).first_name, '')
+        self.user.first_name = 'Лев'
+        self.user.save()
+        self.assertEqual(get_cached_user(self.user.pk).first_name, 'Лев')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.token_get().status_code, 401)
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+
+    def test_password_change_logs_out_other_sessions(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertIn(self.client.get(self.url).status_code, (401, 403))
+
+    def test_logout_invalidates_cache(self):
+        self.client.get(self.url)
+        self.client.logout()
+        with self.assertNumQueries(1):
+            get_cached_user(self.user.pk)
+
+    def test_session_with_model_backend_stays_logged_in(self):
+        client = Client()
+        client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(client.get(self.url).status_code, 200)
+
+    def test_deleted_user(self):
+        get_cached_user(self.user.pk)
+        self.user.delete()
+        self.assertIsNone(get_cached_user(self.user.pk))
+        self.assertEqual(self.token_get().status_code, 401)
+
+    def test_email_login_is_case_insensitive(self):
+        self.assertEqual(authenticate(username='reader@example.COM', password='secret-password'), self.user)
+        self.assertIsNone(authenticate(username='reader@example.com', password='wrong'))
+
+    def test_email_lookup_uses_index(self):
+        queryset = get_user_model().objects.filter(email__iexact='reader@example.com')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        self.assertIn('users_user_email_upper_idx', plan)
@@ -0,0 +1,161 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from Catalog.models import Book
+from users.jwt import revoke_user_tokens
+from users.models import RevokedToken
+
+
+class JWTTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.staff = Group.objects.create(name='staff')
+        self.user = get_user_model().objects.create_user(username='editor', password='secret-password')
+        self.user.groups.add(self.staff)
+        self.book = Book.objects.create(title='Книга', about='Описание')
+        self.client = Client()
+
+    def obtain(self):
+        response = self.client.post('/api/v1/auth/jwt/create/',
+                                    {'username': 'editor', 'password': 'secret-password'})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def api(self, method, url, access, data=None):
+        return getattr(self.client, method)(url, data, content_type='application/json',
+                                            HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_claims(self):
+        tokens = self.obtain()
+        access = AccessToken(tokens['access'])
+        self.assertEqual(access['user_id'], self.user.pk)
+        self.assertEqual(access['roles'], ['staff'])
+        self.assertFalse(access['is_staff'])
+
+    def test_requests_do_not_query_database_for_user_and_roles(self):
+        access = self.obtain()['access']
+        self.api('get', '/api/v1/bookshelf/', access)
+
+        # Только выборка книг с полки
+        with self.assertNumQueries(1):
+            self.assertEqual(self.api('get', '/api/v1/bookshelf/', access).status_code, 200)
+
+        # Право IsStaff проверяется по claim roles: запросы только к таблицам каталога
+        with CaptureQueriesContext(connection) as context:
+            response = self.api('patch', f'/api/v1/book/{self.book.pk}', access, {'about': 'Новое описание'})
+        self.assertEqual(response.status_code, 200)
+        for query in context.captured_queries:
+            for table in ('users_user', 'auth_group', 'authtoken_token', 'users_revokedtoken'):
+                self.assertNotIn(table, query['sql'])
+
+    def test_user_specific_endpoints(self):
+        access = self.obtain()['access']
+        response = self.api('post', '/api/v1/bookshelf/', access, {'books': [self.book.pk]})
+        self.assertEqual(response.json(), {'added': [self.book.pk]})
+        response = self.api('put', f'/api/v1/book/{self.book.pk}/rating/', access, {'score': 4})
+        self.assertEqual(response.json()['score'], 4)
+
+    def test_refresh_updates_roles(self):
+        tokens = self.obtain()
+        self.user.groups.remove(self.staff)
+        response = self.client.post('/api/v1/auth/jwt/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        access = response.json()['access']
+        self.assertEqual(AccessToken(access)['roles'], [])
+        response = self.api('patch', f'/api/v1/book/{self.book.pk}', access, {'about': 'Новое описание'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_revoke(self):
+        tokens = self.obtain()
+        other = self.obtain()
+        response = self.client.post('/api/v1/auth/jwt/revoke/', tokens)
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', tokens['access']).status_code, 401)
+        self.assertEqual(self.client.post('/api/v1/auth/jwt/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+        self.assertEqual(self.client.post('/api/v1/auth/jwt/verify/', {'token': tokens['access']}).status_code, 401)
+        # Другие сессии пользователя продолжают работать
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', other['access']).status_code, 200)
+
+    def test_revocation_survives_cache_loss(self):
+        tokens = self.obtain()
+        # Отметка "не отозван" уже в кеше: отзыв должен ее перезаписать
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', tokens['access']).status_code, 200)
+        self.client.post('/api/v1/auth/jwt/revoke/', tokens)
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', tokens['access']).status_code, 401)
+
+        cache.clear()
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', tokens['access']).status_code, 401)
+        revoke_user_tokens(self.user.pk)
+        cache.clear()
+        self.assertEqual(self.client.post('/api/v1/auth/jwt/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+
+    def test_revocation_check_reads_only_token_and_user_keys(self):
+        access = self.obtain()['access']
+        self.api('get', '/api/v1/bookshelf/', access)
+        for user_id in range(1000, 1100):
+            revoke_user_tokens(user_id)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.api('get', '/api/v1/bookshelf/', access).status_code, 200)
+        self.assertFalse(any('users_revokedtoken' in query['sql'] for query in context.captured_queries))
+
+    def test_revoke_rejects_access_token_of_other_user(self):
+        tokens = self.obtain()
+        other = get_user_model().objects.create_user(username='reader', password='secret-password')
+        response = self.client.post('/api/v1/auth/jwt/revoke/', {
+            'refresh': str(RefreshToken.for_user(other)), 'access': tokens['access']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', tokens['access']).status_code, 200)
+        self.assertFalse(RevokedToken.objects.exists())
+
+    def test_password_change_revokes_all_tokens(self):
+        tokens = self.obtain()
+        self.user.set_password('new-password')
+        self.user.save()
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', tokens['access']).status_code, 401)
+        self.assertEqual(self.client.post('/api/v1/auth/jwt/refresh/', {'refresh': tokens['refresh']}).status_code, 401)
+
+    def test_login_right_after_revoking_all_tokens(self):
+        tokens = self.obtain()
+        revoke_user_tokens(self.user.pk)
+        # Новый вход в ту же секунду, что и отзыв всех токенов
+        fresh = self.obtain()
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', tokens['access']).status_code, 401)
+        self.assertEqual(self.api('get', '/api/v1/bookshelf/', fresh['access']).status_code, 200)
+        self.assertEqual(self.client.post('/api/v1/auth/jwt/refresh/', {'refresh': fresh['refresh']}).status_code, 200)
+
+    def test_djoser_me(self):
+        access = self.obtain()['access']
+        response = self.api('get', '/api/v1/auth/users/me/', access)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.user.pk)
+
+        response = self.api('patch', '/api/v1/auth/users/me/', access, {'email': 'editor@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'editor@example.com')
+
+    def test_djoser_set_password(self):
+        access = self.obtain()['access']
+        response = self.api('post', '/api/v1/auth/users/set_password/', access,
+                            {'current_password': 'secret-password', 'new_password': 'another-secret-42'})
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('another-secret-42'))
+        # Смена пароля отзывает выданные токены
+        self.assertEqual(self.api('get', '/api/v1/auth/users/me/', access).status_code, 401)
+
+    def test_expired_revocations_are_removed(self):
+        revoke_user_tokens(self.user.pk)
+        self.client.post('/api/v1/auth/jwt/revoke/', {'refresh': str(RefreshToken.for_user(self.user))})
+        self.assertEqual(RevokedToken.objects.count(), 2)
+
+        RevokedToken.objects.update(expires_at='2000-01-01T00:00Z')
+        self.client.post('/api/v1/auth/jwt/revoke/', {'refresh': str(RefreshToken.for_user(self.user))})
+        self.assertEqual(RevokedToken.objects.count(), 1)
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from api.permissions import IsStaff
+from Catalog.models import Book
+from users.roles import get_group_names, has_group
+
+
+class UserRolesTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.staff = Group.objects.create(name='staff')
+        self.user = get_user_model().objects.create(username='user')
+        Book.objects.create(title='Книга', about='Описание')
+
+    def fresh_user(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_groups_are_loaded_once_per_request(self):
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertFalse(has_group(user, 'staff'))
+            self.assertFalse(has_group(user, 'staff'))
+            self.assertFalse(has_group(user, 'editors'))
+
+    def test_groups_are_cached_between_requests(self):
+        self.user.groups.add(self.staff)
+        self.assertTrue(has_group(self.fresh_user(), 'staff'))
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(has_group(user, 'staff'))
+
+    def test_cache_is_invalidated_on_user_groups_change(self):
+        self.assertFalse(has_group(self.fresh_user(), 'staff'))
+        self.user.groups.add(self.staff)
+        self.assertTrue(has_group(self.fresh_user(), 'staff'))
+        self.user.groups.clear()
+        self.assertFalse(has_group(self.fresh_user(), 'staff'))
+
+    def test_cache_is_invalidated_on_group_members_change(self):
+        self.assertFalse(has_group(self.fresh_user(), 'staff'))
+        self.staff.user_set.add(self.user)
+        self.assertTrue(has_group(self.fresh_user(), 'staff'))
+        self.staff.user_set.clear()
+        self.assertFalse(has_group(self.fresh_user(), 'staff'))
+
+    def test_cache_is_invalidated_on_group_rename_and_delete(self):
+        self.user.groups.add(self.staff)
+        self.assertEqual(get_group_names(self.fresh_user()), {'staff'})
+
+        self.staff.name = 'moderators'
+        self.staff.save()
+        self.assertEqual(get_group_names(self.fresh_user()), {'moderators'})
+
+        self.staff.delete()
+        self.assertEqual(get_group_names(self.fresh_user()), set())
+
+    def test_anonymous_user_has_no_groups(self):
+        client = Client()
+        # Выборка страницы и три запроса фасетов (книг нет), без запросов к группам
+        with self.assertNumQueries(4):
+            client.get(reverse('catalog:books'))
+
+    def test_template_filter_uses_single_query_per_request(self):
+        self.user.groups.add(self.staff)
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('catalog:books'))
+        self.assertContains(response, reverse('catalog:add_book'))
+
+        # Сессия + страница + три запроса фасетов; пользователь и группы берутся из кеша
+        with self.assertNumQueries(5):
+            client.get(reverse('catalog:books'))
+
+    def test_is_staff_permission(self):
+        factory = APIRequestFactory()
+        request = factory.post('/api/v1/books/')
+        request.user = self.fresh_user()
+        self.assertFalse(IsStaff().has_permission(request, None))
+
+        self.user.groups.add(self.staff)
+        request.user = self.fresh_user()
+        self.assertTrue(IsStaff().has_permission(request, None))